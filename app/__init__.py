@@ -1,24 +1,52 @@
 from flask import Flask
+import os
 from flask_sqlalchemy import SQLAlchemy
-from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import event
 
 db = SQLAlchemy()
-scheduler = BackgroundScheduler()
 
-def create_app():
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Use WAL so readers don't block the writer, and fsync at checkpoints rather than every commit."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA busy_timeout=5000')
+    cursor.close()
+
+def create_app(test_config=None):
+    """
+    Create the Flask app.
+
+    Args:
+        test_config (dict, optional): Config values applied before the database is bound,
+            e.g. a SQLALCHEMY_DATABASE_URI for tests.
+    """
     app = Flask(__name__)
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///trades.db'
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///trades.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Live updates (/stream): concurrent streams per process, stream length, change polling and buffered events
+    app.config['MAX_STREAMS'] = int(os.environ.get('MAX_STREAMS', 100))
+    app.config['STREAM_SECONDS'] = 300
+    app.config['EVENT_POLL_SECONDS'] = 1.0
+    app.config['EVENT_HISTORY'] = 1000
+    if test_config is not None:
+        # init_app binds the engine to the configured URI; setting it afterwards has no effect
+        app.config.update(test_config)
 
     db.init_app(app)
 
-    # Start scheduler only if not running
-    if not scheduler.running:
-        scheduler.start()
+    # The data pipeline is not scheduled here: it runs in its own process
+    # (python src/pipeline.py --schedule, the pipeline service of docker-compose.yml)
+    # so the web workers never train or fetch
 
     with app.app_context():
-        from .main import main
+        from .main import main, Trade
         app.register_blueprint(main)
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', set_sqlite_pragmas)
         db.create_all()
+        # create_all skips tables that already exist; add indexes introduced since
+        for index in Trade.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
 
     return app
@@ -0,0 +1,164 @@
+import collections
+import json
+import logging
+import threading
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class EventBroker:
+    """
+    In-process fan-out of events to any number of subscribers.
+
+    Published events get increasing sequence numbers and are kept in a bounded buffer.
+    Subscribers block on a condition variable until an event newer than the last one they
+    saw arrives, so idle subscribers cost no CPU however many there are.
+
+    Args:
+        history (int): Number of recent events kept for subscribers that fall behind. A
+            subscriber further behind gets a 'resync' event in place of the dropped ones.
+    """
+
+    def __init__(self, history=1000):
+        self._cond = threading.Condition()
+        self._events = collections.deque(maxlen=history)
+        self._seq = 0
+
+    @property
+    def latest(self):
+        """Sequence number of the most recent event (0 before the first)."""
+        with self._cond:
+            return self._seq
+
+    def publish(self, event_type, data):
+        """Add an event and wake every waiting subscriber; returns its sequence number."""
+        with self._cond:
+            self._seq += 1
+            self._events.append((self._seq, event_type, data))
+            self._cond.notify_all()
+            return self._seq
+
+    def wait(self, after, timeout=None):
+        """
+        Return the events published after sequence number `after`, waiting up to timeout seconds.
+
+        Returns:
+            list: (seq, event_type, data) tuples, oldest first; empty on timeout. If events
+                after `after` were already dropped from the buffer, the list starts with a
+                ('resync', {'missed': n}) event so the subscriber can reload from the source.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > after, timeout)
+            events = [event for event in self._events if event[0] > after]
+            if events and events[0][0] > after + 1:
+                missed = events[0][0] - after - 1
+                events.insert(0, (events[0][0] - 1, 'resync', {'missed': missed}))
+            return events
+
+class ChangeWatcher:
+    """
+    Background thread turning database and file changes into broker events.
+
+    Every process polls on its own, so trades saved by another gunicorn worker (or signals
+    rewritten by the pipeline) still reach this process's subscribers. One cheap query per
+    interval is shared by all subscribers; poke() triggers a check right away.
+
+    Args:
+        broker (EventBroker): Where events are published.
+        fetch_trades (callable): fetch_trades(after_id) -> list of trade dicts with an 'id', oldest first.
+        signal_versions (callable): signal_versions() -> {ticker: version} of the signals files.
+        last_trade_id (int): Trades up to this id are not published.
+        interval (float): Seconds between checks.
+    """
+
+    def __init__(self, broker, fetch_trades, signal_versions, last_trade_id=0, interval=1.0):
+        self.broker = broker
+        self.fetch_trades = fetch_trades
+        self.signal_versions = signal_versions
+        self.last_trade_id = last_trade_id
+        self.versions = signal_versions()
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='change-watcher', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+
+    def poke(self):
+        self._wake.set()
+
+    def is_alive(self):
+        return self._thread.is_alive()
+
+    def check(self):
+        """Publish trades newer than the last seen one and every signals file that changed."""
+        for trade in self.fetch_trades(self.last_trade_id):
+            self.broker.publish('trade', trade)
+            self.last_trade_id = trade['id']
+        versions = self.signal_versions()
+        for ticker, version in versions.items():
+            if self.versions.get(ticker) != version:
+                self.broker.publish('signals', {'ticker': ticker, 'version': version})
+        self.versions = versions
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Change watcher check failed: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+def format_sse(event_type, data, event_id=None):
+    """Format one server-sent event."""
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines += [f'event: {event_type}', f'data: {json.dumps(data)}']
+    return '\n'.join(lines) + '\n\n'
+
+class EventHub:
+    """
+    Per-app event state: the broker, its change watcher and the stream slots.
+
+    Args:
+        max_streams (int): Concurrent event streams allowed in this process.
+        history (int): Events the broker keeps for streams that fall behind.
+    """
+
+    def __init__(self, max_streams, history=1000):
+        self.broker = EventBroker(history)
+        self.slots = threading.BoundedSemaphore(max_streams) if max_streams > 0 else None
+        self.watcher = None
+        self._lock = threading.Lock()
+
+    def acquire_stream(self):
+        """Reserve a stream slot without blocking; False if all are taken."""
+        return self.slots is not None and self.slots.acquire(blocking=False)
+
+    def release_stream(self):
+        self.slots.release()
+
+    def ensure_watcher(self, make_watcher):
+        """Start the change watcher on first use (threads do not survive a fork, so per worker)."""
+        with self._lock:
+            if self.watcher is None or not self.watcher.is_alive():
+                self.watcher = make_watcher(self.broker).start()
+            return self.watcher
+
+    def poke(self):
+        """Ask the watcher to check for changes now, e.g. right after saving trades."""
+        if self.watcher is not None:
+            self.watcher.poke()
+
+    def stop(self):
+        with self._lock:
+            if self.watcher is not None:
+                self.watcher.stop()
+                self.watcher = None
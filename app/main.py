@@ -1,13 +1,16 @@
-from flask import Blueprint, render_template, request, jsonify, send_from_directory
+from flask import Blueprint, Response, current_app, g, render_template, request, jsonify, send_from_directory
 from . import db
-import pandas as pd
+from .events import ChangeWatcher, EventHub, format_sse
 import os
-import plotly
-import plotly.graph_objects as go
-import json
+import glob
 import logging
-import numpy as np
-from datetime import datetime
+import threading
+import base64
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, insert, tuple_
+from src.storage import META_FILE, frame_exists, read_frame, store_path
+from src import metrics
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -15,125 +18,568 @@ logger = logging.getLogger(__name__)
 
 main = Blueprint('main', __name__)
 
+DEFAULT_TICKER = 'AAPL'
+DEFAULT_CHART_POINTS = 1000
+MAX_CHART_POINTS = 10000
+TRADE_PAGE_SIZE = 50
+MAX_TRADE_PAGE_SIZE = 500
+MAX_TRADE_BATCH = 10000
+MAX_CATCHUP_TRADES = 500
+STREAM_KEEPALIVE_SECONDS = 15
+STREAM_RETRY_MS = 2000
+STREAM_RETRY_AFTER_SECONDS = 30
+
 class Trade(db.Model):
     """Database model for trades."""
     id = db.Column(db.Integer, primary_key=True)
     ticker = db.Column(db.String(10), nullable=False)
     signal = db.Column(db.Integer, nullable=False)  # 1: Buy, -1: Sell, 0: Hold
     price = db.Column(db.Float, nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    # Serves ticker filters ordered by time; SQLite and Postgres append the primary key to
+    # both indexes, so (timestamp, id) keyset pages are index range scans
+    __table_args__ = (db.Index('ix_trade_ticker_timestamp', 'ticker', 'timestamp'),)
+
+    def to_dict(self):
+        return {'id': self.id, 'ticker': self.ticker, 'signal': self.signal, 'price': self.price,
+                'timestamp': self.timestamp.isoformat() if self.timestamp else None}
+
+class ChartDataError(Exception):
+    """Raised when the signals data cannot be charted; the message is returned to the client."""
+
+class ChartCache:
+    """
+    Process-level cache of validated signals DataFrames, one entry per signals file.
+
+    Entries are keyed by the signals file signature (mtime and size of the CSV and of its
+    columnar store), so a rewrite by analyze.py invalidates the cache on the next request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, signals_file, key):
+        """Return the cached DataFrame if key matches the entry for signals_file, else None."""
+        with self._lock:
+            entry = self.entries.get(signals_file)
+            if entry is not None and entry[0] == key:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, signals_file, key, df):
+        with self._lock:
+            self.entries[signals_file] = (key, df)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+chart_cache = ChartCache()
+
+def signals_signature(signals_file):
+    """Return (mtime_ns, size) of the signals CSV and its store metadata, None for missing files."""
+    signature = []
+    for path in (signals_file, os.path.join(store_path(signals_file), META_FILE)):
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+def signals_file_for(ticker):
+    """Return the signals file of a ticker: data/{ticker}_signals.csv, or data/signals.csv for the default ticker."""
+    per_ticker = f'data/{ticker}_signals.csv'
+    if frame_exists(per_ticker) or ticker != DEFAULT_TICKER:
+        return per_ticker
+    return 'data/signals.csv'
+
+def load_signals(signals_file):
+    """
+    Load and validate the signals data for charting.
+
+    Args:
+        signals_file (str): Path of the signals CSV.
+
+    Returns:
+        pd.DataFrame: Validated signals sorted by date. When read from the columnar store,
+            the columns are views of its memory map.
+
+    Raises:
+        ChartDataError: If the data is missing, malformed or too short to plot.
+    """
+    import pandas as pd
+
+    try:
+        df = read_frame(signals_file)
+    except ValueError as e:
+        logger.error(f"Failed to parse Date index of {signals_file}: {e}")
+        raise ChartDataError("Error: Invalid date format in signals.csv.")
+    if df.empty:
+        logger.error("signals.csv is empty.")
+        raise ChartDataError("Error: signals.csv is empty.")
+
+    required_columns = ['Close', 'SMA_50', 'SMA_200', 'Signal']
+    missing_columns = [col for col in required_columns if col not in df.columns]
+    if missing_columns:
+        logger.error(f"Missing columns in signals.csv: {missing_columns}")
+        raise ChartDataError(f"Error: Missing columns in signals.csv: {missing_columns}")
+
+    for col in required_columns:
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            logger.error(f"Column {col} contains non-numeric data.")
+            raise ChartDataError(f"Error: Column {col} in signals.csv contains non-numeric data.")
+    
+    original_len = len(df)
+    valid = df[required_columns].notna().all(axis=1).to_numpy()
+    rows = valid.nonzero()[0]
+    if len(rows) and valid[rows[0]:rows[-1] + 1].all():
+        # NaNs only in the SMA warm-up (and at the end): a slice keeps the store's memory-mapped columns
+        df = df.iloc[rows[0]:rows[-1] + 1]
+    else:
+        df = df.dropna(subset=required_columns)
+    if df.empty:
+        logger.error("All rows in signals.csv contain NaN values in required columns.")
+        raise ChartDataError("Error: No valid data in signals.csv after removing NaN values.")
+    if len(df) < 10:
+        logger.error(f"Too few valid rows ({len(df)}) after dropping NaN values.")
+        raise ChartDataError(f"Error: Too few valid rows ({len(df)}) in signals.csv for plotting.")
+    if len(df) < original_len:
+        logger.warning(f"Dropped {original_len - len(df)} rows with NaN values.")
+    if 'Predicted_Close' in df.columns and not pd.api.types.is_numeric_dtype(df['Predicted_Close']):
+        logger.warning("Predicted_Close column contains non-numeric data; skipping.")
+        df = df.drop(columns=['Predicted_Close'])
+    return df if df.index.is_monotonic_increasing else df.sort_index()
+
+def cached_signals(signals_file):
+    """Return the validated signals of signals_file, re-reading them only when the file changed."""
+    key = signals_signature(signals_file)
+    df = chart_cache.get(signals_file, key)
+    if df is None:
+        df = load_signals(signals_file)
+        chart_cache.put(signals_file, key, df)
+    return df
+
+def signals_files():
+    """Return the signals files in data/: signals.csv (if present), then every {ticker}_signals.csv."""
+    files = ['data/signals.csv'] if frame_exists('data/signals.csv') else []
+    return files + sorted(glob.glob('data/*_signals.csv'))
+
+def warm_chart_cache():
+    """
+    Load every signals file in data/ into chart_cache.
+
+    Called before gunicorn forks its workers (preload_app). Signals are read from the
+    memory-mapped columnar store (data/store), so the columns are pages of the OS file
+    cache. Workers share them after the fork, and when a refresh rewrites the store each
+    worker re-maps the same new pages rather than parsing its own copy. Signals that only
+    exist as CSV are parsed, and then shared copy-on-write only until the next refresh.
+
+    Returns:
+        list: Signals files that were loaded.
+    """
+    loaded = []
+    for signals_file in signals_files():
+        try:
+            cached_signals(signals_file)
+            loaded.append(signals_file)
+        except ChartDataError as e:
+            logger.warning(f"Not preloading {signals_file}: {e}")
+    logger.info(f"Preloaded chart data: {loaded}")
+    return loaded
+
+class TradeQueryError(Exception):
+    """Raised for invalid trade listing parameters; the message is returned to the client."""
+
+def encode_cursor(trade):
+    """Encode the (timestamp, id) position of a trade as an opaque page cursor."""
+    return base64.urlsafe_b64encode(f"{trade.timestamp.isoformat()}|{trade.id}".encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        timestamp, trade_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(timestamp), int(trade_id)
+    except ValueError:
+        raise TradeQueryError("Invalid cursor.")
+
+def trade_page(ticker=None, start=None, end=None, cursor=None, limit=TRADE_PAGE_SIZE):
+    """
+    Return one page of trades, newest first, using keyset pagination.
+
+    Each page continues strictly after the (timestamp, id) of the previous page's last trade,
+    so the database seeks into the timestamp index instead of skipping OFFSET rows, and the
+    cost of a page does not depend on how deep into the history it is.
+
+    Args:
+        ticker (str, optional): Only trades for this ticker.
+        start (datetime, optional): Only trades at or after this time.
+        end (datetime or date, optional): Only trades at or before this time; a date
+            includes the whole day.
+        cursor (str, optional): next_cursor of the previous page.
+        limit (int): Page size.
+
+    Returns:
+        tuple: List of trades and the cursor of the next page (None on the last page).
+    """
+    query = Trade.query
+    if ticker:
+        query = query.filter(Trade.ticker == ticker)
+    if start is not None:
+        query = query.filter(Trade.timestamp >= start)
+    if isinstance(end, datetime):
+        query = query.filter(Trade.timestamp <= end)
+    elif end is not None:
+        query = query.filter(Trade.timestamp < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    if cursor:
+        query = query.filter(tuple_(Trade.timestamp, Trade.id) < decode_cursor(cursor))
+    trades = query.order_by(Trade.timestamp.desc(), Trade.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(trades[limit - 1]) if len(trades) > limit else None
+    return trades[:limit], next_cursor
+
+def trade_query_args(args):
+    """Parse ticker, start, end, cursor and limit from request arguments for trade_page."""
+    try:
+        limit = int(args.get('limit', TRADE_PAGE_SIZE))
+        start = datetime.fromisoformat(args['start']) if args.get('start') else None
+        end = args.get('end')
+        # A plain date (as sent by the date picker) means the end of that day
+        if end:
+            end = date.fromisoformat(end) if len(end) == 10 else datetime.fromisoformat(end)
+        else:
+            end = None
+    except ValueError:
+        raise TradeQueryError("limit must be an integer and start/end ISO dates.")
+    if not 1 <= limit <= MAX_TRADE_PAGE_SIZE:
+        raise TradeQueryError(f"limit must be between 1 and {MAX_TRADE_PAGE_SIZE}.")
+    ticker = args.get('ticker', '').strip() or None
+    return {'ticker': ticker, 'start': start, 'end': end, 'cursor': args.get('cursor') or None, 'limit': limit}
+
+@main.before_app_request
+def start_request_timer():
+    if metrics.REGISTRY.enabled:
+        g.request_start = time.perf_counter()
+
+@main.after_app_request
+def record_request_metrics(response):
+    """Record the duration and status of every request, labelled by route endpoint."""
+    start = g.pop('request_start', None)
+    if start is not None:
+        endpoint = request.endpoint or 'unmatched'
+        metrics.REGISTRY.histogram('http_request_duration_seconds', 'Flask request duration in seconds.').observe(
+            time.perf_counter() - start, endpoint=endpoint, method=request.method)
+        metrics.REGISTRY.counter('http_requests_total', 'Flask requests by endpoint and status.').inc(
+            endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
+
+@main.route('/metrics')
+def metrics_endpoint():
+    """Expose the process's metrics in the Prometheus text format."""
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
 
 @main.route('/', methods=['GET', 'POST'])
 def index():
-    """Render the main page with stock chart and trade logs."""
+    """Render the main page; the chart is loaded asynchronously from /api/chart."""
     try:
         signals_file = 'data/signals.csv'
-        if not os.path.exists(signals_file):
+        if not frame_exists(signals_file):
             logger.error(f"{signals_file} not found. Run analyze.py first.")
             return "Error: Please run analyze.py to generate signals.csv.", 400
 
-        df = pd.read_csv(signals_file, index_col='Date', parse_dates=True)
-        if df.empty:
-            logger.error("signals.csv is empty.")
-            return "Error: signals.csv is empty.", 400
-
-        required_columns = ['Close', 'SMA_50', 'SMA_200', 'Signal']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            logger.error(f"Missing columns in signals.csv: {missing_columns}")
-            return f"Error: Missing columns in signals.csv: {missing_columns}", 400
-
-        for col in required_columns:
-            if not pd.api.types.is_numeric_dtype(df[col]):
-                logger.error(f"Column {col} contains non-numeric data.")
-                return f"Error: Column {col} in signals.csv contains non-numeric data.", 400
-        
-        original_len = len(df)
-        df = df.dropna(subset=required_columns)
-        if df.empty:
-            logger.error("All rows in signals.csv contain NaN values in required columns.")
-            return "Error: No valid data in signals.csv after removing NaN values.", 400
-        if len(df) < 10:
-            logger.error(f"Too few valid rows ({len(df)}) after dropping NaN values.")
-            return f"Error: Too few valid rows ({len(df)}) in signals.csv for plotting.", 400
-        if len(df) < original_len:
-            logger.warning(f"Dropped {original_len - len(df)} rows with NaN values.")
-
-        if not pd.api.types.is_datetime64_any_dtype(df.index):
-            logger.warning("Date index is not datetime; attempting to convert")
-            df.index = pd.to_datetime(df.index, errors='coerce')
-            if df.index.isna().any():
-                logger.error("Failed to convert Date index to datetime.")
-                return "Error: Invalid date format in signals.csv.", 400
-
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(x=df.index, y=df['Close'], mode='lines', name='Close Price', line=dict(color='blue')))
-        fig.add_trace(go.Scatter(x=df.index, y=df['SMA_50'], mode='lines', name='50-day SMA', line=dict(color='orange')))
-        fig.add_trace(go.Scatter(x=df.index, y=df['SMA_200'], mode='lines', name='200-day SMA', line=dict(color='purple')))
-        if 'Predicted_Close' in df.columns:
-            if pd.api.types.is_numeric_dtype(df['Predicted_Close']):
-                pred_df = df.dropna(subset=['Predicted_Close'])
-                if not pred_df.empty:
-                    fig.add_trace(go.Scatter(x=pred_df.index, y=pred_df['Predicted_Close'], mode='lines', 
-                                            name='Predicted Close', line=dict(color='green', dash='dash')))
-                else:
-                    logger.warning("Predicted_Close column has no valid data after dropping NaN.")
-            else:
-                logger.warning("Predicted_Close column contains non-numeric data; skipping.")
-
-        buys = df[df['Signal'] == 1]
-        sells = df[df['Signal'] == -1]
-        fig.add_trace(go.Scatter(x=buys.index, y=buys['Close'], mode='markers', name='Buy Signal',
-                                marker=dict(symbol='triangle-up', size=10, color='limegreen')))
-        fig.add_trace(go.Scatter(x=sells.index, y=sells['Close'], mode='markers', name='Sell Signal',
-                                marker=dict(symbol='triangle-down', size=10, color='red')))
-        
-        fig.update_layout(
-            title='AAPL Stock Price with Trading Signals and Predictions',
-            xaxis_title='Date',
-            yaxis_title='Price (USD)',
-            template='plotly',
-            plot_bgcolor='white',
-            paper_bgcolor='white'
-        )
-        
-        graphJSON = json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
-        logger.info(f"Chart JSON generated successfully with {len(df)} valid rows.")
-        
-        trades = Trade.query.all()
-        return render_template('index.html', graphJSON=graphJSON, trades=trades)
+        try:
+            cached_signals(signals_file)
+        except ChartDataError as e:
+            return str(e), 400
+
+        try:
+            query = trade_query_args(request.args)
+            trades, next_cursor = trade_page(**query)
+        except TradeQueryError as e:
+            return f"Error: {e}", 400
+        latest_trade_id = db.session.query(func.max(Trade.id)).scalar() or 0
+        return render_template('index.html', ticker=DEFAULT_TICKER, trades=trades, next_cursor=next_cursor,
+                               trade_filters=query, latest_trade_id=latest_trade_id,
+                               stream_retry_after=STREAM_RETRY_AFTER_SECONDS)
     except Exception as e:
         logger.error(f"Error in Flask app: {str(e)}")
         return f"Error: {str(e)}", 500
 
+@main.route('/api/chart')
+def chart_data():
+    """
+    Return downsampled chart series for a ticker and date range.
+
+    Query parameters: ticker (default AAPL), start and end (dates, optional) and points
+    (target points per line series). Buy and Sell signal points are always returned in full.
+    """
+    import pandas as pd
+    from src.downsample import downsample_signals
+
+    try:
+        ticker = request.args.get('ticker', DEFAULT_TICKER).strip().upper()
+        try:
+            points = int(request.args.get('points', DEFAULT_CHART_POINTS))
+            start = pd.Timestamp(request.args['start']) if request.args.get('start') else None
+            end = pd.Timestamp(request.args['end']) if request.args.get('end') else None
+        except ValueError as e:
+            logger.error(f"Invalid chart query {dict(request.args)}: {e}")
+            return jsonify({'status': 'error', 'message': 'points must be an integer and start/end valid dates.'}), 400
+        if not 3 <= points <= MAX_CHART_POINTS:
+            return jsonify({'status': 'error', 'message': f'points must be between 3 and {MAX_CHART_POINTS}.'}), 400
+
+        signals_file = signals_file_for(ticker)
+        if not ticker or not frame_exists(signals_file):
+            logger.error(f"No signals found for {ticker}")
+            return jsonify({'status': 'error', 'message': f'No signals found for {ticker}.'}), 404
+        try:
+            df = cached_signals(signals_file)
+        except ChartDataError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+
+        chart = downsample_signals(df, points=points, start=start, end=end)
+        chart.update(status='success', ticker=ticker)
+        return jsonify(chart)
+    except Exception as e:
+        logger.error(f"Error building chart data: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@main.route('/trades')
+def list_trades():
+    """Return a page of trades as JSON; pass next_cursor back as cursor for the next page."""
+    try:
+        try:
+            trades, next_cursor = trade_page(**trade_query_args(request.args))
+        except TradeQueryError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+        return jsonify({'status': 'success', 'trades': [trade.to_dict() for trade in trades],
+                        'next_cursor': next_cursor})
+    except Exception as e:
+        logger.error(f"Error listing trades: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+def validate_trade(data):
+    """
+    Validate one trade payload.
+
+    Args:
+        data (dict): Trade with 'ticker', 'signal' and 'price'.
+
+    Returns:
+        tuple: (ticker, signal, price) and None if valid, else None and the error message.
+    """
+    if not isinstance(data, dict):
+        return None, 'Trade must be a JSON object.'
+    ticker = data.get('ticker')
+    ticker = ticker.strip() if isinstance(ticker, str) else ''
+    signal = data.get('signal')
+    price = data.get('price')
+
+    if not ticker:
+        logger.error("Invalid trade: ticker is empty.")
+        return None, 'Ticker cannot be empty.'
+    if signal not in [0, 1, -1]:
+        logger.error(f"Invalid trade: signal {signal} is not 0, 1, or -1.")
+        return None, 'Signal must be 0 (Hold), 1 (Buy), or -1 (Sell).'
+    if not isinstance(price, (int, float)) or price <= 0:
+        logger.error(f"Invalid trade: price {price} is not a positive number.")
+        return None, 'Price must be a positive number.'
+    return (ticker, signal, price), None
+
 @main.route('/save_trade', methods=['POST'])
 def save_trade():
     """Save a trade to the database."""
     try:
         data = request.get_json()
-        ticker = data.get('ticker', '').strip()
-        signal = data.get('signal')
-        price = data.get('price')
-
-        if not ticker:
-            logger.error("Invalid trade: ticker is empty.")
-            return jsonify({'status': 'error', 'message': 'Ticker cannot be empty.'}), 400
-        if signal not in [0, 1, -1]:
-            logger.error(f"Invalid trade: signal {signal} is not 0, 1, or -1.")
-            return jsonify({'status': 'error', 'message': 'Signal must be 0 (Hold), 1 (Buy), or -1 (Sell).'}), 400
-        if not isinstance(price, (int, float)) or price <= 0:
-            logger.error(f"Invalid trade: price {price} is not a positive number.")
-            return jsonify({'status': 'error', 'message': 'Price must be a positive number.'}), 400
+        trade, error = validate_trade(data)
+        if error:
+            return jsonify({'status': 'error', 'message': error}), 400
+        ticker, signal, price = trade
 
         trade = Trade(ticker=ticker, signal=signal, price=price)
         db.session.add(trade)
         db.session.commit()
         logger.info(f"Saved trade: {ticker}, {signal}, {price}, ID: {trade.id}")
+        notify_subscribers()
         return jsonify({'status': 'success', 'trade_id': trade.id})
     except Exception as e:
         logger.error(f"Error saving trade: {str(e)}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@main.route('/save_trades', methods=['POST'])
+def save_trades():
+    """
+    Save a batch of trades in one transaction.
+
+    Accepts a JSON array of trades (or {"trades": [...]}) validated with the same rules as
+    /save_trade. Valid trades are inserted with a single bulk INSERT and commit; invalid ones
+    are skipped and reported by their position in the batch.
+    """
+    try:
+        data = request.get_json()
+        if isinstance(data, dict):
+            data = data.get('trades')
+        if not isinstance(data, list) or not data:
+            return jsonify({'status': 'error', 'message': 'Expected a non-empty array of trades.'}), 400
+        if len(data) > MAX_TRADE_BATCH:
+            return jsonify({'status': 'error', 'message': f'At most {MAX_TRADE_BATCH} trades per batch.'}), 400
+
+        rows, errors = [], []
+        for position, item in enumerate(data):
+            trade, error = validate_trade(item)
+            if error:
+                errors.append({'index': position, 'message': error})
+            else:
+                rows.append(dict(zip(('ticker', 'signal', 'price'), trade)))
+
+        trade_ids = []
+        if rows:
+            result = db.session.execute(insert(Trade).returning(Trade.id, sort_by_parameter_order=True), rows)
+            trade_ids = result.scalars().all()
+            db.session.commit()
+            notify_subscribers()
+        logger.info(f"Saved {len(trade_ids)} trades in one batch, rejected {len(errors)}")
+
+        status = 'success' if not errors else ('partial' if rows else 'error')
+        body = {'status': status, 'inserted': len(trade_ids), 'trade_ids': trade_ids, 'errors': errors}
+        return jsonify(body), 400 if status == 'error' else 200
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error saving trades: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+def trades_after(after_id, limit=MAX_CATCHUP_TRADES):
+    """Return up to limit trades with an id above after_id, oldest first, as dicts."""
+    return [trade.to_dict() for trade in Trade.query.filter(Trade.id > after_id).order_by(Trade.id).limit(limit)]
+
+def signal_versions():
+    """Return {ticker: version} of the signals files; the version changes whenever a file is rewritten."""
+    versions = {}
+    for signals_file in signals_files():
+        name = os.path.basename(signals_file)
+        ticker = DEFAULT_TICKER if name == 'signals.csv' else name[:-len('_signals.csv')]
+        versions[ticker] = max(signature[0] for signature in signals_signature(signals_file) if signature)
+    return versions
+
+def notify_subscribers():
+    """Have this process's change watcher publish new trades right away rather than at its next poll."""
+    hub = current_app.extensions.get('events')
+    if hub is not None:
+        hub.poke()
+
+def event_hub():
+    """Return the app's EventHub, starting its change watcher in this process if needed."""
+    app = current_app._get_current_object()
+    hub = app.extensions.get('events')
+    if hub is None:
+        hub = app.extensions.setdefault('events', EventHub(app.config['MAX_STREAMS'], app.config['EVENT_HISTORY']))
+
+    def make_watcher(broker):
+        def fetch_trades(after_id):
+            with app.app_context():
+                return trades_after(after_id)
+        last_trade_id = db.session.query(func.max(Trade.id)).scalar() or 0
+        return ChangeWatcher(broker, fetch_trades, signal_versions, last_trade_id=last_trade_id,
+                             interval=app.config['EVENT_POLL_SECONDS'])
+
+    hub.ensure_watcher(make_watcher)
+    return hub
+
+@main.route('/stream')
+def stream_events():
+    """
+    Push new trades ('trade' events) and refreshed signals ('signals' events) as server-sent events.
+
+    Each open stream waits without using CPU (a greenlet under the gevent worker, a thread
+    otherwise); at most MAX_STREAMS run per process and beyond that clients get 503, poll
+    /events and retry the stream after Retry-After (STREAM_RETRY_AFTER_SECONDS). A stream
+    that falls behind the broker's history reloads the missed trades from the database.
+    A stream ends after STREAM_SECONDS and the browser reconnects with Last-Event-ID, the id
+    of the last trade it received, and is sent the trades it missed.
+    """
+    hub = event_hub()
+    if not hub.acquire_stream():
+        return jsonify({'status': 'error', 'message': 'Too many open event streams; poll /events instead.'}), 503, \
+            {'Retry-After': str(STREAM_RETRY_AFTER_SECONDS)}
+    try:
+        after = request.headers.get('Last-Event-ID') or request.args.get('after')
+        after = int(after) if after else None
+        # Take the broker position before reading the catch-up so no event falls in between
+        seq = hub.broker.latest
+        catch_up = trades_after(after) if after is not None else []
+    except ValueError:
+        hub.release_stream()
+        return jsonify({'status': 'error', 'message': 'Last-Event-ID and after must be trade ids.'}), 400
+    except Exception:
+        hub.release_stream()
+        raise
+    stream_seconds = current_app.config['STREAM_SECONDS']
+    app = current_app._get_current_object()
+
+    def resync(last_id):
+        """Send the trades after last_id from the database and every signals version; return the new last id."""
+        while True:
+            # Query inside an app context, but do not hold it across the yields
+            with app.app_context():
+                trades = trades_after(last_id)
+            if not trades:
+                break
+            for trade in trades:
+                yield format_sse('trade', trade, trade['id'])
+            last_id = trades[-1]['id']
+        for ticker, version in signal_versions().items():
+            yield format_sse('signals', {'ticker': ticker, 'version': version})
+        return last_id
+
+    def generate(seq=seq):
+        last_id = catch_up[-1]['id'] if catch_up else (after or 0)
+        yield f'retry: {STREAM_RETRY_MS}\n\n'
+        for trade in catch_up:
+            yield format_sse('trade', trade, trade['id'])
+        deadline = time.monotonic() + stream_seconds
+        while (remaining := deadline - time.monotonic()) > 0:
+            events = hub.broker.wait(seq, timeout=min(STREAM_KEEPALIVE_SECONDS, remaining))
+            if not events:
+                yield ': keepalive\n\n'
+                continue
+            seq = events[-1][0]
+            for _, event_type, data in events:
+                if event_type == 'resync':
+                    # This stream fell behind the broker's buffer; reload what it missed
+                    logger.warning(f"Event stream missed {data['missed']} events; resyncing from the database")
+                    last_id = yield from resync(last_id)
+                elif event_type == 'trade':
+                    if data['id'] <= last_id:
+                        continue
+                    last_id = data['id']
+                    yield format_sse('trade', data, data['id'])
+                else:
+                    yield format_sse(event_type, data)
+
+    response = Response(generate(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(hub.release_stream)
+    return response
+
+@main.route('/events')
+def poll_events():
+    """Polling fallback for /stream: trades with an id above ?after= and the current signals versions."""
+    try:
+        after = int(request.args.get('after', 0))
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'after must be a trade id.'}), 400
+    trades = trades_after(after)
+    return jsonify({'status': 'success', 'trades': trades, 'signals': signal_versions(),
+                    'last_id': trades[-1]['id'] if trades else after})
+
 @main.route('/static/<path:filename>')
 def static_files(filename):
     """Serve static files like plotly.min.js."""
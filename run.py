@@ -1,21 +1,68 @@
-from app import create_app
+from app import create_app, db
+import gc
+import importlib.util
 import os
 
 app = create_app()
 
+# Connections per gevent worker kept for requests other than event streams
+STREAM_RESERVED_CONNECTIONS = 100
+
+def post_worker_init(worker):
+    # Pooled database connections opened in the master must not be shared with forked workers.
+    # This runs after the gevent worker has monkey-patched threading, so the new pool's locks
+    # are cooperative.
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+def gunicorn_options(port):
+    """
+    Gunicorn settings, configurable through the environment.
+
+    WEB_CONCURRENCY sets the number of worker processes and GUNICORN_PRELOAD=False disables
+    loading the app in the master before forking. GUNICORN_WORKER_CLASS defaults to gevent
+    when it is installed: an open event stream then costs a greenlet rather than a thread,
+    and each worker holds up to GUNICORN_WORKER_CONNECTIONS connections. Otherwise the
+    gthread worker runs GUNICORN_THREADS threads per worker.
+    """
+    default_class = 'gevent' if importlib.util.find_spec('gevent') else 'gthread'
+    return {
+        'bind': f'0.0.0.0:{port}',
+        'workers': int(os.environ.get('WEB_CONCURRENCY', 2)),
+        'worker_class': os.environ.get('GUNICORN_WORKER_CLASS', default_class),
+        'worker_connections': int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000)),
+        'threads': int(os.environ.get('GUNICORN_THREADS', 4)),
+        'preload_app': os.environ.get('GUNICORN_PRELOAD', 'True') == 'True',
+        'timeout': int(os.environ.get('GUNICORN_TIMEOUT', 120)),
+        'post_worker_init': post_worker_init,
+    }
+
+def default_max_streams(options):
+    """Event streams allowed per worker, leaving room for other requests."""
+    if options['worker_class'] == 'gevent':
+        return max(options['worker_connections'] - STREAM_RESERVED_CONNECTIONS, 0)
+    # Every open event stream holds a gthread worker thread; keep two per worker for other requests
+    return max(options['threads'] - 2, 0)
+
 if __name__ == '__main__':
-    # Use gunicorn in production (e.g., Render), Flask debug server locally
+    # Use gunicorn in production (e.g., Render, or SERVER=gunicorn), Flask debug server locally
     port = int(os.environ.get('PORT', 5000))
-    if os.environ.get('RENDER', 'False') == 'True':
+    if os.environ.get('RENDER', 'False') == 'True' or os.environ.get('SERVER') == 'gunicorn':
         from gunicorn.app.base import Application
+        from app.main import warm_chart_cache
+
+        options = gunicorn_options(port)
+        if 'MAX_STREAMS' not in os.environ:
+            app.config['MAX_STREAMS'] = default_max_streams(options)
+        if options['preload_app']:
+            # Parse the signals once in the master; workers share the pages copy-on-write
+            warm_chart_cache()
+            # Keep the garbage collector from touching (and so copying) the preloaded objects
+            gc.freeze()
 
         class StandaloneApplication(Application):
             def init(self, parser, opts, args):
-                return {
-                    'wsgi': app,
-                    'bind': f'0.0.0.0:{port}',
-                    'workers': 1,
-                }
+                return options
 
             def load(self):
                 return app
@@ -2,18 +2,98 @@ import pandas as pd
 import numpy as np
 import logging
 import os
+import sys
+# Get the current working directory
+current_dir = os.getcwd()
+# Add the parent directory to the path (assuming src is in the same directory as your notebook)
+sys.path.append(current_dir)
+from src.storage import frame_exists, read_frame, write_frame
+from src.metrics import timed
+from src.rules import DEFAULT_SIGNAL_RULES
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def calculate_indicators(df, prediction_file=None):
+class IndicatorCache:
+    """
+    Simple moving averages for many (ticker, window) pairs, held in one 2-D float array.
+
+    All windows of a ticker come from a single cumulative-sum pass over its prices, and
+    get() serves read-only row views, so a parameter sweep over N fast x M slow windows
+    costs N + M rolling computations instead of N * M.
+    """
+
+    def __init__(self, values, keys):
+        """
+        Args:
+            values (np.ndarray): 2-D array with one SMA series per row.
+            keys (list): (ticker, window) pair for each row of values.
+        """
+        self.values = values
+        self.keys = [(ticker, int(window)) for ticker, window in keys]
+        self._rows = {key: row for row, key in enumerate(self.keys)}
+
+    @classmethod
+    def build(cls, closes, windows):
+        """
+        Compute SMAs for every ticker and window.
+
+        Args:
+            closes (dict): Maps ticker to its Close prices (equal-length array-likes).
+            windows (iterable): SMA window lengths.
+
+        Returns:
+            IndicatorCache: Cache with a row for each (ticker, window) pair.
+        """
+        tickers = list(closes)
+        windows = sorted({int(window) for window in windows})
+        prices = np.vstack([np.asarray(closes[ticker], dtype=float) for ticker in tickers])
+        n = prices.shape[1]
+
+        # Centre each series on its first valid price to limit cumulative rounding error;
+        # the running sums can then be reproduced bar by bar (see IncrementalIndicators)
+        valid = ~np.isnan(prices)
+        first = valid.argmax(axis=1)
+        offset = np.where(valid.any(axis=1), prices[np.arange(len(tickers)), first], 0.0)[:, None]
+        csum = np.zeros((len(tickers), n + 1))
+        np.cumsum(np.where(valid, prices - offset, 0.0), axis=1, out=csum[:, 1:])
+        ccount = np.zeros((len(tickers), n + 1), dtype=np.int64)
+        np.cumsum(valid, axis=1, out=ccount[:, 1:])
+
+        values = np.full((len(tickers), len(windows), n), np.nan)
+        for col, window in enumerate(windows):
+            if window > n:
+                continue
+            sums = csum[:, window:] - csum[:, :-window]
+            full = (ccount[:, window:] - ccount[:, :-window]) == window
+            # Like rolling().mean(), windows containing a NaN stay NaN
+            values[:, col, window - 1:] = np.where(full, sums / window + offset, np.nan)
+
+        keys = [(ticker, window) for ticker in tickers for window in windows]
+        return cls(values.reshape(len(keys), n), keys)
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def get(self, ticker, window):
+        """Return the SMA series for (ticker, window) as a read-only view into the cache."""
+        view = self.values[self._rows[(ticker, int(window))]]
+        view.flags.writeable = False
+        return view
+
+@timed('calculate_indicators')
+def calculate_indicators(df, prediction_file=None, cache=None, ticker=None, output_file='data/signals.csv', rules=None):
     """
     Calculate technical indicators (SMA, RSI) and trading signals, optionally using LSTM predictions.
     
     Args:
         df (pd.DataFrame): DataFrame with stock data (must include 'Close' column).
         prediction_file (str, optional): Path to CSV with LSTM predictions (e.g., 'data/AAPL_predictions.csv').
+        cache (IndicatorCache, optional): Precomputed SMAs to read SMA_50/SMA_200 from.
+        ticker (str, optional): Ticker of df in the cache.
+        output_file (str): Path the signals are saved to.
+        rules (SignalRules, optional): Signal rules; DEFAULT_SIGNAL_RULES when None.
     
     Returns:
         pd.DataFrame: DataFrame with indicators and signals.
@@ -29,8 +109,12 @@ def calculate_indicators(df, prediction_file=None):
             df.index = pd.to_datetime(df.index, utc=True).tz_localize(None)
         
         # Calculate SMA (50-day and 200-day)
-        df['SMA_50'] = df['Close'].rolling(window=50).mean()
-        df['SMA_200'] = df['Close'].rolling(window=200).mean()
+        if (cache is None or (ticker, 50) not in cache or (ticker, 200) not in cache
+                or cache.values.shape[1] != len(df)):
+            ticker = ticker or 'Close'
+            cache = IndicatorCache.build({ticker: df['Close']}, [50, 200])
+        df['SMA_50'] = cache.get(ticker, 50)
+        df['SMA_200'] = cache.get(ticker, 200)
         
         # Calculate RSI (14-period)
         delta = df['Close'].diff()
@@ -40,11 +124,9 @@ def calculate_indicators(df, prediction_file=None):
         df['RSI'] = 100 - (100 / (1 + rs))
         
         # Load LSTM predictions if provided
-        if prediction_file and os.path.exists(prediction_file):
+        if prediction_file and frame_exists(prediction_file):
             try:
-                pred_df = pd.read_csv(prediction_file, index_col='Date', parse_dates=['Date'])
-                # Ensure pred_df index is timezone-naive
-                pred_df.index = pd.to_datetime(pred_df.index, utc=True).tz_localize(None)
+                pred_df = read_frame(prediction_file)
                 if 'Predicted_Close' in pred_df.columns:
                     df = df.join(pred_df['Predicted_Close'])
                     logger.info(f"Loaded LSTM predictions from {prediction_file}")
@@ -55,40 +137,99 @@ def calculate_indicators(df, prediction_file=None):
         else:
             logger.warning(f"Prediction file {prediction_file} not found; skipping LSTM predictions")
         
-        # Generate trading signals
-        df['Signal'] = 0
-        # Basic SMA + RSI signals
-        df['Signal'] = np.where((df['SMA_50'] > df['SMA_200']) & (df['RSI'] < 30), 1, df['Signal'])
-        df['Signal'] = np.where((df['SMA_50'] < df['SMA_200']) & (df['RSI'] > 70), -1, df['Signal'])
-        
-        # Enhance with LSTM predictions (if available)
+        # Generate trading signals (SMA + RSI, overridden by LSTM predictions when available)
+        df['Signal'] = (rules or DEFAULT_SIGNAL_RULES).evaluate({
+            'Close': df['Close'].to_numpy(),
+            'SMA_fast': df['SMA_50'].to_numpy(),
+            'SMA_slow': df['SMA_200'].to_numpy(),
+            'RSI': df['RSI'].to_numpy(),
+            'Predicted_Close': df['Predicted_Close'].to_numpy() if 'Predicted_Close' in df.columns else None,
+        })
         if 'Predicted_Close' in df.columns:
-            # Buy if predicted price is 5% higher than current, sell if 5% lower
-            df['Signal'] = np.where(
-                (df['Predicted_Close'] > df['Close'] * 1.05) & (df['SMA_50'] > df['SMA_200']),
-                1, df['Signal']
-            )
-            df['Signal'] = np.where(
-                (df['Predicted_Close'] < df['Close'] * 0.95) & (df['SMA_50'] < df['SMA_200']),
-                -1, df['Signal']
-            )
             logger.info("Incorporated LSTM predictions into trading signals")
         
-        os.makedirs('data', exist_ok=True)
         # Save with explicit datetime format, timezone-naive
-        df.to_csv('data/signals.csv', date_format='%Y-%m-%d')
-        logger.info("Calculated indicators and signals, saved to data/signals.csv")
+        write_frame(df, output_file, date_format='%Y-%m-%d')
+        logger.info(f"Calculated indicators and signals, saved to {output_file}")
         return df
     
     except Exception as e:
         logger.error(f"Error calculating indicators: {e}")
         return None
 
+def calculate_panel_indicators(close, predictions=None, output='combined', output_dir='data', rules=None):
+    """
+    Calculate SMA, RSI and trading signals for many tickers in one vectorized pass.
+
+    Args:
+        close (pd.DataFrame): Wide Close matrix (dates x tickers).
+        predictions (pd.DataFrame, optional): Wide Predicted_Close matrix aligned with close.
+        output (str, optional): 'combined' to write one long-format data/signals_panel.csv,
+            'per_ticker' to write data/{ticker}_signals.csv per column, or None to skip writing.
+        output_dir (str): Directory for the output files.
+        rules (SignalRules, optional): Signal rules; DEFAULT_SIGNAL_RULES when None.
+
+    Returns:
+        pd.DataFrame: Columns indexed by (ticker, field); result[ticker] has the same fields
+            as calculate_indicators output.
+    """
+    try:
+        if output not in ('combined', 'per_ticker', None):
+            logger.error(f"Unknown panel output mode: {output}")
+            return None
+
+        close = close.astype(float)
+        if not pd.api.types.is_datetime64_any_dtype(close.index):
+            logger.warning("Index is not datetime; converting to datetime")
+            close.index = pd.to_datetime(close.index, utc=True).tz_localize(None)
+        tickers = list(close.columns)
+        n = len(close)
+
+        # SMA (50-day and 200-day) for every ticker from one cumulative-sum pass
+        cache = IndicatorCache.build({ticker: close[ticker] for ticker in tickers}, [50, 200])
+        rows = cache.values.reshape(len(tickers), 2, n)
+        sma_50 = rows[:, 0, :].T
+        sma_200 = rows[:, 1, :].T
+
+        # RSI (14-period), rolled over all columns at once
+        delta = close.diff()
+        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+        rsi = (100 - (100 / (1 + gain / loss))).to_numpy()
+
+        prices = close.to_numpy()
+        fields = {'Close': prices, 'SMA_50': sma_50, 'SMA_200': sma_200, 'RSI': rsi}
+        predicted = None
+        if predictions is not None:
+            predicted = predictions.reindex(index=close.index, columns=tickers).to_numpy(dtype=float)
+            fields['Predicted_Close'] = predicted
+            logger.info("Incorporated LSTM predictions into panel signals")
+        fields['Signal'] = (rules or DEFAULT_SIGNAL_RULES).evaluate(
+            {'Close': prices, 'SMA_fast': sma_50, 'SMA_slow': sma_200, 'RSI': rsi, 'Predicted_Close': predicted})
+
+        frames = {field: pd.DataFrame(values, index=close.index, columns=tickers) for field, values in fields.items()}
+        panel = pd.concat(frames, axis=1, names=['Field', 'Ticker']).swaplevel(axis=1)
+        panel = panel.reindex(columns=pd.MultiIndex.from_product([tickers, list(fields)], names=['Ticker', 'Field']))
+
+        if output is not None:
+            os.makedirs(output_dir, exist_ok=True)
+        if output == 'combined':
+            path = os.path.join(output_dir, 'signals_panel.csv')
+            panel.stack(level='Ticker').to_csv(path, date_format='%Y-%m-%d')
+            logger.info(f"Calculated panel indicators for {len(tickers)} tickers, saved to {path}")
+        elif output == 'per_ticker':
+            for ticker in tickers:
+                panel[ticker].to_csv(os.path.join(output_dir, f'{ticker}_signals.csv'), date_format='%Y-%m-%d')
+            logger.info(f"Calculated panel indicators for {len(tickers)} tickers, saved to {output_dir}/<ticker>_signals.csv")
+        return panel
+
+    except Exception as e:
+        logger.error(f"Error calculating panel indicators: {e}")
+        return None
+
 if __name__ == '__main__':
     try:
-        df = pd.read_csv('data/AAPL_historical.csv', index_col='Date', parse_dates=['Date'])
-        # Ensure input index is timezone-naive
-        df.index = pd.to_datetime(df.index, utc=True).tz_localize(None)
+        df = read_frame('data/AAPL_historical.csv')
         df = calculate_indicators(df, prediction_file='data/AAPL_predictions.csv')
         if df is not None:
             # Only include columns that exist in the DataFrame
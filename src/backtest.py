@@ -1,6 +1,7 @@
-import backtrader as bt
-import pandas as pd
+import numpy as np
 import logging
+import math
+import functools
 import os
 import sys
 # Get the current working directory
@@ -8,68 +9,244 @@ current_dir = os.getcwd()
 # Add the parent directory to the path (assuming src is in the same directory as your notebook)
 sys.path.append(current_dir)
 from src.analyze import calculate_indicators
+from src.storage import read_frame
+from src.metrics import timed
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-class SMACrossoverStrategy(bt.Strategy):
-    params = (
-        ('stop_loss', 0.05),  # 5% stop-loss
-        ('take_profit', 0.10),  # 10% take-profit
-    )
+DEFAULT_STOP_LOSS = 0.05  # 5% stop-loss
+DEFAULT_TAKE_PROFIT = 0.10  # 10% take-profit
 
-    def __init__(self):
-        self.order = None
-        self.entry_price = None
-        # Access the signal line directly
-        self.signal = self.datas[0].signal
-        logger.info("Initialized SMACrossoverStrategy")
-
-    def next(self):
-        if self.order:  # Skip if order is pending
-            return
-        # Ensure signal is numeric
-        current_signal = float(self.signal[0]) if self.signal[0] is not None else 0.0
-        if not self.position:
-            if current_signal == 1.0:  # Buy signal
-                self.order = self.buy()
-                self.entry_price = self.datas[0].close[0]
-                logger.info(f"Buy order placed at {self.entry_price}")
-        else:
-            if current_signal == -1.0:  # Sell signal
-                self.order = self.sell()
-                self.entry_price = None
-                logger.info("Sell order placed")
-            else:
-                current_price = self.datas[0].close[0]
-                if self.entry_price:
-                    if current_price <= self.entry_price * (1 - self.params.stop_loss):
-                        self.order = self.sell()
-                        logger.info(f"Stop-loss triggered at {current_price}")
-                    elif current_price >= self.entry_price * (1 + self.params.take_profit):
-                        self.order = self.sell()
-                        logger.info(f"Take-profit triggered at {current_price}")
-
-    def notify_order(self, order):
-        if order.status in [order.Completed]:
+@functools.lru_cache(maxsize=None)
+def _backtrader_classes():
+    """
+    Define the backtrader strategy and data feed on first use.
+
+    backtrader is only imported by the Cerebro path, so the vectorized engine, the optimizer
+    and the web app start without it.
+    """
+    import backtrader as bt
+
+    class SMACrossoverStrategy(bt.Strategy):
+        params = (
+            ('stop_loss', DEFAULT_STOP_LOSS),
+            ('take_profit', DEFAULT_TAKE_PROFIT),
+        )
+
+        def __init__(self):
             self.order = None
+            self.entry_price = None
+            # Access the signal line directly
+            self.signal = self.datas[0].signal
+            logger.info("Initialized SMACrossoverStrategy")
+
+        def next(self):
+            if self.order:  # Skip if order is pending
+                return
+            # Ensure signal is numeric
+            current_signal = float(self.signal[0]) if self.signal[0] is not None else 0.0
+            if not self.position:
+                if current_signal == 1.0:  # Buy signal
+                    self.order = self.buy()
+                    self.entry_price = self.datas[0].close[0]
+                    logger.info(f"Buy order placed at {self.entry_price}")
+            else:
+                if current_signal == -1.0:  # Sell signal
+                    self.order = self.sell()
+                    self.entry_price = None
+                    logger.info("Sell order placed")
+                else:
+                    current_price = self.datas[0].close[0]
+                    if self.entry_price:
+                        if current_price <= self.entry_price * (1 - self.params.stop_loss):
+                            self.order = self.sell()
+                            logger.info(f"Stop-loss triggered at {current_price}")
+                        elif current_price >= self.entry_price * (1 + self.params.take_profit):
+                            self.order = self.sell()
+                            logger.info(f"Take-profit triggered at {current_price}")
+
+        def notify_order(self, order):
+            if order.status in [order.Completed]:
+                self.order = None
+
+    class PandasDataWithSignals(bt.feeds.PandasData):
+        # Define lines for backtrader
+        lines = ('signal',)
+        params = (
+            ('datetime', None),  # Auto-detect datetime column (index)
+            ('open', 'Open'),
+            ('high', 'High'),
+            ('low', 'Low'),
+            ('close', 'Close'),
+            ('volume', 'Volume'),
+            ('signal', 'Signal'),
+        )
+
+    return SMACrossoverStrategy, PandasDataWithSignals
+
+def __getattr__(name):
+    # Keep `from src.backtest import SMACrossoverStrategy` working without importing backtrader eagerly
+    if name == 'SMACrossoverStrategy':
+        return _backtrader_classes()[0]
+    if name == 'PandasDataWithSignals':
+        return _backtrader_classes()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-class PandasDataWithSignals(bt.feeds.PandasData):
-    # Define lines for backtrader
-    lines = ('signal',)
-    params = (
-        ('datetime', None),  # Auto-detect datetime column (index)
-        ('open', 'Open'),
-        ('high', 'High'),
-        ('low', 'Low'),
-        ('close', 'Close'),
-        ('volume', 'Volume'),
-        ('signal', 'Signal'),
+def vectorized_backtest(df, cash=10000.0, commission=0.001,
+                        stop_loss=DEFAULT_STOP_LOSS, take_profit=DEFAULT_TAKE_PROFIT):
+    """
+    Backtest the SMACrossoverStrategy rules with array operations instead of Cerebro.
+
+    Mirrors the backtrader path: orders are decided on a bar's close and filled at the
+    next bar's open, one unit is traded per order (backtrader's default sizer), the
+    stop-loss/take-profit levels are measured from the close of the entry signal bar and
+    commission is charged as a fraction of the fill value.
+
+    Args:
+        df (pd.DataFrame): DataFrame with 'Open', 'Close' and 'Signal' columns and a datetime index.
+        cash (float): Initial capital.
+        commission (float): Trading commission rate.
+        stop_loss (float): Stop-loss fraction below the entry price.
+        take_profit (float): Take-profit fraction above the entry price.
+
+    Returns:
+        dict: final_value, returns, sharpe_ratio and win_rate, as returned by run_backtest.
+    """
+    return simulate_signals(
+        df['Open'].to_numpy(dtype=float),
+        df['Close'].to_numpy(dtype=float),
+        df['Signal'].to_numpy(dtype=float),
+        df.index.year.to_numpy(),
+        cash=cash, commission=commission, stop_loss=stop_loss, take_profit=take_profit
     )
 
-def run_backtest(ticker, cash=10000.0, commission=0.001):
+def simulate_signals(opens, closes, signals, years, cash=10000.0, commission=0.001,
+                     stop_loss=DEFAULT_STOP_LOSS, take_profit=DEFAULT_TAKE_PROFIT):
+    """
+    Array core of vectorized_backtest.
+
+    Args:
+        opens (np.ndarray): Open prices.
+        closes (np.ndarray): Close prices.
+        signals (np.ndarray): Signals per bar (1 buy, -1 sell, 0 hold).
+        years (np.ndarray): Calendar year of each bar, used for the Sharpe ratio.
+        cash (float): Initial capital.
+        commission (float): Trading commission rate.
+        stop_loss (float): Stop-loss fraction below the entry price.
+        take_profit (float): Take-profit fraction above the entry price.
+
+    Returns:
+        dict: final_value, returns, sharpe_ratio and win_rate.
+    """
+    signals = np.nan_to_num(signals)
+    n = len(closes)
+
+    # Index of the next buy/sell signal at or after each bar (n when there is none)
+    bar_index = np.arange(n)
+    next_buy = np.minimum.accumulate(np.where(signals == 1.0, bar_index, n)[::-1])[::-1]
+    next_sell = np.minimum.accumulate(np.where(signals == -1.0, bar_index, n)[::-1])[::-1]
+    next_buy = np.append(next_buy, n)
+    next_sell = np.append(next_sell, n)
+
+    entries, exits = [], []
+    bar = 0
+    while bar < n - 1:
+        entry_signal = next_buy[bar]
+        if entry_signal >= n - 1:
+            break  # No signal left, or the order would never fill
+        entry_fill = entry_signal + 1
+        entry_price = closes[entry_signal]
+
+        # Exit on the first sell signal or stop-loss/take-profit breach while long
+        exit_signal = next_sell[entry_fill]
+        window = closes[entry_fill:exit_signal]
+        hits = np.flatnonzero((window <= entry_price * (1 - stop_loss)) |
+                              (window >= entry_price * (1 + take_profit)))
+        if hits.size:
+            exit_signal = entry_fill + hits[0]
+
+        entries.append(entry_fill)
+        if exit_signal >= n - 1:
+            break  # Position is still open at the end of the data
+        exits.append(exit_signal + 1)
+        bar = exit_signal + 1
+
+    entries = np.array(entries, dtype=int)
+    exits = np.array(exits, dtype=int)
+
+    # Cash moves on fill bars; the position is held from entry fill up to exit fill
+    cash_flow = np.zeros(n)
+    entry_costs = opens[entries] * (1 + commission)
+    exit_proceeds = opens[exits] * (1 - commission)
+    np.add.at(cash_flow, entries, -entry_costs)
+    np.add.at(cash_flow, exits, exit_proceeds)
+    position = np.zeros(n)
+    np.add.at(position, entries, 1.0)
+    np.add.at(position, exits, -1.0)
+    values = cash + np.cumsum(cash_flow) + np.cumsum(position) * closes
+
+    final_value = float(values[-1]) if n else cash
+    returns = math.log(final_value / cash) * 100
+
+    closed = len(exits)
+    pnl = exit_proceeds - entry_costs[:closed]
+    win_rate = (int(np.count_nonzero(pnl >= 0.0)) / closed) * 100 if closed > 0 else 0
+
+    return {
+        'final_value': final_value,
+        'returns': returns,
+        'sharpe_ratio': yearly_sharpe_ratio(values, years, cash),
+        'win_rate': win_rate
+    }
+
+def yearly_sharpe_ratio(values, years, cash, rate=0.01):
+    """
+    Sharpe ratio on calendar-year returns, as backtrader's default SharpeRatio analyzer.
+
+    Args:
+        values (np.ndarray): Portfolio value at each bar's close.
+        years (np.ndarray): Calendar year of each bar.
+        cash (float): Initial capital.
+        rate (float): Annual risk-free rate.
+
+    Returns:
+        float: Sharpe ratio, or None without variation in the yearly returns.
+    """
+    n = len(values)
+    year_end = np.flatnonzero(np.append(years[1:] != years[:-1], True)) if n else np.arange(0)
+    year_values = [cash] + values[year_end].tolist()
+    ret_free = [end / start - 1.0 - rate for start, end in zip(year_values[:-1], year_values[1:])]
+    if not ret_free:
+        return None
+    avg = math.fsum(ret_free) / len(ret_free)
+    dev = math.sqrt(math.fsum((r - avg) ** 2 for r in ret_free) / len(ret_free))
     try:
-        df = pd.read_csv(f'data/{ticker}_historical.csv', index_col='Date', parse_dates=True)
+        return avg / dev
+    except ZeroDivisionError:
+        return None
+
+@timed('run_backtest')
+def run_backtest(ticker, cash=10000.0, commission=0.001, engine='backtrader'):
+    """
+    Backtest the SMA/RSI signal strategy for a ticker.
+
+    Args:
+        ticker (str): Stock ticker (e.g., 'AAPL').
+        cash (float): Initial capital.
+        commission (float): Trading commission rate.
+        engine (str): 'backtrader' to step the strategy through Cerebro, or 'vectorized'
+            to run the equivalent NumPy simulation (much faster for large universes).
+
+    Returns:
+        dict: final_value, returns, sharpe_ratio and win_rate.
+    """
+    try:
+        if engine not in ('backtrader', 'vectorized'):
+            logger.error(f"Unknown backtest engine: {engine}")
+            return None
+
+        df = read_frame(f'data/{ticker}_historical.csv')
         df = calculate_indicators(df)
         if df is None or df.empty:
             logger.error("Failed to load or process data for backtesting")
@@ -77,36 +254,12 @@ def run_backtest(ticker, cash=10000.0, commission=0.001):
 
         # Ensure 'Signal' column is numeric
         df['Signal'] = df['Signal'].astype(float)
-        cerebro = bt.Cerebro()
-        cerebro.addstrategy(SMACrossoverStrategy)
-        cerebro.broker.setcash(cash)
-        cerebro.broker.setcommission(commission=commission)
-
-        # Add data feed
-        data = PandasDataWithSignals(dataname=df)
-        cerebro.adddata(data)
-
-        # Add analyzers
-        cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe')
-        cerebro.addanalyzer(bt.analyzers.Returns, _name='returns')
-        cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name='trades')
-
-        logger.info(f"Starting backtest for {ticker}")
-        results = cerebro.run()
-        strategy = results[0]
-
-        final_value = cerebro.broker.getvalue()
-        returns = strategy.analyzers.returns.get_analysis().get('rtot', 0.0) * 100
-        sharpe = strategy.analyzers.sharpe.get_analysis().get('sharperatio', None)
-        trades = strategy.analyzers.trades.get_analysis()
-        win_rate = (trades.get('won', {}).get('total', 0) / trades.get('total', 1)) * 100 if trades.get('total', 0) > 0 else 0
-
-        result = {
-            'final_value': final_value,
-            'returns': returns,
-            'sharpe_ratio': sharpe,
-            'win_rate': win_rate
-        }
+
+        logger.info(f"Starting {engine} backtest for {ticker}")
+        if engine == 'vectorized':
+            result = vectorized_backtest(df, cash=cash, commission=commission)
+        else:
+            result = cerebro_backtest(df, cash=cash, commission=commission)
         logger.info(f"Backtest complete: {result}")
         return result
 
@@ -114,6 +267,53 @@ def run_backtest(ticker, cash=10000.0, commission=0.001):
         logger.error(f"Error in backtest for {ticker}: {e}")
         return None
 
+def cerebro_backtest(df, cash=10000.0, commission=0.001, **strategy_params):
+    """
+    Run SMACrossoverStrategy over a signals DataFrame with backtrader.
+
+    Args:
+        df (pd.DataFrame): DataFrame with OHLCV and 'Signal' columns.
+        cash (float): Initial capital.
+        commission (float): Trading commission rate.
+        **strategy_params: Overrides for SMACrossoverStrategy.params (stop_loss, take_profit).
+
+    Returns:
+        dict: final_value, returns, sharpe_ratio and win_rate.
+    """
+    import backtrader as bt
+
+    SMACrossoverStrategy, PandasDataWithSignals = _backtrader_classes()
+    cerebro = bt.Cerebro()
+    cerebro.addstrategy(SMACrossoverStrategy, **strategy_params)
+    cerebro.broker.setcash(cash)
+    cerebro.broker.setcommission(commission=commission)
+
+    # Add data feed
+    data = PandasDataWithSignals(dataname=df)
+    cerebro.adddata(data)
+
+    # Add analyzers
+    cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe')
+    cerebro.addanalyzer(bt.analyzers.Returns, _name='returns')
+    cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name='trades')
+
+    results = cerebro.run()
+    strategy = results[0]
+
+    final_value = cerebro.broker.getvalue()
+    returns = strategy.analyzers.returns.get_analysis().get('rtot', 0.0) * 100
+    sharpe = strategy.analyzers.sharpe.get_analysis().get('sharperatio', None)
+    trades = strategy.analyzers.trades.get_analysis()
+    closed = trades.get('total', {}).get('closed', 0)
+    win_rate = (trades.get('won', {}).get('total', 0) / closed) * 100 if closed > 0 else 0
+
+    return {
+        'final_value': final_value,
+        'returns': returns,
+        'sharpe_ratio': sharpe,
+        'win_rate': win_rate
+    }
+
 if __name__ == '__main__':
     result = run_backtest('AAPL')
     if result:
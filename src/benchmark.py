@@ -0,0 +1,435 @@
+import logging
+import argparse
+import json
+import os
+import platform
+import signal
+import socket
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+# Get the current working directory
+current_dir = os.getcwd()
+# Add the parent directory to the path
+sys.path.append(current_dir)
+from src.synthetic import generate_ohlcv, write_synthetic
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BENCHMARK_DIR = os.path.join(current_dir, 'benchmarks')
+HISTORY_FILE = os.path.join(BENCHMARK_DIR, 'history.json')
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+DEFAULT_TOLERANCE = 0.25
+
+# Imports timed in a fresh interpreter: what a web worker or batch script pays before doing any work
+STARTUP_CASES = {
+    'startup_app': 'from app import create_app; create_app()',
+    'startup_backtest': 'import src.backtest',
+    'startup_optimize': 'import src.optimize',
+    'startup_ml_predict': 'import src.ml_predict',
+}
+HEAVY_MODULES = ('pandas', 'numpy', 'scipy', 'sklearn', 'backtrader', 'tensorflow', 'keras', 'plotly', 'yfinance')
+
+def _time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+        if result is None or result is False:
+            raise RuntimeError(f"{getattr(func, '__name__', 'benchmark')} returned {result}")
+    return {'best': min(times), 'median': statistics.median(times), 'repeat': repeat}
+
+def import_profile(statement, cwd=None):
+    """
+    Run statement in a new interpreter with `python -X importtime` and parse the report.
+
+    Args:
+        statement (str): Python code to run, e.g. 'import src.backtest'.
+        cwd (str, optional): Project directory the statement runs from (defaults to the current one).
+
+    Returns:
+        dict: 'total' import time in seconds, 'wall' time of the whole process, and 'packages',
+            the cumulative import time in seconds of every top-level package that was loaded.
+    """
+    code = f'import sys, os; sys.path.append(os.getcwd()); {statement}'
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True,
+                            cwd=cwd or os.getcwd())
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{statement!r} failed: {result.stderr.strip().splitlines()[-1]}")
+    total = 0
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        total += int(self_us)
+        package = name.strip().split('.')[0]
+        # Outermost import of a package carries its cumulative time
+        packages[package] = max(packages.get(package, 0), int(cumulative_us) / 1e6)
+    return {'total': total / 1e6, 'wall': wall, 'packages': packages}
+
+def _time_startup(statement, repeat):
+    profiles = [import_profile(statement) for _ in range(repeat)]
+    totals = [profile['total'] for profile in profiles]
+    heavy = sorted(package for package in profiles[0]['packages'] if package in HEAVY_MODULES)
+    return {'best': min(totals), 'median': statistics.median(totals), 'repeat': repeat, 'heavy_modules': heavy}
+
+def benchmark_cases(ticker, client):
+    """
+    Return the benchmarked operations, keyed by name, for the synthetic ticker.
+
+    Args:
+        ticker (str): Ticker written by write_synthetic in the current directory's data/.
+        client: Flask test client.
+    """
+    from src.storage import read_frame
+    from src.analyze import calculate_indicators
+    from src.backtest import run_backtest
+    from src.optimize import optimize_strategy
+    from src.ml_predict import prepare_data
+    from src.check_signals import check_signals_file
+
+    df = read_frame(f'data/{ticker}_historical.csv')
+    return {
+        'calculate_indicators': lambda: calculate_indicators(df.copy()),
+        'run_backtest': lambda: run_backtest(ticker),
+        'run_backtest_vectorized': lambda: run_backtest(ticker, engine='vectorized'),
+        'optimize_strategy_vectorized': lambda: optimize_strategy(ticker, engine='vectorized'),
+        'prepare_data': lambda: prepare_data(df, lookback=60)[3],
+        'check_signals_file': lambda: check_signals_file('data/signals.csv'),
+        'index_route': lambda: client.get('/').status_code == 200,
+    }
+
+def run_suite(years=2, freq='D', tickers=1, repeat=3, seed=0, only=None):
+    """
+    Time the main pipeline operations on deterministic synthetic data.
+
+    Runs in a temporary working directory so no project data files are touched. Startup cases
+    time the imports of a fresh interpreter and record which heavy packages they load.
+
+    Args:
+        years (float): Years of synthetic history.
+        freq (str): Bar frequency (see synthetic.BARS_PER_DAY).
+        tickers (int): Number of synthetic tickers written; the first one is benchmarked.
+        repeat (int): Timed runs per benchmark; best and median are reported.
+        seed (int): Generator seed.
+        only (list, optional): Names of the benchmarks to run.
+
+    Returns:
+        dict: Run record with 'config', 'machine' and per-benchmark 'results' in seconds.
+    """
+    from app import create_app
+
+    results = {}
+    for name, statement in STARTUP_CASES.items():
+        if only and name not in only:
+            continue
+        results[name] = _time_startup(statement, repeat)
+        logger.info(f"{name}: best {results[name]['best'] * 1000:.2f} ms, heavy modules {results[name]['heavy_modules']}")
+
+    frames = generate_ohlcv(tickers=tickers, years=years, freq=freq, seed=seed)
+    ticker = next(iter(frames))
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    try:
+        write_synthetic(frames, 'data')
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(workdir, 'trades.db')}",
+                          'TESTING': True})
+        cases = benchmark_cases(ticker, app.test_client())
+        # The index route and check_signals_file read the signals written by calculate_indicators
+        cases['calculate_indicators']()
+        for name, func in cases.items():
+            if only and name not in only:
+                continue
+            results[name] = _time(func, repeat)
+            logger.info(f"{name}: best {results[name]['best'] * 1000:.2f} ms")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'config': {'years': years, 'freq': freq, 'tickers': tickers, 'rows': len(frames[ticker]),
+                   'repeat': repeat, 'seed': seed},
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'cpus': os.cpu_count()},
+        'results': results,
+    }
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+@contextmanager
+def gunicorn_server(workdir, ready_path='/api/chart?points=10', **env):
+    """
+    Run the app with gunicorn (via run.py) in workdir and yield its base URL.
+
+    The trade database is created in workdir, and env overrides the server environment
+    (e.g. WEB_CONCURRENCY); everything else keeps run.py's defaults.
+    """
+    project_dir = os.getcwd()
+    port = _free_port()
+    env = dict(os.environ, SERVER='gunicorn', PORT=str(port), PYTHONPATH=project_dir,
+               DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'trades.db')}", **env)
+    env.pop('PIPELINE_TICKERS', None)
+    server = subprocess.Popen([sys.executable, os.path.join(project_dir, 'run.py')], cwd=workdir, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        deadline = time.time() + 60
+        while True:
+            try:
+                with urllib.request.urlopen(base_url + ready_path, timeout=5) as response:
+                    response.read()
+                break
+            except OSError:
+                if server.poll() is not None or time.time() > deadline:
+                    raise RuntimeError(f"gunicorn did not start (exit code {server.poll()})")
+                time.sleep(0.2)
+        yield base_url
+    finally:
+        # Quick shutdown: a graceful one would wait for open event streams to end
+        server.send_signal(signal.SIGINT)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+def load_test(workers, threads=1, duration=5.0, concurrency=16, path='/api/chart?points=1000', years=10,
+              preload=True):
+    """
+    Serve synthetic signals with gunicorn (via run.py) and measure throughput under load.
+
+    Args:
+        workers (int): Gunicorn worker processes.
+        threads (int): Threads per worker (gthread worker only).
+        duration (float): Seconds of load after the server is ready.
+        concurrency (int): Concurrent client threads.
+        path (str): Request path.
+        years (float): Years of daily synthetic signals served.
+        preload (bool): Preload the app and chart data in the gunicorn master.
+
+    Returns:
+        dict: 'requests', 'errors', 'rps' and 'p50'/'p95' latency in seconds.
+    """
+    from src.analyze import calculate_indicators
+
+    workdir = tempfile.mkdtemp()
+    calculate_indicators(generate_ohlcv(years=years)['SYN000'], output_file=os.path.join(workdir, 'data', 'signals.csv'))
+    try:
+        with gunicorn_server(workdir, WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(threads),
+                             GUNICORN_PRELOAD=str(preload)) as base_url:
+            url = base_url + path
+
+            def client(stop_at):
+                latencies, errors = [], 0
+                while time.perf_counter() < stop_at:
+                    start = time.perf_counter()
+                    try:
+                        with urllib.request.urlopen(url, timeout=30) as response:
+                            response.read()
+                        latencies.append(time.perf_counter() - start)
+                    except OSError:
+                        errors += 1
+                return latencies, errors
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                outcomes = list(executor.map(client, [start + duration] * concurrency))
+            elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    latencies = sorted(latency for outcome in outcomes for latency in outcome[0])
+    result = {'workers': workers, 'threads': threads, 'requests': len(latencies),
+              'errors': sum(outcome[1] for outcome in outcomes), 'rps': len(latencies) / elapsed,
+              'p50': statistics.median(latencies) if latencies else None,
+              'p95': latencies[int(len(latencies) * 0.95)] if latencies else None}
+    logger.info(f"{workers} workers x {threads} threads: {result['rps']:.1f} req/s, {result['errors']} errors")
+    return result
+
+def stream_test(clients=300, timeout=30.0, years=2, **env):
+    """
+    Hold many concurrent /stream clients open against gunicorn with run.py's settings.
+
+    Every client opens an event stream; once all have an answer, one trade is saved and
+    each connected client must receive it. A chart request is timed while the streams
+    are open.
+
+    Args:
+        clients (int): Concurrent stream clients.
+        timeout (float): Seconds allowed for connecting and for delivering the trade.
+        years (float): Years of daily synthetic signals served.
+        **env: Server environment overrides, e.g. GUNICORN_WORKER_CLASS='gthread'.
+
+    Returns:
+        dict: 'clients', 'connected' (200 responses), 'refused' (503), 'received' (clients
+            that got the trade) and 'chart_seconds'.
+    """
+    from src.analyze import calculate_indicators
+
+    workdir = tempfile.mkdtemp()
+    calculate_indicators(generate_ohlcv(years=years)['SYN000'], output_file=os.path.join(workdir, 'data', 'signals.csv'))
+    statuses, received = [], []
+    lock = threading.Lock()
+    answered = threading.Semaphore(0)
+    try:
+        with gunicorn_server(workdir, **env) as base_url:
+            port = int(base_url.rsplit(':', 1)[1])
+
+            def client():
+                reported = False
+                try:
+                    with socket.create_connection(('127.0.0.1', port), timeout=timeout) as sock:
+                        sock.sendall(b'GET /stream HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n')
+                        reader = sock.makefile('rb')
+                        status = int(reader.readline().split()[1])
+                        with lock:
+                            statuses.append(status)
+                        answered.release()
+                        reported = True
+                        if status != 200:
+                            return
+                        for line in reader:
+                            if line.startswith(b'event: trade'):
+                                with lock:
+                                    received.append(1)
+                                return
+                except (OSError, ValueError, IndexError):
+                    pass
+                finally:
+                    if not reported:
+                        answered.release()
+
+            threads = [threading.Thread(target=client, daemon=True) for _ in range(clients)]
+            for thread in threads:
+                thread.start()
+            deadline = time.time() + timeout
+            for _ in range(clients):
+                if not answered.acquire(timeout=max(deadline - time.time(), 0.01)):
+                    break
+
+            start = time.perf_counter()
+            with urllib.request.urlopen(base_url + '/api/chart?points=1000', timeout=timeout) as response:
+                response.read()
+            chart_seconds = time.perf_counter() - start
+
+            request = urllib.request.Request(base_url + '/save_trade', method='POST', data=json.dumps(
+                {'ticker': 'SYN000', 'signal': 1, 'price': 100.0}).encode(), headers={'Content-Type': 'application/json'})
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+            deadline = time.time() + timeout
+            for thread in threads:
+                thread.join(timeout=max(deadline - time.time(), 0.01))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {'clients': clients, 'connected': statuses.count(200), 'refused': statuses.count(503),
+              'received': len(received), 'chart_seconds': chart_seconds}
+    logger.info(f"{clients} stream clients: {result['connected']} connected, {result['refused']} refused, "
+                f"{result['received']} received the trade")
+    return result
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+def append_history(record, history_file=HISTORY_FILE):
+    """Append a run record to the JSON history file."""
+    history = []
+    if os.path.exists(history_file):
+        with open(history_file) as f:
+            history = json.load(f)
+    history.append(record)
+    os.makedirs(os.path.dirname(history_file), exist_ok=True)
+    with open(history_file, 'w') as f:
+        json.dump(history, f, indent=2)
+
+def save_baseline(record, baseline_file=BASELINE_FILE):
+    os.makedirs(os.path.dirname(baseline_file), exist_ok=True)
+    with open(baseline_file, 'w') as f:
+        json.dump(record, f, indent=2)
+
+def compare_to_baseline(record, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare best times of a run with a baseline run.
+
+    Args:
+        record (dict): Run record from run_suite.
+        baseline (dict): Baseline run record.
+        tolerance (float): Allowed slowdown before a benchmark counts as a regression
+            (0.25 = 25% slower).
+
+    Returns:
+        dict: Per benchmark: 'best', 'baseline', 'ratio' and 'regression'. Benchmarks missing
+            from the baseline have no ratio.
+    """
+    if baseline.get('config') != record.get('config'):
+        logger.warning("Baseline was recorded with a different configuration; ratios may not be comparable")
+    comparison = {}
+    for name, result in record['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            comparison[name] = {'best': result['best'], 'baseline': None, 'ratio': None, 'regression': False}
+            continue
+        ratio = result['best'] / base['best']
+        comparison[name] = {'best': result['best'], 'baseline': base['best'], 'ratio': ratio,
+                            'regression': ratio > 1 + tolerance}
+    return comparison
+
+if __name__ == '__main__':
+    # Usage: python src/benchmark.py [--years 2] [--freq D] [--tickers 1] [--repeat 3] [--save-baseline]
+    parser = argparse.ArgumentParser(description='Benchmark the trading pipeline on synthetic data.')
+    parser.add_argument('--years', type=float, default=2)
+    parser.add_argument('--freq', default='D')
+    parser.add_argument('--tickers', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='*')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--load-test', type=int, nargs='+', metavar='WORKERS',
+                        help='Instead of the suite, load test gunicorn with each worker count')
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--duration', type=float, default=5.0)
+    args = parser.parse_args()
+
+    if args.load_test:
+        for workers in args.load_test:
+            result = load_test(workers, threads=args.threads, duration=args.duration)
+            print(f"{workers:3d} workers x {args.threads} threads: {result['rps']:8.1f} req/s  "
+                  f"p50 {result['p50'] * 1000:.1f} ms  p95 {result['p95'] * 1000:.1f} ms  {result['errors']} errors")
+        sys.exit(0)
+
+    record = run_suite(args.years, args.freq, args.tickers, args.repeat, only=args.only)
+    append_history(record)
+    if args.save_baseline or not os.path.exists(BASELINE_FILE):
+        save_baseline(record)
+        print(f"Saved baseline to {BASELINE_FILE}")
+
+    with open(BASELINE_FILE) as f:
+        comparison = compare_to_baseline(record, json.load(f), args.tolerance)
+    for name, row in comparison.items():
+        ratio = f"{row['ratio']:.2f}x baseline" if row['ratio'] is not None else 'no baseline'
+        flag = '  REGRESSION' if row['regression'] else ''
+        print(f"{name:32s} {row['best'] * 1000:10.2f} ms  {ratio}{flag}")
+    if any(row['regression'] for row in comparison.values()):
+        sys.exit(1)
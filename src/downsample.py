@@ -0,0 +1,87 @@
+import numpy as np
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+LINE_SERIES = ['Close', 'SMA_50', 'SMA_200', 'Predicted_Close']
+
+def lttb_indices(x, y, threshold):
+    """
+    Select points with the Largest-Triangle-Three-Buckets algorithm.
+
+    The first and last points are always kept; every bucket in between contributes the point
+    that forms the largest triangle with the previously selected point and the average of the
+    next bucket, which preserves peaks and troughs far better than taking every n-th row.
+
+    Args:
+        x (np.ndarray): Increasing x coordinates (e.g., seconds since the first bar).
+        y (np.ndarray): Values at x, without NaN.
+        threshold (int): Number of points to return.
+
+    Returns:
+        np.ndarray: Sorted positions of the selected points.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket boundaries for the n - 2 interior points
+    edges = (np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def _timestamps(index):
+    return np.datetime_as_string(index.to_numpy(dtype='datetime64[s]'), unit='s').tolist()
+
+def downsample_signals(df, points=1000, start=None, end=None):
+    """
+    Reduce a signals DataFrame to at most `points` points per line series for charting.
+
+    Args:
+        df (pd.DataFrame): Signals with a sorted DatetimeIndex (as written by calculate_indicators).
+        points (int): Target number of points per line series.
+        start (pd.Timestamp, optional): First date to include.
+        end (pd.Timestamp, optional): Last date to include.
+
+    Returns:
+        dict: 'rows' (rows in the date range), 'series' mapping each line column to its
+            downsampled {'x', 'y'} lists, and 'signals' with every Buy and Sell point.
+    """
+    df = df.loc[start:end]
+    seconds = (df.index.to_numpy(dtype='datetime64[ns]').astype(np.int64) // 10**9).astype(np.float64)
+    signal = df['Signal'].to_numpy()
+    signal_positions = np.flatnonzero((signal == 1) | (signal == -1))
+
+    series = {}
+    for column in LINE_SERIES:
+        if column not in df.columns:
+            continue
+        values = df[column].to_numpy(dtype=np.float64)
+        valid = np.flatnonzero(~np.isnan(values))
+        keep = valid[lttb_indices(seconds[valid], values[valid], points)]
+        if column == 'Close':
+            # Signal markers sit on the Close line, so their bars are always part of it
+            keep = np.union1d(keep, signal_positions[~np.isnan(values[signal_positions])])
+        series[column] = {'x': _timestamps(df.index[keep]), 'y': values[keep].tolist()}
+
+    signals = {}
+    for name, value in (('buy', 1), ('sell', -1)):
+        marked = df[df['Signal'] == value]
+        signals[name] = {'x': _timestamps(marked.index), 'y': marked['Close'].tolist()}
+
+    logger.info(f"Downsampled {len(df)} rows to {len(series.get('Close', {'x': []})['x'])} Close points")
+    return {'rows': len(df), 'series': series, 'signals': signals}
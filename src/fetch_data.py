@@ -1,27 +1,149 @@
 import yfinance as yf
 import pandas as pd
+import logging
 import os
-from datetime import datetime
-
-# Define the stock ticker and date range
-ticker = "AAPL"
-start_date = "2023-01-01"
-end_date = datetime.now().strftime("%Y-%m-%d")  # Dynamic end date (e.g., 2025-09-10)
-
-try:
-    # Fetch data from Yahoo Finance
-    data = yf.download(ticker, start=start_date, end=end_date)
-
-    # Select relevant columns
-    data = data[['Open', 'High', 'Low', 'Close', 'Volume']]
-
-    # Ensure the data directory exists
-    os.makedirs("data", exist_ok=True)
-
-    # Save to CSV
-    csv_path = os.path.join("data", "raw_data.csv")
-    data.to_csv(csv_path)
-    print(f"Data fetched and saved to {csv_path}")
-except Exception as e:
-    print(f"Error fetching data: {str(e)}")
-    raise  # Re-raise to fail the Dockerfile build if it fails
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from retrying import Retrying
+# Get the current working directory
+current_dir = os.getcwd()
+# Add the parent directory to the path
+sys.path.append(current_dir)
+from src.storage import frame_exists, read_frame, write_frame, append_frame
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_START_DATE = '2023-01-01'
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+class YahooProvider:
+    """Daily OHLCV bars from Yahoo Finance."""
+
+    def fetch(self, ticker, start, end):
+        """
+        Download bars for one ticker.
+
+        Args:
+            ticker (str): Stock ticker (e.g., 'AAPL').
+            start (str): First date, inclusive ('YYYY-MM-DD').
+            end (str): Last date, exclusive ('YYYY-MM-DD').
+
+        Returns:
+            pd.DataFrame: OHLCV columns indexed by 'Date'.
+        """
+        data = yf.download(ticker, start=start, end=end, progress=False)
+        if isinstance(data.columns, pd.MultiIndex):
+            # Recent yfinance versions return (Price, Ticker) columns even for one ticker
+            data.columns = data.columns.get_level_values(0)
+        data.index.name = 'Date'
+        return data[PRICE_COLUMNS]
+
+class CSVProvider:
+    """
+    Stand-in provider that serves bars from local {ticker}.csv files, for tests and benchmarks.
+
+    Args:
+        directory (str): Directory holding one CSV per ticker with a 'Date' column.
+        delay (float): Seconds to sleep per request, to simulate network latency.
+    """
+
+    def __init__(self, directory, delay=0.0):
+        self.directory = directory
+        self.delay = delay
+
+    def fetch(self, ticker, start, end):
+        if self.delay:
+            time.sleep(self.delay)
+        df = pd.read_csv(os.path.join(self.directory, f'{ticker}.csv'), index_col='Date', parse_dates=['Date'])
+        df = df[(df.index >= pd.Timestamp(start)) & (df.index < pd.Timestamp(end))]
+        return df[PRICE_COLUMNS]
+
+def update_ticker(ticker, provider, data_dir='data', start_date=DEFAULT_START_DATE, end_date=None,
+                  retries=3, backoff=1000):
+    """
+    Fetch the bars missing from data/{ticker}_historical.csv and merge them into it.
+
+    Args:
+        ticker (str): Stock ticker (e.g., 'AAPL').
+        provider: Object with a fetch(ticker, start, end) method returning an OHLCV DataFrame.
+        data_dir (str): Directory of the historical files.
+        start_date (str): First date to fetch when the ticker has no local data.
+        end_date (str, optional): Exclusive end date. Defaults to today.
+        retries (int): Attempts per download.
+        backoff (int): Initial retry wait in milliseconds, doubled on each failure.
+
+    Returns:
+        int: Number of new rows stored.
+    """
+    csv_path = os.path.join(data_dir, f'{ticker}_historical.csv')
+    end_date = end_date or datetime.now().strftime('%Y-%m-%d')
+
+    existing = read_frame(csv_path) if frame_exists(csv_path) else None
+    start = start_date
+    if existing is not None and not existing.empty:
+        # Only the range after the last stored bar is requested
+        start = (existing.index.max() + timedelta(days=1)).strftime('%Y-%m-%d')
+    if pd.Timestamp(start) >= pd.Timestamp(end_date):
+        logger.info(f"{ticker} is up to date")
+        return 0
+
+    retryer = Retrying(stop_max_attempt_number=retries, wait_exponential_multiplier=backoff,
+                       wait_exponential_max=backoff * 16)
+    data = retryer.call(provider.fetch, ticker, start, end_date)
+    data = data.dropna(subset=['Close'])
+    data.index = pd.to_datetime(data.index, utc=True).tz_localize(None)
+    if existing is not None and not existing.empty:
+        data = data[data.index > existing.index.max()]
+    if data.empty:
+        logger.info(f"No new bars for {ticker} between {start} and {end_date}")
+        return 0
+
+    if existing is None:
+        write_frame(data, csv_path)
+    else:
+        append_frame(data, csv_path)
+    logger.info(f"Stored {len(data)} new bars for {ticker} in {csv_path}")
+    return len(data)
+
+def fetch_tickers(tickers, provider=None, data_dir='data', start_date=DEFAULT_START_DATE, end_date=None,
+                  max_workers=4, retries=3, backoff=1000):
+    """
+    Bring the historical files of several tickers up to date concurrently.
+
+    Args:
+        tickers (list): Stock tickers (e.g., ['AAPL', 'MSFT']).
+        provider: Data provider (see update_ticker). Defaults to YahooProvider.
+        data_dir (str): Directory of the historical files.
+        start_date (str): First date to fetch for tickers without local data.
+        end_date (str, optional): Exclusive end date. Defaults to today.
+        max_workers (int): Maximum number of concurrent downloads.
+        retries (int): Attempts per download.
+        backoff (int): Initial retry wait in milliseconds.
+
+    Returns:
+        dict: Number of new rows per ticker, or None for tickers that failed.
+    """
+    provider = provider or YahooProvider()
+    os.makedirs(data_dir, exist_ok=True)
+
+    def update(ticker):
+        try:
+            return update_ticker(ticker, provider, data_dir, start_date, end_date, retries, backoff)
+        except Exception as e:
+            logger.error(f"Error fetching data for {ticker}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tickers)))) as executor:
+        results = dict(zip(tickers, executor.map(update, tickers)))
+    return results
+
+if __name__ == '__main__':
+    # Usage: python src/fetch_data.py [TICKER ...]
+    results = fetch_tickers(sys.argv[1:] or ['AAPL'])
+    for ticker, rows in results.items():
+        print(f"{ticker}: {'failed' if rows is None else f'{rows} new rows'}")
+    if any(rows is None for rows in results.values()):
+        sys.exit(1)  # Fail the Docker build if a download failed
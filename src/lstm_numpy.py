@@ -0,0 +1,150 @@
+import numpy as np
+import logging
+import json
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def _sigmoid(x):
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'tanh': np.tanh,
+    'sigmoid': _sigmoid,
+    'relu': lambda x: np.maximum(x, 0.0),
+}
+
+def export_lstm_weights(model):
+    """
+    Convert a Keras LSTM/Dense network (as built by build_lstm_model) to plain arrays.
+
+    Dropout and input layers are skipped, since they are identities at inference time.
+
+    Args:
+        model (keras.Model): Trained Sequential model.
+
+    Returns:
+        list: One dict per layer with 'type', its settings and 'weights' (list of arrays).
+    """
+    layers = []
+    for layer in model.layers:
+        kind = type(layer).__name__
+        config = layer.get_config()
+        weights = [np.asarray(w, dtype=np.float64) for w in layer.get_weights()]
+        if kind == 'LSTM':
+            if config.get('recurrent_activation', 'sigmoid') != 'sigmoid' or not config.get('use_bias', True):
+                raise ValueError(f"Unsupported LSTM configuration in layer {layer.name}")
+            layers.append({'type': 'lstm', 'activation': config.get('activation', 'tanh'),
+                           'return_sequences': config.get('return_sequences', False), 'weights': weights})
+        elif kind == 'Dense':
+            if not config.get('use_bias', True):
+                weights.append(np.zeros(weights[0].shape[1]))
+            layers.append({'type': 'dense', 'activation': config.get('activation', 'linear'), 'weights': weights})
+        elif kind not in ('Dropout', 'InputLayer'):
+            raise ValueError(f"Unsupported layer type {kind}")
+    return layers
+
+def save_weights(layers, path):
+    """Save exported layers to a .npz file (arrays plus a JSON layer spec)."""
+    arrays = {}
+    spec = []
+    for i, layer in enumerate(layers):
+        spec.append({name: value for name, value in layer.items() if name != 'weights'})
+        spec[-1]['n_weights'] = len(layer['weights'])
+        for j, weights in enumerate(layer['weights']):
+            arrays[f'layer{i}_{j}'] = weights
+    with open(path, 'wb') as f:
+        np.savez(f, spec=np.array(json.dumps(spec)), **arrays)
+
+def load_weights(path):
+    """Load layers saved with save_weights."""
+    with np.load(path) as data:
+        spec = json.loads(str(data['spec']))
+        return [dict(layer, weights=[data[f'layer{i}_{j}'] for j in range(layer.pop('n_weights'))])
+                for i, layer in enumerate(spec)]
+
+class NumpyLSTM:
+    """
+    Pure-NumPy forward pass of an exported LSTM/Dense network.
+
+    Several models with the same architecture (e.g. one per ticker) can be stacked, so a
+    single pass predicts all of them: every weight gets a leading model axis and inputs are
+    shaped (models, samples, lookback, features).
+
+    Args:
+        layers (list): Exported layers of one model, or a list of such lists to stack.
+    """
+
+    def __init__(self, layers):
+        models = layers if layers and isinstance(layers[0], list) else [layers]
+        first = models[0]
+        for other in models[1:]:
+            shapes = [[w.shape for w in layer['weights']] for layer in other]
+            if shapes != [[w.shape for w in layer['weights']] for layer in first]:
+                raise ValueError("Stacked models must share the same architecture")
+        self.n_models = len(models)
+        self.layers = []
+        for position, layer in enumerate(first):
+            stacked = [np.stack([model[position]['weights'][j] for model in models])
+                       for j in range(len(layer['weights']))]
+            self.layers.append(dict(layer, weights=stacked))
+
+    @classmethod
+    def from_keras(cls, model):
+        return cls(export_lstm_weights(model))
+
+    @classmethod
+    def load(cls, path):
+        return cls(load_weights(path))
+
+    def predict(self, X):
+        """
+        Run the network.
+
+        Args:
+            X (np.ndarray): Inputs (samples, lookback, features) for a single model, or
+                (models, samples, lookback, features) for stacked models.
+
+        Returns:
+            np.ndarray: Outputs (samples, units) or (models, samples, units).
+        """
+        X = np.asarray(X, dtype=np.float64)
+        single = X.ndim == 3
+        if single:
+            X = X[np.newaxis]
+        if X.shape[0] != self.n_models:
+            raise ValueError(f"Expected inputs for {self.n_models} models, got {X.shape[0]}")
+
+        out = X
+        for layer in self.layers:
+            activation = ACTIVATIONS[layer['activation']]
+            if layer['type'] == 'lstm':
+                out = self._lstm(out, *layer['weights'], activation, layer['return_sequences'])
+            else:
+                kernel, bias = layer['weights']
+                out = activation(np.einsum('m...i,mij->m...j', out, kernel) + bias.reshape(
+                    (self.n_models,) + (1,) * (out.ndim - 2) + (-1,)))
+        return out[0] if single else out
+
+    @staticmethod
+    def _lstm(X, kernel, recurrent_kernel, bias, activation, return_sequences):
+        n_models, samples, steps, _ = X.shape
+        units = recurrent_kernel.shape[1]
+        # Inputs are projected one time step at a time: projecting all steps at once would hold
+        # a (models, samples, steps, 4 * units) array, several times the size of the inputs
+        bias = bias[:, np.newaxis, :]
+        h = np.zeros((n_models, samples, units))
+        c = np.zeros((n_models, samples, units))
+        sequence = np.empty((n_models, samples, steps, units)) if return_sequences else None
+        for t in range(steps):
+            z = np.matmul(X[:, :, t], kernel) + bias + np.matmul(h, recurrent_kernel)
+            i = _sigmoid(z[..., :units])
+            f = _sigmoid(z[..., units:2 * units])
+            g = activation(z[..., 2 * units:3 * units])
+            o = _sigmoid(z[..., 3 * units:])
+            c = f * c + i * g
+            h = o * activation(c)
+            if return_sequences:
+                sequence[:, :, t] = h
+        return sequence if return_sequences else h
@@ -0,0 +1,223 @@
+import logging
+import bisect
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = []
+    for name, value in pairs:
+        value = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{name}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic count per label set."""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [(self.name, key, (), value) for key, value in sorted(values.items())]
+
+    def snapshot(self):
+        with self._lock:
+            return {_format_labels(key): value for key, value in sorted(self._values.items())}
+
+class Histogram:
+    """
+    Distribution of observed values (e.g., durations in seconds) per label set.
+
+    Args:
+        name (str): Metric name.
+        help_text (str): Description shown in the exposition output.
+        buckets (tuple): Increasing upper bounds; a +Inf bucket is always added.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        # Index of the first bucket the value falls in; cumulative counts are built when rendering
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {'buckets': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            entry['buckets'][position] += 1
+            entry['sum'] += value
+            entry['count'] += 1
+
+    def samples(self):
+        with self._lock:
+            values = {key: dict(entry, buckets=list(entry['buckets'])) for key, entry in self._values.items()}
+        samples = []
+        for key, entry in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), entry['buckets']):
+                cumulative += count
+                samples.append((f'{self.name}_bucket', key, (('le', _format_value(float(bound))),), cumulative))
+            samples.append((f'{self.name}_sum', key, (), entry['sum']))
+            samples.append((f'{self.name}_count', key, (), entry['count']))
+        return samples
+
+    def snapshot(self):
+        with self._lock:
+            return {_format_labels(key): {'count': entry['count'], 'sum': entry['sum']}
+                    for key, entry in sorted(self._values.items())}
+
+class MetricsRegistry:
+    """
+    Process-wide collection of metrics, rendered in the Prometheus text exposition format.
+
+    Metrics are kept per process: with several gunicorn workers each worker reports its own.
+
+    Args:
+        enabled (bool): Record observations; when False, timed() and timer() only call through.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, help_text=''):
+        """Return the counter called name, creating it on first use."""
+        return self._get(Counter, name, help_text)
+
+    def histogram(self, name, help_text='', buckets=DEFAULT_BUCKETS):
+        """Return the histogram called name, creating it on first use."""
+        return self._get(Histogram, name, help_text, buckets=buckets)
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        for name, metric in metrics:
+            lines.append(f'# HELP {name} {metric.help}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for sample_name, key, extra, value in metric.samples():
+                lines.append(f'{sample_name}{_format_labels(key, extra)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """
+        Return the current values for use in batch scripts.
+
+        Returns:
+            dict: Per metric name, a dict keyed by the formatted label set, e.g.
+                {'stage_duration_seconds': {'{stage="run_backtest"}': {'count': 1, 'sum': 0.13}}}.
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        return {name: metric.snapshot() for name, metric in metrics}
+
+    def reset(self):
+        """Drop all recorded metrics."""
+        with self._lock:
+            self._metrics = {}
+
+REGISTRY = MetricsRegistry(enabled=os.environ.get('METRICS_ENABLED', '1').lower() not in ('0', 'false', 'no'))
+
+def enable():
+    REGISTRY.enabled = True
+
+def disable():
+    REGISTRY.enabled = False
+
+@contextmanager
+def timer(name, help_text='', **labels):
+    """
+    Observe the duration of a block, in seconds, in the histogram called name.
+
+    Example:
+        with timer('csv_load_seconds', source='csv'):
+            df = pd.read_csv(path)
+    """
+    if not REGISTRY.enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.histogram(name, help_text).observe(time.perf_counter() - start, **labels)
+
+def timed(stage):
+    """
+    Decorator recording a function's duration in stage_duration_seconds{stage=...}.
+
+    Calls that raise or return None (how this project's functions report failure) also
+    increment stage_failures_total. When metrics are disabled the wrapper only checks a flag.
+
+    Args:
+        stage (str): Stage label, usually the function name.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not REGISTRY.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            finally:
+                REGISTRY.histogram('stage_duration_seconds', 'Duration of pipeline stages in seconds.').observe(
+                    time.perf_counter() - start, stage=stage)
+                if result is None:
+                    REGISTRY.counter('stage_failures_total', 'Stage calls that raised or returned None.').inc(
+                        stage=stage)
+        return wrapper
+    return decorator
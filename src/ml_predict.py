@@ -1,48 +1,100 @@
 import pandas as pd
 import numpy as np
 import logging
-from sklearn.preprocessing import MinMaxScaler
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Dropout
+from numpy.lib.stride_tricks import sliding_window_view
 import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+# Get the current working directory
+current_dir = os.getcwd()
+# Add the parent directory to the path (assuming src is in the same directory as your notebook)
+sys.path.append(current_dir)
+from src.storage import read_frame, write_frame
+from src.model_registry import ModelRegistry, data_hash
+from src.lstm_numpy import NumpyLSTM, export_lstm_weights
+from src.metrics import timed
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def prepare_data(df, lookback=60, target_col='Close'):
+def prepare_data(df, lookback=60, target_col='Close', feature_cols=None, scaler=None):
     """
     Prepare data for LSTM model.
     
+    X is a read-only strided view into the scaled data rather than a copy, so building the
+    sequences takes constant time and memory regardless of lookback.
+
     Args:
         df (pd.DataFrame): DataFrame with stock data (must include target_col).
         lookback (int): Number of time steps to look back for prediction.
         target_col (str): Column to predict (e.g., 'Close').
+        feature_cols (list, optional): Input feature columns. Defaults to [target_col]; the
+            target is always the first feature so the scaler can invert predictions.
+        scaler (MinMaxScaler, optional): Already fitted scaler to apply instead of fitting one.
     
     Returns:
-        tuple: Scaled data, scaler, and sequences (X, y).
+        tuple: Scaled data, scaler, and sequences X (samples, lookback, features) and y.
     """
     try:
-        if target_col not in df.columns:
-            logger.error(f"{target_col} column missing in DataFrame")
+        feature_cols = [target_col] + [col for col in (feature_cols or []) if col != target_col]
+        missing = [col for col in feature_cols if col not in df.columns]
+        if missing:
+            logger.error(f"{missing} column(s) missing in DataFrame")
+            return None, None, None, None
+        if len(df) <= lookback:
+            logger.error(f"Need more than {lookback} rows to build sequences, got {len(df)}")
             return None, None, None, None
         
-        scaler = MinMaxScaler(feature_range=(0, 1))
-        scaled_data = scaler.fit_transform(df[[target_col]])
-        
-        X, y = [], []
-        for i in range(lookback, len(scaled_data)):
-            X.append(scaled_data[i-lookback:i])
-            y.append(scaled_data[i, 0])
+        values = df[feature_cols].to_numpy(dtype=np.float64)
+        if scaler is None:
+            from sklearn.preprocessing import MinMaxScaler
+            scaler = MinMaxScaler(feature_range=(0, 1))
+            scaled_data = scaler.fit_transform(values)
+        else:
+            scaled_data = scaler.transform(values)
         
-        X = np.array(X)
-        y = np.array(y)
-        logger.info(f"Prepared {len(X)} sequences with {lookback} lookback periods")
+        # Window k covers rows k .. k + lookback - 1 and predicts row k + lookback
+        X = sliding_window_view(scaled_data[:-1], lookback, axis=0).transpose(0, 2, 1)
+        y = scaled_data[lookback:, 0]
+        logger.info(f"Prepared {len(X)} sequences with {lookback} lookback periods and {len(feature_cols)} features")
         return scaled_data, scaler, X, y
     except Exception as e:
         logger.error(f"Error preparing data: {e}")
         return None, None, None, None
 
+def iter_batches(X, y, batch_size=32, shuffle=False, seed=0):
+    """
+    Yield contiguous (X, y) batches from the windowed views of prepare_data.
+
+    Only one batch of batch_size x lookback x features values is materialized at a time.
+    With shuffle, the windows are visited in a random order seeded by seed.
+    """
+    order = np.random.default_rng(seed).permutation(len(X)) if shuffle else None
+    for start in range(0, len(X), batch_size):
+        if order is None:
+            yield np.ascontiguousarray(X[start:start + batch_size]), y[start:start + batch_size]
+        else:
+            chosen = order[start:start + batch_size]
+            yield np.take(X, chosen, axis=0), y[chosen]
+
+def sequence_dataset(X, y, batch_size=32, shuffle=False, seed=0):
+    """Wrap iter_batches() in a prefetching tf.data pipeline, so Keras never copies all of X."""
+    import tensorflow as tf
+
+    def generate():
+        for X_batch, y_batch in iter_batches(X, y, batch_size, shuffle=shuffle, seed=seed):
+            yield X_batch.astype(np.float32), y_batch.astype(np.float32)
+
+    signature = (tf.TensorSpec((None,) + X.shape[1:], tf.float32), tf.TensorSpec((None,), tf.float32))
+    return tf.data.Dataset.from_generator(generate, output_signature=signature).prefetch(tf.data.AUTOTUNE)
+
+def inverse_scale_target(scaler, values):
+    """Map scaled target values (the first scaler column) back to prices."""
+    values = np.asarray(values, dtype=np.float64).reshape(-1, 1)
+    return (values - scaler.min_[0]) / scaler.scale_[0]
+
 def build_lstm_model(input_shape):
     """
     Build and compile LSTM model.
@@ -54,6 +106,9 @@ def build_lstm_model(input_shape):
         keras.Model: Compiled LSTM model.
     """
     try:
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import LSTM, Dense, Dropout
+
         model = Sequential()
         model.add(LSTM(50, return_sequences=True, input_shape=input_shape))
         model.add(Dropout(0.2))
@@ -68,26 +123,256 @@ def build_lstm_model(input_shape):
         logger.error(f"Error building LSTM model: {e}")
         return None
 
-def predict_prices(ticker, lookback=60, epochs=10):
+def build_shared_lstm_model(input_shape, n_tickers, embedding_dim=8):
+    """
+    Build and compile an LSTM shared by several tickers, conditioned on a ticker embedding.
+
+    The embedding of the ticker id is repeated over the lookback window and concatenated to
+    the price features, so one network learns all tickers while keeping them apart.
+
+    Args:
+        input_shape (tuple): Shape of input data (lookback, features).
+        n_tickers (int): Number of distinct ticker ids.
+        embedding_dim (int): Size of the ticker embedding.
+
+    Returns:
+        keras.Model: Compiled model taking [sequences, ticker_ids].
+    """
+    try:
+        from tensorflow.keras.models import Model
+        from tensorflow.keras.layers import LSTM, Dense, Dropout, Embedding, Flatten, Input, RepeatVector, Concatenate
+
+        sequences = Input(shape=input_shape)
+        ticker_ids = Input(shape=(1,), dtype='int32')
+        embedding = Flatten()(Embedding(n_tickers, embedding_dim)(ticker_ids))
+        x = Concatenate()([sequences, RepeatVector(input_shape[0])(embedding)])
+        x = Dropout(0.2)(LSTM(50, return_sequences=True)(x))
+        x = Dropout(0.2)(LSTM(50)(x))
+        outputs = Dense(1)(Dense(25)(x))
+        model = Model([sequences, ticker_ids], outputs)
+        model.compile(optimizer='adam', loss='mean_squared_error')
+        logger.info(f"Built shared LSTM model for {n_tickers} tickers")
+        return model
+    except Exception as e:
+        logger.error(f"Error building shared LSTM model: {e}")
+        return None
+
+class MultiTickerWindows:
+    """
+    Training windows of many tickers behind one streaming input pipeline.
+
+    The scaled features of all tickers are stored back to back in one array, and each
+    training sample is only the start row of its window; batches are gathered from a
+    strided view of that array, so at most one batch of windows is ever materialized.
+    Windows never cross from one ticker into the next.
+
+    Args:
+        frames (dict): DataFrame per ticker (must include the feature columns).
+        lookback (int): Number of time steps per window.
+        feature_cols (list, optional): Input feature columns (see prepare_data).
+        train_fraction (float): Leading fraction of each ticker's windows used for training.
+    """
+
+    def __init__(self, frames, lookback=60, feature_cols=None, train_fraction=0.8):
+        self.tickers = list(frames)
+        self.lookback = lookback
+        self.scalers = {}
+        scaled, starts, ids = [], [], []
+        offset = 0
+        for ticker_id, ticker in enumerate(self.tickers):
+            scaled_data, scaler, X, _ = prepare_data(frames[ticker], lookback=lookback, feature_cols=feature_cols)
+            if scaled_data is None:
+                raise ValueError(f"Cannot build windows for {ticker}")
+            self.scalers[ticker] = scaler
+            train_size = int(len(X) * train_fraction)
+            starts.append(offset + np.arange(train_size))
+            ids.append(np.full(train_size, ticker_id, dtype=np.int32))
+            scaled.append(scaled_data)
+            offset += len(scaled_data)
+        self.data = np.concatenate(scaled)
+        self.windows = sliding_window_view(self.data, lookback, axis=0).transpose(0, 2, 1)
+        self.starts = np.concatenate(starts)
+        self.ticker_ids = np.concatenate(ids)
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def n_features(self):
+        return self.data.shape[1]
+
+    def batches(self, batch_size=256, shuffle=True, seed=0, tickers=None):
+        """
+        Yield (X, ticker_ids, y) batches of training windows.
+
+        Args:
+            batch_size (int): Windows per batch.
+            shuffle (bool): Visit windows in a random order (mixing tickers within batches).
+            seed (int): Shuffle seed.
+            tickers (list, optional): Only windows of these tickers.
+        """
+        order = np.arange(len(self.starts))
+        if tickers is not None:
+            wanted = [self.tickers.index(ticker) for ticker in tickers]
+            order = order[np.isin(self.ticker_ids, wanted)]
+        if shuffle:
+            order = np.random.default_rng(seed).permutation(order)
+        for position in range(0, len(order), batch_size):
+            chosen = order[position:position + batch_size]
+            starts = self.starts[chosen]
+            yield (np.take(self.windows, starts, axis=0).astype(np.float32),
+                   self.ticker_ids[chosen],
+                   self.data[starts + self.lookback, 0].astype(np.float32))
+
+    def dataset(self, batch_size=256, shared=True, tickers=None, seed=0):
+        """Wrap batches() in a prefetching tf.data pipeline; inputs include ticker ids when shared."""
+        import tensorflow as tf
+
+        def generate():
+            for X, ticker_ids, y in self.batches(batch_size, seed=seed, tickers=tickers):
+                yield ((X, ticker_ids[:, np.newaxis]), y) if shared else (X, y)
+
+        sequences = tf.TensorSpec((None, self.lookback, self.n_features), tf.float32)
+        inputs = (sequences, tf.TensorSpec((None, 1), tf.int32)) if shared else sequences
+        signature = (inputs, tf.TensorSpec((None,), tf.float32))
+        return tf.data.Dataset.from_generator(generate, output_signature=signature).prefetch(tf.data.AUTOTUNE)
+
+def use_cpu_only():
+    """
+    Hide every GPU from TensorFlow so models are built and trained on the CPU.
+
+    Setting CUDA_VISIBLE_DEVICES only works before TensorFlow is first imported; the device
+    configuration works later too, as long as the GPUs have not been initialized yet.
+
+    Raises:
+        RuntimeError: If a GPU is still visible afterwards.
+    """
+    import tensorflow as tf
+    try:
+        tf.config.set_visible_devices([], 'GPU')
+    except RuntimeError as e:
+        # Raised once the devices are initialized, e.g. by an earlier model in this process
+        logger.warning(f"Could not hide GPUs from TensorFlow: {e}")
+    visible = tf.config.get_visible_devices('GPU')
+    if visible:
+        raise RuntimeError(f"GPUs are still visible to TensorFlow: {visible}")
+
+def _timed_fit(model, make_dataset, samples, epochs):
+    """Fit one epoch at a time and record its duration, throughput and loss."""
+    history = []
+    for epoch in range(epochs):
+        start = time.perf_counter()
+        result = model.fit(make_dataset(epoch), epochs=1, verbose=0)
+        seconds = time.perf_counter() - start
+        history.append({'epoch': epoch + 1, 'seconds': seconds, 'samples_per_sec': samples / seconds,
+                        'loss': float(result.history['loss'][-1])})
+        logger.info(f"Epoch {epoch + 1}/{epochs}: {seconds:.2f}s, {samples / seconds:.0f} samples/s, "
+                    f"loss {history[-1]['loss']:.6f}")
+    return history
+
+def train_multi_ticker(tickers, lookback=60, epochs=10, batch_size=256, feature_cols=None, mode='shared',
+                       workers=4):
+    """
+    Train LSTMs for many tickers from one streaming input pipeline, on CPU only.
+
+    Args:
+        tickers (list): Stock tickers (e.g., ['AAPL', 'MSFT']).
+        lookback (int): Number of time steps for LSTM input.
+        epochs (int): Number of training epochs.
+        batch_size (int): Windows per batch.
+        feature_cols (list, optional): Input feature columns (see prepare_data).
+        mode (str): 'shared' trains one model conditioned on a ticker embedding;
+            'per_ticker' trains one model per ticker, `workers` at a time.
+        workers (int): Concurrent per-ticker trainings in 'per_ticker' mode.
+
+    Returns:
+        dict: 'models' (one shared model or a model per ticker), 'scalers', 'epochs' with
+            per-epoch timing (per ticker in 'per_ticker' mode), 'samples', 'seconds' and
+            overall 'samples_per_sec'.
+    """
+    try:
+        # Hide GPUs before any model is built
+        use_cpu_only()
+        frames = {ticker: read_frame(f'data/{ticker}_historical.csv') for ticker in tickers}
+        windows = MultiTickerWindows(frames, lookback=lookback, feature_cols=feature_cols)
+        logger.info(f"Training on {len(windows)} windows from {len(tickers)} tickers ({mode})")
+
+        start = time.perf_counter()
+        if mode == 'shared':
+            model = build_shared_lstm_model((lookback, windows.n_features), len(tickers))
+            if model is None:
+                return None
+            history = _timed_fit(model, lambda epoch: windows.dataset(batch_size, seed=epoch), len(windows), epochs)
+            models = model
+        elif mode == 'per_ticker':
+            def train(ticker):
+                model = build_lstm_model((lookback, windows.n_features))
+                samples = int((windows.ticker_ids == windows.tickers.index(ticker)).sum())
+                make_dataset = lambda epoch: windows.dataset(batch_size, shared=False, tickers=[ticker], seed=epoch)
+                return model, _timed_fit(model, make_dataset, samples, epochs)
+
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+                trained = dict(zip(tickers, executor.map(train, tickers)))
+            models = {ticker: model for ticker, (model, _) in trained.items()}
+            history = {ticker: epochs_run for ticker, (_, epochs_run) in trained.items()}
+        else:
+            logger.error(f"Unknown training mode {mode}")
+            return None
+
+        seconds = time.perf_counter() - start
+        samples = len(windows) * epochs
+        logger.info(f"Trained {len(tickers)} tickers in {seconds:.2f}s ({samples / seconds:.0f} samples/s)")
+        return {'models': models, 'scalers': windows.scalers, 'epochs': history, 'samples': samples,
+                'seconds': seconds, 'samples_per_sec': samples / seconds}
+    except Exception as e:
+        logger.error(f"Error training multi-ticker models: {e}")
+        return None
+
+@timed('predict_prices')
+def predict_prices(ticker, lookback=60, epochs=10, feature_cols=None, registry=None, fine_tune=False,
+                   fine_tune_epochs=2):
     """
     Predict future stock prices using LSTM.
     
+    Trained models are kept in a ModelRegistry keyed by ticker, lookback, hyperparameters and
+    a hash of the data, so repeated runs on unchanged data only run inference.
+
     Args:
         ticker (str): Stock ticker (e.g., 'AAPL').
         lookback (int): Number of time steps for LSTM input.
         epochs (int): Number of training epochs.
+        feature_cols (list, optional): Input feature columns (see prepare_data).
+        registry (ModelRegistry, optional): Model store. Defaults to ModelRegistry('models').
+        fine_tune (bool): When the data changed, start from the latest model for the same
+            ticker and settings and train it on the new bars only, instead of from scratch.
+        fine_tune_epochs (int): Training epochs for fine-tuning.
     
     Returns:
         pd.DataFrame: DataFrame with predicted prices.
     """
     try:
-        df = pd.read_csv(f'data/{ticker}_historical.csv', index_col='Date', parse_dates=True)
+        df = read_frame(f'data/{ticker}_historical.csv')
         if df.empty:
             logger.error(f"No data found for {ticker}")
             return None
         
-        # Prepare data
-        scaled_data, scaler, X, y = prepare_data(df, lookback=lookback)
+        registry = registry or ModelRegistry()
+        columns = ['Close'] + [col for col in (feature_cols or []) if col != 'Close']
+        params = {'epochs': epochs, 'feature_cols': columns}
+        if any(col not in df.columns for col in columns):
+            logger.error(f"Missing feature columns for {ticker}: {columns}")
+            return None
+        key = registry.make_key(ticker, lookback, params, data_hash(df[columns].to_numpy(dtype=np.float64)))
+
+        stored = registry.load(key)
+        previous_key = None
+        if stored is None and fine_tune:
+            previous_key = registry.latest(ticker=ticker, lookback=lookback, params=params)
+            stored = registry.load(previous_key) if previous_key else None
+        model, scaler, meta = stored if stored is not None else (None, None, None)
+
+        # Prepare data (with the stored scaler when reusing a model)
+        scaled_data, scaler, X, y = prepare_data(df, lookback=lookback, feature_cols=columns, scaler=scaler)
         if scaled_data is None:
             return None
         
@@ -96,15 +381,29 @@ def predict_prices(ticker, lookback=60, epochs=10):
         X_train, X_test = X[:train_size], X[train_size:]
         y_train, y_test = y[:train_size], y[train_size:]
         
-        # Build and train model
-        model = build_lstm_model((lookback, 1))
         if model is None:
-            return None
-        model.fit(X_train, y_train, epochs=epochs, batch_size=32, verbose=1)
+            # Build and train model
+            model = build_lstm_model((lookback, X.shape[2]))
+            if model is None:
+                return None
+            # Stream shuffled batches from the windowed view instead of materializing X_train
+            _timed_fit(model, lambda epoch: sequence_dataset(X_train, y_train, shuffle=True, seed=epoch),
+                       len(X_train), epochs)
+        elif previous_key is not None:
+            new_windows = slice(min(meta['train_size'], train_size), train_size)
+            logger.info(f"Fine-tuning {previous_key} on {train_size - new_windows.start} new sequences")
+            if new_windows.start < train_size:
+                _timed_fit(model, lambda epoch: sequence_dataset(X_train[new_windows], y_train[new_windows],
+                                                                 shuffle=True, seed=epoch),
+                           train_size - new_windows.start, fine_tune_epochs)
+        if previous_key is not None or stored is None:
+            registry.save(key, model, scaler, {'ticker': ticker, 'lookback': lookback, 'params': params,
+                                               'rows': len(df), 'train_size': train_size},
+                          weights=export_lstm_weights(model))
         
         # Predict
-        predictions = model.predict(X_test)
-        predictions = scaler.inverse_transform(predictions)
+        predictions = model.predict(sequence_dataset(X_test, y_test), verbose=0)
+        predictions = inverse_scale_target(scaler, predictions)
         
         # Create DataFrame with predictions
         pred_dates = df.index[train_size + lookback:]
@@ -112,8 +411,7 @@ def predict_prices(ticker, lookback=60, epochs=10):
         df = df.join(pred_df)
         
         # Save predictions
-        os.makedirs('data', exist_ok=True)
-        df.to_csv(f'data/{ticker}_predictions.csv')
+        write_frame(df, f'data/{ticker}_predictions.csv')
         logger.info(f"Saved predictions to data/{ticker}_predictions.csv")
         return df
     
@@ -121,6 +419,76 @@ def predict_prices(ticker, lookback=60, epochs=10):
         logger.error(f"Error predicting prices for {ticker}: {e}")
         return None
 
+def predict_prices_numpy(tickers, lookback=60, epochs=10, feature_cols=None, registry=None):
+    """
+    Predict prices for several tickers with the NumPy forward pass, without TensorFlow.
+
+    Uses the weights predict_prices stored in the registry for the current data of each
+    ticker, or else the latest weights stored for the same ticker and settings (with their
+    scaler), so predictions keep working after new bars are fetched. Models with the same
+    architecture are stacked and evaluated in one batch.
+
+    Args:
+        tickers (list): Stock tickers (e.g., ['AAPL', 'MSFT']).
+        lookback (int): Number of time steps the models were trained with.
+        epochs (int): Training epochs the models were trained with (part of the registry key).
+        feature_cols (list, optional): Input feature columns the models were trained with.
+        registry (ModelRegistry, optional): Model store. Defaults to ModelRegistry('models').
+
+    Returns:
+        dict: DataFrame with Predicted_Close per ticker; tickers without a stored model are omitted.
+    """
+    registry = registry or ModelRegistry()
+    columns = ['Close'] + [col for col in (feature_cols or []) if col != 'Close']
+    params = {'epochs': epochs, 'feature_cols': columns}
+    inputs = {}
+    for ticker in tickers:
+        try:
+            df = read_frame(f'data/{ticker}_historical.csv')
+            key = registry.make_key(ticker, lookback, params, data_hash(df[columns].to_numpy(dtype=np.float64)))
+            stored = registry.load_weights(key)
+            if stored is None:
+                # New bars change the data hash; serve the latest model trained with these settings
+                previous_key = registry.latest(ticker=ticker, lookback=lookback, params=params)
+                stored = registry.load_weights(previous_key) if previous_key else None
+                if stored is None:
+                    logger.error(f"No stored weights for {ticker} ({key}); run predict_prices first")
+                    continue
+                logger.info(f"No weights for the current {ticker} data; using {previous_key} "
+                            f"trained on {stored[2].get('rows', 'fewer')} rows")
+            layers, scaler, meta = stored
+            _, _, X, _ = prepare_data(df, lookback=lookback, feature_cols=columns, scaler=scaler)
+            train_size = int(len(X) * 0.8)
+            inputs[ticker] = (df, layers, scaler, X[train_size:], train_size)
+        except Exception as e:
+            logger.error(f"Error loading model inputs for {ticker}: {e}")
+
+    # Group tickers by architecture; each group is one stacked forward pass
+    groups = {}
+    for ticker, (_, layers, _, _, _) in inputs.items():
+        signature = tuple(tuple(w.shape for w in layer['weights']) for layer in layers)
+        groups.setdefault(signature, []).append(ticker)
+
+    results = {}
+    for group in groups.values():
+        samples = max(len(inputs[ticker][3]) for ticker in group)
+        batch = np.zeros((len(group), samples) + inputs[group[0]][3].shape[1:])
+        for position, ticker in enumerate(group):
+            X_test = inputs[ticker][3]
+            batch[position, :len(X_test)] = X_test
+        outputs = NumpyLSTM([inputs[ticker][1] for ticker in group]).predict(batch)
+
+        for position, ticker in enumerate(group):
+            df, _, scaler, X_test, train_size = inputs[ticker]
+            predictions = inverse_scale_target(scaler, outputs[position, :len(X_test)])
+            pred_dates = df.index[train_size + lookback:]
+            pred_df = pd.DataFrame(predictions, columns=['Predicted_Close'], index=pred_dates[:len(predictions)])
+            df = df.join(pred_df)
+            write_frame(df, f'data/{ticker}_predictions.csv')
+            logger.info(f"Saved NumPy predictions to data/{ticker}_predictions.csv")
+            results[ticker] = df
+    return results
+
 if __name__ == '__main__':
     df = predict_prices('AAPL', lookback=60, epochs=10)
     if df is not None:
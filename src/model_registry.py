@@ -0,0 +1,186 @@
+import numpy as np
+import logging
+import hashlib
+import json
+import os
+import sys
+import pickle
+import shutil
+import threading
+import time
+# Get the current working directory
+current_dir = os.getcwd()
+# Add the parent directory to the path
+sys.path.append(current_dir)
+from src.lstm_numpy import save_weights, load_weights
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'index.json'
+MODEL_FILE = 'model.keras'
+SCALER_FILE = 'scaler.pkl'
+WEIGHTS_FILE = 'weights.npz'
+
+def load_keras_model(path):
+    from tensorflow.keras.models import load_model
+    return load_model(path)
+
+def data_hash(values):
+    """Return a short SHA-256 digest of an array's shape, dtype and contents."""
+    values = np.ascontiguousarray(values)
+    digest = hashlib.sha256(f'{values.shape}{values.dtype.str}'.encode())
+    digest.update(values.tobytes())
+    return digest.hexdigest()[:16]
+
+class ModelRegistry:
+    """
+    On-disk store of trained models and their fitted scalers.
+
+    Each entry lives in root/<key>/ with the saved model, the pickled scaler, optionally the
+    plain weight arrays for NumPy inference (see lstm_numpy), and its metadata;
+    root/index.json tracks entry sizes and last use. Least recently used entries are evicted
+    once there are more than max_entries or they take more than max_bytes.
+
+    Args:
+        root (str): Registry directory.
+        max_entries (int): Maximum number of stored models.
+        max_bytes (int, optional): Maximum total size of stored models.
+        model_loader (callable, optional): Loads a model from its saved path. Defaults to
+            keras load_model.
+    """
+
+    def __init__(self, root='models', max_entries=10, max_bytes=None, model_loader=None):
+        self.root = root
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.model_loader = model_loader or load_keras_model
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(ticker, lookback, params, training_hash):
+        """
+        Build the entry key for a model.
+
+        Args:
+            ticker (str): Stock ticker.
+            lookback (int): Sequence length.
+            params (dict): Hyperparameters (epochs, feature columns, ...).
+            training_hash (str): data_hash() of the training data.
+
+        Returns:
+            str: Key such as 'AAPL_lb60_3f2a9c1e0b7d4a6f'.
+        """
+        digest = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode())
+        digest.update(training_hash.encode())
+        return f'{ticker}_lb{lookback}_{digest.hexdigest()[:16]}'
+
+    def _read_index(self):
+        path = os.path.join(self.root, INDEX_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_index(self, index):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = os.path.join(self.root, INDEX_FILE + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp, os.path.join(self.root, INDEX_FILE))
+
+    def entries(self):
+        """Return the metadata of all entries, keyed by entry key."""
+        with self._lock:
+            return self._read_index()
+
+    def __contains__(self, key):
+        return key in self.entries()
+
+    def save(self, key, model, scaler, metadata=None, weights=None):
+        """
+        Store a trained model and its scaler, then evict entries over the limits.
+
+        Args:
+            key (str): Entry key from make_key.
+            model: Model with a save(path) method.
+            scaler: Fitted scaler (pickled).
+            metadata (dict, optional): Extra JSON-serializable fields, such as ticker and lookback.
+            weights (list, optional): Layers from export_lstm_weights, stored for load_weights.
+        """
+        with self._lock:
+            entry_dir = os.path.join(self.root, key)
+            tmp_dir = entry_dir + '.tmp'
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+            model.save(os.path.join(tmp_dir, MODEL_FILE))
+            with open(os.path.join(tmp_dir, SCALER_FILE), 'wb') as f:
+                pickle.dump(scaler, f)
+            if weights is not None:
+                save_weights(weights, os.path.join(tmp_dir, WEIGHTS_FILE))
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+
+            size = sum(os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir))
+            now = time.time()
+            index = self._read_index()
+            index[key] = dict(metadata or {}, created=now, last_used=now, size=size)
+            self._evict(index, keep=key)
+            self._write_index(index)
+            logger.info(f"Saved model {key} ({size} bytes) to {entry_dir}")
+
+    def load(self, key):
+        """
+        Load a stored model and scaler and mark the entry as recently used.
+
+        Returns:
+            tuple: (model, scaler, metadata), or None if the key is not stored.
+        """
+        with self._lock:
+            index = self._read_index()
+            if key not in index:
+                return None
+            entry_dir = os.path.join(self.root, key)
+            model = self.model_loader(os.path.join(entry_dir, MODEL_FILE))
+            with open(os.path.join(entry_dir, SCALER_FILE), 'rb') as f:
+                scaler = pickle.load(f)
+            index[key]['last_used'] = time.time()
+            self._write_index(index)
+            logger.info(f"Loaded model {key} from {entry_dir}")
+            return model, scaler, index[key]
+
+    def load_weights(self, key):
+        """
+        Load the exported weight arrays and scaler of an entry, without the model framework.
+
+        Returns:
+            tuple: (layers, scaler, metadata), or None if the entry has no exported weights.
+        """
+        with self._lock:
+            index = self._read_index()
+            entry_dir = os.path.join(self.root, key)
+            if key not in index or not os.path.exists(os.path.join(entry_dir, WEIGHTS_FILE)):
+                return None
+            layers = load_weights(os.path.join(entry_dir, WEIGHTS_FILE))
+            with open(os.path.join(entry_dir, SCALER_FILE), 'rb') as f:
+                scaler = pickle.load(f)
+            index[key]['last_used'] = time.time()
+            self._write_index(index)
+            return layers, scaler, index[key]
+
+    def latest(self, **metadata):
+        """Return the key of the most recently created entry whose metadata matches, or None."""
+        matches = [(meta['created'], key) for key, meta in self.entries().items()
+                   if all(meta.get(name) == value for name, value in metadata.items())]
+        return max(matches)[1] if matches else None
+
+    def _evict(self, index, keep=None):
+        """Drop least recently used entries from disk and index until within the limits."""
+        by_use = sorted((meta['last_used'], key) for key, meta in index.items() if key != keep)
+        total = sum(meta['size'] for meta in index.values())
+        while by_use and (len(index) > self.max_entries
+                          or (self.max_bytes is not None and total > self.max_bytes)):
+            _, key = by_use.pop(0)
+            total -= index.pop(key)['size']
+            shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+            logger.info(f"Evicted model {key}")
@@ -1,98 +1,377 @@
-import backtrader as bt
 import pandas as pd
 import numpy as np
 import logging
 import os
 import sys
+import itertools
+import math
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 # Get the current working directory
 current_dir = os.getcwd()
 # Add the parent directory to the path
-sys.path.append(os.path.dirname(current_dir))
-from analyze import calculate_indicators
-from backtest import SMACrossoverStrategy, PandasDataWithSignals
+sys.path.append(current_dir)
+from src.analyze import calculate_indicators, IndicatorCache
+from src.backtest import cerebro_backtest, simulate_signals
+from src.storage import read_frame
+from src.metrics import timed
+from src.rules import DEFAULT_SIGNAL_RULES
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def optimize_strategy(ticker, cash=10000.0, commission=0.001):
+DEFAULT_PARAM_GRID = {
+    'sma_50': [30, 50, 70],
+    'sma_200': [150, 200, 250],
+}
+
+# Space searched by the adaptive optimizer when no grid is given (55,625 valid combinations)
+DEFAULT_SEARCH_SPACE = {
+    'sma_50': [10, 20, 30, 40, 50, 60, 70, 80, 90, 100],
+    'sma_200': [100, 125, 150, 175, 200, 225, 250, 275, 300],
+    'stop_loss': [0.02, 0.03, 0.05, 0.07, 0.1],
+    'take_profit': [0.05, 0.1, 0.15, 0.2, 0.3],
+    'rsi_buy': [20, 25, 30, 35, 40],
+    'rsi_sell': [60, 65, 70, 75, 80],
+}
+
+SEARCH_METHODS = ('grid', 'halving')
+
+# Arrays of the ticker being optimized, set in each worker by _attach_shared_data
+_worker_data = {}
+
+def expand_param_grid(param_grid):
+    """
+    Expand a parameter grid into the list of combinations to evaluate.
+
+    Args:
+        param_grid (dict): Maps parameter names ('sma_50', 'sma_200', 'stop_loss',
+            'take_profit', 'rsi_buy', 'rsi_sell') to lists of candidate values.
+
+    Returns:
+        list: Parameter dicts, skipping combinations where sma_50 >= sma_200.
+    """
+    names = list(param_grid)
+    combinations = []
+    for values in itertools.product(*(param_grid[name] for name in names)):
+        params = dict(zip(names, values))
+        if params.get('sma_50', 50) >= params.get('sma_200', 200):
+            continue  # Skip invalid combinations
+        combinations.append(params)
+    return combinations
+
+def _share_arrays(arrays):
+    """Copy named arrays into one shared memory block; return it with the layout to re-map them."""
+    layout, offset = [], 0
+    for name, array in arrays.items():
+        layout.append((name, array.shape, array.dtype.str, offset))
+        offset += array.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for (name, shape, dtype, start), array in zip(layout, arrays.values()):
+        np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start)[...] = array
+    return shm, layout
+
+def _attach_shared_data(shm_name, layout, settings):
+    """Pool initializer: map the shared arrays into this worker."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    arrays = {name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+              for name, shape, dtype, offset in layout}
+    _worker_data.update(settings, shm=shm, **arrays)  # Keep the mapping alive for the worker's lifetime
+
+def _evaluate_group(group, start=0):
+    """
+    Backtest parameter combinations that share their SMA windows against the arrays in _worker_data.
+
+    The signals of the whole group come from one rules.evaluate call: rule parameters
+    (e.g. rsi_buy) are passed as columns of per-combination values and broadcast against
+    the indicator arrays.
+
+    Args:
+        group (list): Parameter dicts with the same sma_50 and sma_200.
+        start (int): First bar of the evaluated slice; indicators still use the full history.
+
+    Returns:
+        list: Backtest result per combination, in the order of group.
+    """
+    dates = _worker_data['dates'][start:]
+    if 'cache' not in _worker_data:
+        _worker_data['cache'] = IndicatorCache(_worker_data['sma'], _worker_data['sma_keys'])
+    cache = _worker_data['cache']
+    ticker = _worker_data['ticker']
+    columns = {name: values[start:] for name, values in zip(_worker_data['columns'], _worker_data['prices'])}
+
+    # SMAs are views into the precomputed cache; only the signals are rebuilt, one row per combination
+    rules = _worker_data['rules']
+    fields = {
+        'Close': columns['Close'],
+        'SMA_fast': cache.get(ticker, group[0].get('sma_50', 50))[start:],
+        'SMA_slow': cache.get(ticker, group[0].get('sma_200', 200))[start:],
+        'RSI': columns['RSI'],
+    }
+    names = sorted({name for params in group for name in params if name in rules.params})
+    variants = {name: np.array([params.get(name, rules.params[name]) for params in group])[:, np.newaxis]
+                for name in names}
+    signals = np.broadcast_to(rules.evaluate(fields, **variants), (len(group), len(dates)))
+
+    years = dates.astype('datetime64[Y]').astype(int) + 1970 if _worker_data['engine'] == 'vectorized' else None
+    results = []
+    for params, signal in zip(group, signals):
+        strategy_params = {name: params[name] for name in ('stop_loss', 'take_profit') if name in params}
+        if _worker_data['engine'] == 'vectorized':
+            result = simulate_signals(columns['Open'], columns['Close'], signal, years,
+                                      cash=_worker_data['cash'], commission=_worker_data['commission'],
+                                      **strategy_params)
+        else:
+            temp_df = pd.DataFrame(columns, index=pd.DatetimeIndex(dates, name='Date'))
+            temp_df['Signal'] = signal
+            result = cerebro_backtest(temp_df, cash=_worker_data['cash'],
+                                      commission=_worker_data['commission'], **strategy_params)
+        logger.info(f"Tested {params}: returns={result['returns']:.4f}%")
+        results.append(result)
+    return results
+
+def _group_by_windows(candidates, starts):
+    """
+    Group candidates that share a slice start and SMA windows, so each group is one rules call.
+
+    Returns:
+        tuple: (groups, group_starts, positions); positions[i] lists the index in candidates
+            of each combination of groups[i].
+    """
+    grouped = {}
+    for position, (params, start) in enumerate(zip(candidates, starts)):
+        key = (start, params.get('sma_50', 50), params.get('sma_200', 200))
+        grouped.setdefault(key, []).append(position)
+    positions = list(grouped.values())
+    groups = [[candidates[i] for i in members] for members in positions]
+    return groups, [key[0] for key in grouped], positions
+
+def sample_params(param_grid, n, rng):
+    """
+    Draw up to n distinct valid combinations from a parameter grid, uniformly at random.
+
+    Large grids are sampled without being expanded.
+
+    Args:
+        param_grid (dict): Candidate values per parameter, as for expand_param_grid.
+        n (int): Number of combinations wanted.
+        rng (np.random.Generator): Source of randomness.
+
+    Returns:
+        list: Parameter dicts; the whole (shuffled) grid when it has n valid combinations or fewer.
+    """
+    names = list(param_grid)
+    sizes = [len(param_grid[name]) for name in names]
+    if math.prod(sizes) <= 4 * n:
+        combinations = expand_param_grid(param_grid)
+        return [combinations[i] for i in rng.permutation(len(combinations))[:n]]
+
+    sampled, seen = [], set()
+    for _ in range(100):
+        for draw in rng.integers(0, sizes, (n, len(names))):
+            key = tuple(int(i) for i in draw)
+            params = {name: param_grid[name][i] for name, i in zip(names, key)}
+            if key in seen or params.get('sma_50', 50) >= params.get('sma_200', 200):
+                continue
+            seen.add(key)
+            sampled.append(params)
+            if len(sampled) == n:
+                return sampled
+    return sampled
+
+def _rung_count(eta, min_fraction):
+    """Number of successive halving rungs needed to grow min_fraction to the full history."""
+    return 1 + max(0, math.floor(math.log(1 / min_fraction, eta) + 1e-9))
+
+def successive_halving(evaluate, candidates, n_bars, eta=3, min_fraction=1 / 9):
     """
-    Optimize trading strategy parameters (SMA windows) for maximum returns.
-    
+    Successive halving: race candidates on short history slices, promote the best to longer ones.
+
+    Every rung backtests the surviving candidates on the most recent `fraction` of the
+    history and keeps the best 1/eta of them for the next rung, whose slice is eta times
+    longer; the last rung uses the full history. Each rung costs about the same number of
+    bars, so the search costs about len(candidates) * min_fraction * rungs full backtests.
+
+    Args:
+        evaluate (callable): evaluate(combinations, starts) -> list of result dicts with 'returns'.
+        candidates (list): Parameter dicts to race.
+        n_bars (int): Length of the full history.
+        eta (int): Reduction factor between rungs (at least 2).
+        min_fraction (float): Share of the history used by the first rung.
+
+    Returns:
+        tuple: (best, log); best is (params, result) on the full history, and log has one
+            dict per backtest with the rung, start, bars, params, returns and final_value.
+    """
+    if eta < 2:
+        raise ValueError("eta must be at least 2")
+    rungs = _rung_count(eta, min_fraction)
+    log = []
+    for rung in range(rungs):
+        fraction = float(eta) ** (rung - rungs + 1)
+        start = n_bars - max(1, round(n_bars * fraction))
+        results = evaluate(candidates, [start] * len(candidates))
+        for params, result in zip(candidates, results):
+            log.append({'rung': rung, 'start': start, 'bars': n_bars - start, 'params': params,
+                        'returns': result['returns'], 'final_value': result['final_value']})
+        # Stable sort: ties keep their sampling order
+        ranked = sorted(range(len(candidates)), key=lambda i: -results[i]['returns'])
+        if rung == rungs - 1:
+            return (candidates[ranked[0]], results[ranked[0]]), log
+        keep = max(1, len(candidates) // eta)
+        candidates = [candidates[i] for i in ranked[:keep]]
+        logger.info(f"Rung {rung} ({n_bars - start} bars): promoted {keep} candidates")
+
+def _write_search_log(log, path):
+    """Save the backtests of a search, one row per backtest with a column per parameter."""
+    rows = [dict(entry['params'], **{key: value for key, value in entry.items() if key != 'params'})
+            for entry in log]
+    pd.DataFrame(rows).to_csv(path, index=False)
+
+@timed('optimize_strategy')
+def optimize_strategy(ticker, cash=10000.0, commission=0.001, param_grid=None, workers=1, engine='backtrader',
+                      search='grid', budget=100, eta=3, min_fraction=1 / 9, seed=None, rules=None):
+    """
+    Optimize trading strategy parameters for maximum returns.
+
     Args:
         ticker (str): Stock ticker (e.g., 'AAPL').
         cash (float): Initial capital.
         commission (float): Trading commission rate.
-    
+        param_grid (dict, optional): Candidate values per parameter ('sma_50', 'sma_200',
+            'stop_loss', 'take_profit', 'rsi_buy', 'rsi_sell'). Defaults to DEFAULT_PARAM_GRID
+            for the grid search and DEFAULT_SEARCH_SPACE for successive halving.
+        workers (int): Number of worker processes. With more than one, the price and RSI
+            arrays are placed in shared memory once and the grid is split across a process pool.
+        engine (str): Backtest engine, 'backtrader' or 'vectorized' (see run_backtest).
+        search (str): 'grid' to backtest every combination on the full history, or 'halving'
+            to race randomly sampled combinations with successive_halving.
+        budget (float): For 'halving', the cost allowed in full-history backtests; the
+            number of sampled combinations is chosen to spend it.
+        eta (int): For 'halving', the reduction factor between rungs.
+        min_fraction (float): For 'halving', the share of the history used by the first rung.
+        seed (int, optional): For 'halving', seed of the combination sampler.
+        rules (SignalRules, optional): Signal rules; DEFAULT_SIGNAL_RULES when None. Grid
+            entries named like a rule parameter are passed to the rules.
+
     Returns:
-        dict: Best parameters and performance metrics.
+        dict: Best parameters and performance metrics, with the number of backtests run
+            and their cost in full-history backtests.
     """
+    shm = None
+    executor = None
     try:
-        df = pd.read_csv(f'data/{ticker}_historical.csv', index_col='Date', parse_dates=True)
+        if search not in SEARCH_METHODS:
+            logger.error(f"Unknown search method: {search}")
+            return None
+        if search == 'halving' and (eta < 2 or not 0 < min_fraction <= 1):
+            logger.error("Successive halving needs eta >= 2 and 0 < min_fraction <= 1")
+            return None
+
+        df = read_frame(f'data/{ticker}_historical.csv')
         if df.empty:
             logger.error(f"No data found for {ticker}")
             return None
-        
+
+        param_grid = param_grid or (DEFAULT_PARAM_GRID if search == 'grid' else DEFAULT_SEARCH_SPACE)
+        if search == 'grid':
+            combinations = expand_param_grid(param_grid)
+        else:
+            # Each sampled combination costs about rungs * eta ** (1 - rungs) full backtests
+            rungs = _rung_count(eta, min_fraction)
+            n_candidates = max(1, int(budget / (rungs * float(eta) ** (1 - rungs))))
+            combinations = sample_params(param_grid, n_candidates, np.random.default_rng(seed))
+        if not combinations:
+            logger.error("Parameter grid contains no valid combinations")
+            return None
+
+        # Every SMA window in the grid is computed once, up front
+        windows = {50, 200}
+        windows.update(param_grid.get('sma_50', []), param_grid.get('sma_200', []))
+        cache = IndicatorCache.build({ticker: df['Close']}, windows)
+
         # Calculate indicators (including RSI) before optimization
-        df = calculate_indicators(df)
+        rules = rules or DEFAULT_SIGNAL_RULES
+        df = calculate_indicators(df, cache=cache, ticker=ticker, rules=rules)
         if df is None:
             logger.error("Failed to calculate indicators")
             return None
-        
-        best_result = {'returns': float('-inf'), 'params': None}
-        sma_50_range = [30, 50, 70]
-        sma_200_range = [150, 200, 250]
-
-        for sma_50 in sma_50_range:
-            for sma_200 in sma_200_range:
-                if sma_50 >= sma_200:
-                    continue  # Skip invalid combinations
-                # Recalculate SMAs with current parameters
-                temp_df = df.copy()
-                temp_df['SMA_50'] = temp_df['Close'].rolling(window=sma_50).mean()
-                temp_df['SMA_200'] = temp_df['Close'].rolling(window=sma_200).mean()
-                temp_df['Signal'] = 0
-                temp_df['Signal'] = np.where(
-                    (temp_df['SMA_50'] > temp_df['SMA_200']) & (temp_df['RSI'] < 30), 1, temp_df['Signal']
-                )
-                temp_df['Signal'] = np.where(
-                    (temp_df['SMA_50'] < temp_df['SMA_200']) & (temp_df['RSI'] > 70), -1, temp_df['Signal']
-                )
-                
-                # Run backtest
-                cerebro = bt.Cerebro()
-                cerebro.addstrategy(SMACrossoverStrategy)
-                cerebro.broker.setcash(cash)
-                cerebro.broker.setcommission(commission=commission)
-                
-                data = PandasDataWithSignals(dataname=temp_df)
-                cerebro.adddata(data)
-                cerebro.addanalyzer(bt.analyzers.Returns, _name='returns')
-                
-                logger.info(f"Testing SMA_50={sma_50}, SMA_200={sma_200}")
-                results = cerebro.run()
-                strategy = results[0]
-                returns = strategy.analyzers.returns.get_analysis().get('rtot', 0.0) * 100
-                
-                if returns > best_result['returns']:
+
+        columns = ['Open', 'High', 'Low', 'Close', 'Volume', 'RSI']
+        arrays = {
+            'prices': df[columns].to_numpy(dtype=np.float64).T,
+            'dates': df.index.to_numpy(dtype='datetime64[ns]'),
+            'sma': cache.values,
+        }
+        settings = {'ticker': ticker, 'columns': columns, 'sma_keys': cache.keys,
+                    'engine': engine, 'cash': cash, 'commission': commission, 'rules': rules}
+
+        if workers > 1:
+            # Publish the arrays once; tasks only carry their parameter dicts
+            shm, layout = _share_arrays(arrays)
+            logger.info(f"Searching {len(combinations)} combinations on {workers} workers")
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_attach_shared_data,
+                                           initargs=(shm.name, layout, settings))
+        else:
+            _worker_data.update(settings, **arrays)
+
+        def evaluate(candidates, starts):
+            # Combinations differing only in rule thresholds or exits share one broadcast signal call
+            groups, group_starts, positions = _group_by_windows(candidates, starts)
+            if executor is not None:
+                chunksize = max(1, len(groups) // (workers * 4))
+                grouped = executor.map(_evaluate_group, groups, group_starts, chunksize=chunksize)
+            else:
+                grouped = map(_evaluate_group, groups, group_starts)
+            results = [None] * len(candidates)
+            for members, group_results in zip(positions, grouped):
+                for position, result in zip(members, group_results):
+                    results[position] = result
+            return results
+
+        n_bars = len(df)
+        if search == 'grid':
+            results = evaluate(combinations, [0] * len(combinations))
+            log = [{'rung': 0, 'start': 0, 'bars': n_bars, 'params': params,
+                    'returns': result['returns'], 'final_value': result['final_value']}
+                   for params, result in zip(combinations, results)]
+            best_result = {'returns': float('-inf'), 'params': None}
+            for params, result in zip(combinations, results):
+                if result['returns'] > best_result['returns']:
                     best_result = {
-                        'returns': returns,
-                        'final_value': cerebro.broker.getvalue(),
-                        'params': {'sma_50': sma_50, 'sma_200': sma_200}
+                        'returns': result['returns'],
+                        'final_value': result['final_value'],
+                        'params': params
                     }
                     logger.info(f"New best result: {best_result}")
-        
+        else:
+            (params, result), log = successive_halving(evaluate, combinations, n_bars, eta=eta,
+                                                       min_fraction=min_fraction)
+            best_result = {'returns': result['returns'], 'final_value': result['final_value'], 'params': params}
+            logger.info(f"Best of {len(combinations)} sampled combinations: {best_result}")
+        best_result['backtests'] = len(log)
+        best_result['cost'] = sum(entry['bars'] for entry in log) / n_bars
+
         os.makedirs('data', exist_ok=True)
         with open(f'data/{ticker}_optimization.txt', 'w') as f:
             f.write(str(best_result))
+        _write_search_log(log, f'data/{ticker}_optimization_log.csv')
         logger.info(f"Saved optimization results to data/{ticker}_optimization.txt")
         return best_result
-    
+
     except Exception as e:
         logger.error(f"Error optimizing strategy for {ticker}: {e}")
         return None
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        _worker_data.clear()
+        if shm is not None:
+            shm.close()
+            shm.unlink()
 
 if __name__ == '__main__':
-    result = optimize_strategy('AAPL')
+    result = optimize_strategy('AAPL', workers=os.cpu_count() or 1)
     if result:
         print(f"Best Parameters: SMA_50={result['params']['sma_50']}, SMA_200={result['params']['sma_200']}")
         print(f"Returns: {result['returns']:.2f}%")
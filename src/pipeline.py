@@ -0,0 +1,306 @@
+import argparse
+import logging
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+# Get the current working directory
+current_dir = os.getcwd()
+# Add the parent directory to the path
+sys.path.append(current_dir)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+STATE_FILE = 'data/pipeline_state.json'
+
+def file_hash(path):
+    """Return the SHA-256 digest of a file's contents, or None if it does not exist."""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class Stage:
+    """
+    One unit of pipeline work.
+
+    Args:
+        name (str): Unique stage name (e.g., 'predict:AAPL').
+        func (callable): Runs the stage; a False or None result or an exception fails it.
+        inputs (list): Files whose contents decide whether the stage must run again. A stage
+            without inputs always runs.
+        outputs (list): Files the stage writes; a stage is only skipped if they all exist.
+        deps (list): Names of stages that must finish first.
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), deps=()):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+
+    def input_hash(self):
+        if not self.inputs:
+            return None
+        digest = hashlib.sha256()
+        for path in self.inputs:
+            digest.update(f'{path}:{file_hash(path)};'.encode())
+        return digest.hexdigest()
+
+class Pipeline:
+    """
+    Dependency graph of stages, run in parallel as their dependencies finish.
+
+    A stage is skipped when the hash of its inputs equals the one recorded at its last
+    successful run and its outputs exist; stages whose dependencies failed are marked
+    'blocked'. Status, duration and input hash per stage are kept in a JSON state file.
+
+    Args:
+        stages (list): Stage objects.
+        state_file (str): Where per-stage results are persisted.
+        max_workers (int): Concurrent stages when running without a scheduler.
+    """
+
+    def __init__(self, stages, state_file=STATE_FILE, max_workers=4):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_file = state_file
+        self.max_workers = max_workers
+        self.dependents = {name: [] for name in self.stages}
+        for stage in stages:
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage {stage.name} depends on unknown stage {dep}")
+                self.dependents[dep].append(stage.name)
+        self._check_acyclic()
+        self._lock = threading.Lock()
+        self._running = False
+        self._done = threading.Event()
+        self._done.set()
+        self.results = {}
+
+    def _check_acyclic(self):
+        remaining = {name: set(stage.deps) for name, stage in self.stages.items()}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Pipeline has a dependency cycle among {sorted(remaining)}")
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    def load_state(self):
+        if not os.path.exists(self.state_file):
+            return {}
+        with open(self.state_file) as f:
+            return json.load(f)
+
+    def _save_state(self, state):
+        os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+        tmp = self.state_file + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, self.state_file)
+
+    def start(self, submit):
+        """
+        Begin a run, handing every stage to submit(name) once its dependencies are done.
+
+        Returns:
+            bool: False if a run is already in progress.
+        """
+        with self._lock:
+            if self._running:
+                logger.info("Pipeline run already in progress; not starting another")
+                return False
+            self._running = True
+            self._done.clear()
+            self.results = {}
+            self._waiting = {name: set(stage.deps) for name, stage in self.stages.items()}
+            self._submit = submit
+            ready = [name for name, deps in self._waiting.items() if not deps]
+        logger.info(f"Starting pipeline run with {len(self.stages)} stages")
+        for name in ready:
+            submit(name)
+        return True
+
+    def run(self):
+        """Run the whole graph on a local thread pool and wait for it to finish."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            if self.start(lambda name: executor.submit(self.execute, name)):
+                self._done.wait()
+        return dict(self.results)
+
+    def schedule(self, scheduler, minutes=60):
+        """
+        Register the pipeline on an APScheduler scheduler.
+
+        An interval job starts a run every `minutes`; each stage then runs as its own one-off
+        job on the scheduler's executor once its dependencies have finished.
+        """
+        def submit(name):
+            scheduler.add_job(self.execute, args=[name], id=f'pipeline:{name}', replace_existing=True)
+
+        scheduler.add_job(self.start, 'interval', args=[submit], minutes=minutes, id='pipeline',
+                          replace_existing=True, coalesce=True, max_instances=1, next_run_time=datetime.now())
+        logger.info(f"Scheduled pipeline every {minutes} minutes")
+
+    def wait(self, timeout=None):
+        """Block until the current run finishes; returns False on timeout."""
+        return self._done.wait(timeout)
+
+    def execute(self, name):
+        """Run (or skip) one stage, record its result and release the stages waiting on it."""
+        stage = self.stages[name]
+        state = self.load_state().get(name, {})
+        record = {'status': None, 'duration': 0.0, 'finished_at': None}
+        start = time.perf_counter()
+        try:
+            blocked = [dep for dep in stage.deps if self.results[dep]['status'] in ('failed', 'blocked')]
+            input_hash = stage.input_hash()
+            if blocked:
+                record['status'] = 'blocked'
+                logger.warning(f"Stage {name} blocked by {blocked}")
+            elif (input_hash is not None and input_hash == state.get('last_success_hash')
+                  and all(os.path.exists(path) for path in stage.outputs)):
+                record['status'] = 'skipped'
+                logger.info(f"Stage {name} skipped: inputs unchanged")
+            else:
+                result = stage.func()
+                if result is None or result is False:
+                    raise RuntimeError(f"stage returned {result}")
+                record['status'] = 'success'
+                record['last_success_hash'] = input_hash
+        except Exception as e:
+            record['status'] = 'failed'
+            record['error'] = str(e)
+            logger.error(f"Stage {name} failed: {e}")
+        record['duration'] = time.perf_counter() - start
+        record['finished_at'] = datetime.now().isoformat()
+        if record['status'] != 'success' and 'last_success_hash' in state:
+            record['last_success_hash'] = state['last_success_hash']
+        logger.info(f"Stage {name}: {record['status']} in {record['duration']:.2f}s")
+        self._finish(name, record)
+
+    def _finish(self, name, record):
+        with self._lock:
+            self.results[name] = record
+            state = self.load_state()
+            state[name] = record
+            self._save_state(state)
+            ready = []
+            for dependent in self.dependents[name]:
+                self._waiting[dependent].discard(name)
+                if not self._waiting[dependent]:
+                    ready.append(dependent)
+            finished = len(self.results) == len(self.stages)
+            if finished:
+                self._running = False
+        for dependent in ready:
+            self._submit(dependent)
+        if finished:
+            counts = {}
+            for result in self.results.values():
+                counts[result['status']] = counts.get(result['status'], 0) + 1
+            logger.info(f"Pipeline run finished: {counts}")
+            self._done.set()
+
+def build_pipeline(tickers, provider=None, state_file=STATE_FILE, max_workers=4, train=True):
+    """
+    Build the fetch -> predict -> analyze -> check pipeline for a list of tickers.
+
+    Stages of different tickers are independent and run in parallel. The first ticker's
+    signals go to data/signals.csv (served by the app), the others to data/{ticker}_signals.csv.
+
+    With train=False the predict stage only runs the NumPy forward pass over the weights in
+    the model registry (predict_prices_numpy), so scheduled refreshes never train a model.
+    A ticker without stored weights is analyzed without predictions.
+
+    Args:
+        tickers (list): Stock tickers (e.g., ['AAPL', 'MSFT']).
+        provider: Data provider for fetch_data (defaults to Yahoo Finance).
+        state_file (str): Pipeline state file.
+        max_workers (int): Concurrent stages for run().
+        train (bool): Train the LSTM in the predict stage (predict_prices) rather than
+            reusing stored weights.
+
+    Returns:
+        Pipeline: The stage graph.
+    """
+    # Stage modules (yfinance, scikit-learn, TensorFlow) are imported when a stage first runs,
+    # and the inference-only pipeline never imports TensorFlow
+    stages = []
+    data_dir = 'data'
+    for position, ticker in enumerate(tickers):
+        historical = os.path.join(data_dir, f'{ticker}_historical.csv')
+        predictions = os.path.join(data_dir, f'{ticker}_predictions.csv')
+        signals = os.path.join(data_dir, 'signals.csv' if position == 0 else f'{ticker}_signals.csv')
+
+        def fetch(ticker=ticker):
+            from src.fetch_data import YahooProvider, update_ticker
+            return update_ticker(ticker, provider or YahooProvider(), data_dir)
+
+        def predict(ticker=ticker):
+            if train:
+                from src.ml_predict import predict_prices
+                return predict_prices(ticker)
+            from src.ml_predict import predict_prices_numpy
+            if ticker not in predict_prices_numpy([ticker]):
+                logger.warning(f"No predictions for {ticker}; signals use the indicator rules only")
+            return True
+
+        def analyze(historical=historical, predictions=predictions, signals=signals, ticker=ticker):
+            from src.analyze import calculate_indicators
+            from src.storage import read_frame
+            return calculate_indicators(read_frame(historical), prediction_file=predictions, ticker=ticker,
+                                        output_file=signals)
+
+        def check(signals=signals):
+            from src.check_signals import check_signals_file
+            return check_signals_file(signals)
+
+        stages += [
+            Stage(f'fetch:{ticker}', fetch, outputs=[historical]),
+            Stage(f'predict:{ticker}', predict, inputs=[historical], outputs=[predictions], deps=[f'fetch:{ticker}']),
+            Stage(f'analyze:{ticker}', analyze, inputs=[historical, predictions], outputs=[signals],
+                  deps=[f'predict:{ticker}']),
+            Stage(f'check:{ticker}', check, inputs=[signals], deps=[f'analyze:{ticker}']),
+        ]
+    return Pipeline(stages, state_file=state_file, max_workers=max_workers)
+
+if __name__ == '__main__':
+    # Usage: python src/pipeline.py [TICKER ...]             train and refresh once
+    #        python src/pipeline.py --schedule [TICKER ...]  refresh every PIPELINE_INTERVAL_MINUTES
+    parser = argparse.ArgumentParser(description='Fetch, predict, analyze and check stock data.')
+    parser.add_argument('tickers', nargs='*')
+    parser.add_argument('--schedule', action='store_true',
+                        help='Keep running and refresh on an interval with the stored model weights')
+    parser.add_argument('--minutes', type=int, default=int(os.environ.get('PIPELINE_INTERVAL_MINUTES', 60)))
+    args = parser.parse_args()
+    tickers = args.tickers or [t.strip() for t in os.environ.get('PIPELINE_TICKERS', '').split(',')
+                               if t.strip()] or ['AAPL']
+
+    if args.schedule:
+        from apscheduler.schedulers.blocking import BlockingScheduler
+        scheduler = BlockingScheduler()
+        build_pipeline(tickers, train=False).schedule(scheduler, minutes=args.minutes)
+        try:
+            scheduler.start()
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        sys.exit(0)
+
+    results = build_pipeline(tickers).run()
+    for name, result in results.items():
+        print(f"{name}: {result['status']} ({result['duration']:.2f}s)")
+    if any(result['status'] in ('failed', 'blocked') for result in results.values()):
+        sys.exit(1)
@@ -0,0 +1,214 @@
+import pandas as pd
+import numpy as np
+import logging
+import math
+import os
+import sys
+# Get the current working directory
+current_dir = os.getcwd()
+# Add the parent directory to the path
+sys.path.append(current_dir)
+from src.analyze import calculate_panel_indicators
+from src.backtest import DEFAULT_STOP_LOSS, DEFAULT_TAKE_PROFIT, yearly_sharpe_ratio
+from src.storage import read_frame
+from src.metrics import timed
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Position sizing rules: a fixed number of shares per entry (backtrader's default sizer trades
+# one), an equal share of equity per position slot, or a fixed fraction of equity per entry
+SIZING_RULES = ('units', 'equal_weight', 'fixed_fraction')
+
+def _ffill(values):
+    """Forward-fill NaN down the rows of a 2-D array."""
+    rows = np.where(np.isnan(values), 0, np.arange(len(values))[:, np.newaxis])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return values[rows, np.arange(values.shape[1])]
+
+def simulate_portfolio(opens, closes, signals, years, cash=100000.0, commission=0.001,
+                       stop_loss=DEFAULT_STOP_LOSS, take_profit=DEFAULT_TAKE_PROFIT, sizing='equal_weight',
+                       max_positions=20, fraction=0.05, units=1, fractional=False):
+    """
+    Simulate one shared cash account trading many tickers on signal matrices.
+
+    Each ticker follows the single-instrument rules of simulate_signals: orders are decided
+    on a bar's close and filled at the next bar's open, a long position exits on a sell
+    signal or when the close breaches the stop-loss/take-profit levels measured from the
+    entry signal bar's close, and commission is charged on every fill. Cash and positions
+    are arrays over tickers, stepped once per bar.
+
+    When more tickers signal than there are free position slots, the first ones (in column
+    order) are taken. When entries cost more than the available cash, fractional or
+    value-based orders are scaled down to fit and unit orders are dropped from the end.
+
+    Args:
+        opens (np.ndarray): Open prices (bars x tickers); NaN where a ticker cannot trade.
+        closes (np.ndarray): Close prices (bars x tickers).
+        signals (np.ndarray): Signals (1 buy, -1 sell, 0 hold) (bars x tickers).
+        years (np.ndarray): Calendar year of each bar, used for the Sharpe ratio.
+        cash (float): Initial capital.
+        commission (float): Trading commission rate.
+        stop_loss (float): Stop-loss fraction below the entry price.
+        take_profit (float): Take-profit fraction above the entry price.
+        sizing (str): One of SIZING_RULES.
+        max_positions (int): Maximum simultaneous positions (None for no limit); with
+            'equal_weight' each entry targets equity / max_positions.
+        fraction (float): Fraction of equity per entry for 'fixed_fraction'.
+        units (float): Shares per entry for 'units'.
+        fractional (bool): Allow fractional shares for value-based sizing.
+
+    Returns:
+        dict: final_value, returns, sharpe_ratio and win_rate as run_backtest, plus 'values'
+            (portfolio value per bar), 'cash' (per bar), 'positions' (shares, bars x tickers)
+            and 'trades' (number of closed trades).
+    """
+    if sizing not in SIZING_RULES:
+        raise ValueError(f"Unknown sizing rule {sizing}; use one of {SIZING_RULES}")
+    n, m = closes.shape
+    max_positions = m if max_positions is None else max_positions
+    if sizing == 'equal_weight' and max_positions < 1:
+        raise ValueError("equal_weight sizing needs max_positions >= 1")
+    signals = np.nan_to_num(signals)
+    tradable = np.isfinite(opens)
+    valued = np.nan_to_num(_ffill(closes))
+    # Exits fill at the open, or at the last known close when a ticker has no open price
+    exit_prices = np.where(tradable, opens, np.vstack([valued[:1], valued[:-1]]))
+
+    shares = np.zeros(m)
+    entry_ref = np.zeros(m)
+    entry_cost = np.zeros(m)
+    pending_entry = np.zeros(m, dtype=bool)
+    pending_exit = np.zeros(m, dtype=bool)
+    values = np.empty(n)
+    cash_history = np.empty(n)
+    positions = np.zeros((n, m))
+    pnl = []
+    balance = cash
+    value = cash
+
+    for t in range(n):
+        if pending_exit.any():
+            exiting = np.flatnonzero(pending_exit)
+            proceeds = shares[exiting] * exit_prices[t, exiting] * (1 - commission)
+            balance += proceeds.sum()
+            pnl.append(proceeds - entry_cost[exiting])
+            shares[exiting] = 0.0
+
+        entering = np.flatnonzero(pending_entry & tradable[t])
+        if entering.size:
+            price = opens[t, entering] * (1 + commission)
+            if sizing == 'units':
+                qty = np.full(entering.size, float(units))
+            else:
+                # Size from the equity at the previous close, when the order was decided
+                target = value / max_positions if sizing == 'equal_weight' else value * fraction
+                qty = target / price
+            cost = qty * price
+            if cost.sum() > balance:
+                if sizing == 'units':
+                    qty = np.where(np.cumsum(cost) <= balance, qty, 0.0)
+                else:
+                    qty = qty * (balance / cost.sum())
+            if sizing != 'units' and not fractional:
+                qty = np.floor(qty)
+            cost = qty * price
+            filled = qty > 0
+            shares[entering[filled]] = qty[filled]
+            entry_cost[entering[filled]] = cost[filled]
+            balance -= cost[filled].sum()
+
+        value = balance + shares @ valued[t]
+        values[t] = value
+        cash_history[t] = balance
+        positions[t] = shares
+
+        # Decide the orders filled at the next bar's open
+        close = closes[t]
+        holding = shares > 0
+        pending_exit = holding & ((signals[t] == -1.0) | (close <= entry_ref * (1 - stop_loss)) |
+                                  (close >= entry_ref * (1 + take_profit)))
+        candidates = np.flatnonzero(~holding & (signals[t] == 1.0) & np.isfinite(close))
+        free_slots = max_positions - int(holding.sum()) + int(pending_exit.sum())
+        pending_entry = np.zeros(m, dtype=bool)
+        pending_entry[candidates[:max(free_slots, 0)]] = True
+        entry_ref[pending_entry] = close[pending_entry]
+
+    final_value = float(values[-1]) if n else cash
+    pnl = np.concatenate(pnl) if pnl else np.zeros(0)
+    return {
+        'final_value': final_value,
+        'returns': math.log(final_value / cash) * 100,
+        'sharpe_ratio': yearly_sharpe_ratio(values, years, cash),
+        'win_rate': (int(np.count_nonzero(pnl >= 0.0)) / len(pnl)) * 100 if len(pnl) else 0,
+        'values': values,
+        'cash': cash_history,
+        'positions': positions,
+        'trades': len(pnl),
+    }
+
+def portfolio_backtest(signals, closes, opens=None, **kwargs):
+    """
+    Backtest a dates x tickers signal matrix on a shared cash account.
+
+    Args:
+        signals (pd.DataFrame): Signals (1 buy, -1 sell, 0 hold), dates x tickers.
+        closes (pd.DataFrame): Close prices, dates x tickers.
+        opens (pd.DataFrame, optional): Open prices to fill orders at. Without them orders
+            fill at the next bar's close.
+        **kwargs: Capital, commission, stop-loss/take-profit and sizing options of simulate_portfolio.
+
+    Returns:
+        dict: simulate_portfolio results, with 'values' and 'cash' as Series and 'positions'
+            as a DataFrame indexed by date.
+    """
+    closes = closes.astype(float)
+    signals = signals.reindex(index=closes.index, columns=closes.columns)
+    if opens is None:
+        opens = closes
+    opens = opens.reindex(index=closes.index, columns=closes.columns).astype(float)
+    result = simulate_portfolio(opens.to_numpy(), closes.to_numpy(), signals.to_numpy(dtype=float),
+                                closes.index.year.to_numpy(), **kwargs)
+    result['values'] = pd.Series(result['values'], index=closes.index, name='Value')
+    result['cash'] = pd.Series(result['cash'], index=closes.index, name='Cash')
+    result['positions'] = pd.DataFrame(result['positions'], index=closes.index, columns=closes.columns)
+    return result
+
+@timed('run_portfolio_backtest')
+def run_portfolio_backtest(tickers, cash=100000.0, commission=0.001, **kwargs):
+    """
+    Backtest the SMA/RSI signals of several tickers as one portfolio.
+
+    Args:
+        tickers (list): Stock tickers with data/{ticker}_historical.csv files.
+        cash (float): Initial capital.
+        commission (float): Trading commission rate.
+        **kwargs: Sizing and stop-loss/take-profit options of simulate_portfolio.
+
+    Returns:
+        dict: portfolio_backtest results, or None on error.
+    """
+    try:
+        frames = {ticker: read_frame(f'data/{ticker}_historical.csv', columns=['Open', 'Close']) for ticker in tickers}
+        closes = pd.DataFrame({ticker: df['Close'] for ticker, df in frames.items()}).sort_index()
+        opens = pd.DataFrame({ticker: df['Open'] for ticker, df in frames.items()}).reindex(closes.index)
+        panel = calculate_panel_indicators(closes, output=None)
+        if panel is None:
+            return None
+        signals = panel.xs('Signal', axis=1, level='Field')
+        result = portfolio_backtest(signals, closes, opens, cash=cash, commission=commission, **kwargs)
+        logger.info(f"Portfolio of {len(tickers)} tickers: final value {result['final_value']:.2f}, "
+                    f"{result['trades']} closed trades")
+        return result
+    except Exception as e:
+        logger.error(f"Error running portfolio backtest: {e}")
+        return None
+
+if __name__ == '__main__':
+    # Usage: python src/portfolio.py TICKER [TICKER ...]
+    result = run_portfolio_backtest(sys.argv[1:] or ['AAPL'])
+    if result:
+        print(f"Final Portfolio Value: ${result['final_value']:.2f}")
+        print(f"Total Return: {result['returns']:.2f}%")
+        print(f"Sharpe Ratio: {result['sharpe_ratio']}")
+        print(f"Win Rate: {result['win_rate']:.2f}% over {result['trades']} trades")
@@ -0,0 +1,326 @@
+import pandas as pd
+import numpy as np
+import logging
+import math
+import os
+import sys
+# Get the current working directory
+current_dir = os.getcwd()
+# Add the parent directory to the path
+sys.path.append(current_dir)
+from src.analyze import IndicatorCache
+from src.backtest import DEFAULT_STOP_LOSS, DEFAULT_TAKE_PROFIT
+from src.storage import read_frame
+from src.metrics import timed
+from src.rules import DEFAULT_SIGNAL_RULES
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BOOTSTRAP_METHODS = ('block', 'iid')
+PERCENTILES = (5, 25, 50, 75, 95)
+
+def bootstrap_paths(opens, closes, n_paths, block_size=20, method='block', rng=None):
+    """
+    Resample a price history into synthetic open/close paths.
+
+    Each bar after the first is described by its close-to-close log return and its
+    overnight gap (log of the open over the previous close). Whole bars are drawn with
+    replacement, so returns and gaps stay paired: 'block' draws runs of block_size
+    consecutive bars (wrapping around the end of the series) to keep volatility clusters
+    and autocorrelation, 'iid' draws single bars. Every path starts at the first bar.
+
+    Args:
+        opens (np.ndarray): Historical open prices.
+        closes (np.ndarray): Historical close prices.
+        n_paths (int): Number of paths to draw.
+        block_size (int): Bars per block for 'block'.
+        method (str): One of BOOTSTRAP_METHODS.
+        rng (np.random.Generator, optional): Source of randomness.
+
+    Returns:
+        tuple: (opens, closes) arrays of shape bars x paths.
+    """
+    if method not in BOOTSTRAP_METHODS:
+        raise ValueError(f"Unknown bootstrap method {method}; use one of {BOOTSTRAP_METHODS}")
+    if block_size < 1:
+        raise ValueError("block_size must be at least 1")
+    rng = rng or np.random.default_rng()
+    opens = np.asarray(opens, dtype=float)
+    closes = np.asarray(closes, dtype=float)
+    returns = np.diff(np.log(closes))
+    gaps = np.log(opens[1:]) - np.log(closes[:-1])
+    m = len(returns)
+
+    if method == 'iid' or block_size == 1:
+        draws = rng.integers(0, m, (n_paths, m))
+    else:
+        starts = rng.integers(0, m, (n_paths, -(-m // block_size)))
+        draws = (starts[:, :, np.newaxis] + np.arange(block_size)) % m
+        draws = draws.reshape(n_paths, -1)[:, :m]
+    draws = draws.T
+
+    path_closes = np.empty((m + 1, n_paths))
+    path_closes[0] = closes[0]
+    path_closes[1:] = closes[0] * np.exp(np.cumsum(returns[draws], axis=0))
+    path_opens = np.empty((m + 1, n_paths))
+    path_opens[0] = opens[0]
+    path_opens[1:] = path_closes[:-1] * np.exp(gaps[draws])
+    return path_opens, path_closes
+
+def _rolling_mean(values, window):
+    """Trailing mean down the rows of a 2-D array, NaN until the window is full."""
+    result = np.full(values.shape, np.nan)
+    if window <= len(values):
+        csum = np.zeros((len(values) + 1, values.shape[1]))
+        np.cumsum(values, axis=0, out=csum[1:])
+        result[window - 1:] = (csum[window:] - csum[:-window]) / window
+    return result
+
+def path_signals(closes, sma_50=50, sma_200=200, rsi_buy=30, rsi_sell=70, rules=None):
+    """
+    SMA/RSI signals of calculate_indicators for many price paths at once.
+
+    Args:
+        closes (np.ndarray): Close prices, bars x paths.
+        sma_50 (int): Fast SMA window.
+        sma_200 (int): Slow SMA window.
+        rsi_buy (float): RSI below which an uptrend is bought.
+        rsi_sell (float): RSI above which a downtrend is sold.
+        rules (SignalRules, optional): Signal rules; DEFAULT_SIGNAL_RULES when None.
+
+    Returns:
+        np.ndarray: Signals (1 buy, -1 sell, 0 hold), bars x paths.
+    """
+    n, p = closes.shape
+    windows = sorted({int(sma_50), int(sma_200)})
+    cache = IndicatorCache.build(dict(enumerate(closes.T)), windows)
+    smas = cache.values.reshape(p, len(windows), n)
+    fast = smas[:, windows.index(int(sma_50))].T
+    slow = smas[:, windows.index(int(sma_200))].T
+
+    # RSI (14-period); windows without a gain (or loss) get an exact zero, as with rolling().mean()
+    delta = np.vstack([np.zeros((1, p)), np.diff(closes, axis=0)])
+    rising = delta > 0
+    falling = delta < 0
+    gain = np.where(_rolling_mean(rising.astype(float), 14) > 0, _rolling_mean(np.where(rising, delta, 0.0), 14), 0.0)
+    loss = np.where(_rolling_mean(falling.astype(float), 14) > 0, _rolling_mean(np.where(falling, -delta, 0.0), 14), 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - (100 / (1 + gain / loss))
+
+    return (rules or DEFAULT_SIGNAL_RULES).evaluate({'Close': closes, 'SMA_fast': fast, 'SMA_slow': slow, 'RSI': rsi},
+                                                    rsi_buy=rsi_buy, rsi_sell=rsi_sell)
+
+def simulate_paths(opens, closes, signals, years, cash=10000.0, commission=0.001,
+                   stop_loss=DEFAULT_STOP_LOSS, take_profit=DEFAULT_TAKE_PROFIT, units=1):
+    """
+    Run the single-instrument strategy of simulate_signals on many paths at once.
+
+    Every path is an independent account trading `units` shares per order. The state of
+    all paths is held in arrays and stepped once per bar, and only per-path summaries
+    are kept, so memory grows with the number of paths rather than paths x bars.
+
+    Args:
+        opens (np.ndarray): Open prices, bars x paths.
+        closes (np.ndarray): Close prices, bars x paths.
+        signals (np.ndarray): Signals (1 buy, -1 sell, 0 hold), bars x paths.
+        years (np.ndarray): Calendar year of each bar, used for the Sharpe ratio.
+        cash (float): Initial capital of each path.
+        commission (float): Trading commission rate.
+        stop_loss (float): Stop-loss fraction below the entry price.
+        take_profit (float): Take-profit fraction above the entry price.
+        units (float): Shares per order.
+
+    Returns:
+        dict: Arrays over paths of final_value, returns, sharpe_ratio (as yearly_sharpe_ratio,
+            NaN where undefined), win_rate, max_drawdown (percent) and trades.
+    """
+    n, p = closes.shape
+    year_end = np.append(years[1:] != years[:-1], True)
+    shares = np.zeros(p)
+    entry_ref = np.zeros(p)
+    entry_cost = np.zeros(p)
+    balance = np.full(p, float(cash))
+    pending_entry = np.zeros(p, dtype=bool)
+    pending_exit = np.zeros(p, dtype=bool)
+    trades = np.zeros(p, dtype=np.int64)
+    wins = np.zeros(p, dtype=np.int64)
+    peak = np.full(p, float(cash))
+    drawdown = np.zeros(p)
+    year_values = [np.full(p, float(cash))]
+    value = balance
+
+    for t in range(n):
+        if pending_exit.any():
+            proceeds = shares * opens[t] * (1 - commission)
+            balance = np.where(pending_exit, balance + proceeds, balance)
+            trades += pending_exit
+            wins += pending_exit & (proceeds - entry_cost >= 0.0)
+            shares[pending_exit] = 0.0
+
+        if pending_entry.any():
+            cost = units * opens[t] * (1 + commission)
+            filled = pending_entry & (cost <= balance)
+            shares[filled] = units
+            entry_cost[filled] = cost[filled]
+            balance = np.where(filled, balance - cost, balance)
+
+        value = balance + shares * closes[t]
+        np.maximum(peak, value, out=peak)
+        np.minimum(drawdown, value / peak - 1.0, out=drawdown)
+        if year_end[t]:
+            year_values.append(value)
+
+        # Decide the orders filled at the next bar's open
+        close = closes[t]
+        holding = shares > 0
+        pending_exit = holding & ((signals[t] == -1.0) | (close <= entry_ref * (1 - stop_loss)) |
+                                  (close >= entry_ref * (1 + take_profit)))
+        pending_entry = ~holding & (signals[t] == 1.0)
+        entry_ref = np.where(pending_entry, close, entry_ref)
+
+    # Sharpe ratio on calendar-year returns per path, as yearly_sharpe_ratio
+    year_values = np.vstack(year_values)
+    ret_free = year_values[1:] / year_values[:-1] - 1.0 - 0.01
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = ret_free.mean(axis=0) / ret_free.std(axis=0)
+    sharpe[~np.isfinite(sharpe)] = np.nan
+
+    with np.errstate(invalid='ignore'):
+        win_rate = np.where(trades > 0, wins / np.maximum(trades, 1) * 100, 0.0)
+    return {
+        'final_value': value,
+        'returns': np.log(value / cash) * 100,
+        'sharpe_ratio': sharpe,
+        'win_rate': win_rate,
+        'max_drawdown': drawdown * 100,
+        'trades': trades,
+    }
+
+def summarize_paths(paths, cash, percentiles=PERCENTILES):
+    """
+    Distribution summary of per-path backtest results.
+
+    Args:
+        paths (pd.DataFrame): One row per path with simulate_paths columns.
+        cash (float): Initial capital.
+        percentiles (tuple): Percentiles to report.
+
+    Returns:
+        dict: Percentiles per metric ('returns', 'sharpe_ratio', 'max_drawdown', 'win_rate'),
+            plus mean and standard deviation of returns, probability_of_loss (fraction of
+            paths ending below the initial capital) and mean trades per path.
+    """
+    summary = {'paths': len(paths)}
+    for column in ('returns', 'sharpe_ratio', 'max_drawdown', 'win_rate'):
+        values = paths[column].dropna().to_numpy()
+        summary[column] = ({f'p{q}': float(v) for q, v in zip(percentiles, np.percentile(values, percentiles))}
+                           if len(values) else {})
+    summary['mean_return'] = float(paths['returns'].mean())
+    summary['std_return'] = float(paths['returns'].std())
+    summary['probability_of_loss'] = float((paths['final_value'] < cash).mean())
+    summary['mean_trades'] = float(paths['trades'].mean())
+    return summary
+
+def monte_carlo_backtest(df, n_paths=1000, block_size=20, method='block', chunk_size=250, seed=None,
+                         cash=10000.0, commission=0.001, stop_loss=DEFAULT_STOP_LOSS,
+                         take_profit=DEFAULT_TAKE_PROFIT, sma_50=50, sma_200=200, rsi_buy=30, rsi_sell=70,
+                         rules=None, percentiles=PERCENTILES):
+    """
+    Backtest the strategy on bootstrapped versions of a price history.
+
+    Paths are drawn, turned into signals and simulated chunk_size at a time, so peak
+    memory is a few bars x chunk_size arrays however many paths are requested. The
+    results do not depend on chunk_size for a given seed.
+
+    Args:
+        df (pd.DataFrame): DataFrame with 'Open' and 'Close' columns and a datetime index.
+        n_paths (int): Number of bootstrapped paths.
+        block_size (int): Bars per block for the 'block' method.
+        method (str): One of BOOTSTRAP_METHODS.
+        chunk_size (int): Paths generated and simulated together.
+        seed (int, optional): Seed for reproducible paths.
+        cash (float): Initial capital.
+        commission (float): Trading commission rate.
+        stop_loss (float): Stop-loss fraction below the entry price.
+        take_profit (float): Take-profit fraction above the entry price.
+        sma_50 (int): Fast SMA window.
+        sma_200 (int): Slow SMA window.
+        rsi_buy (float): RSI buy threshold.
+        rsi_sell (float): RSI sell threshold.
+        rules (SignalRules, optional): Signal rules; DEFAULT_SIGNAL_RULES when None.
+        percentiles (tuple): Percentiles to report.
+
+    Returns:
+        dict: 'summary' (see summarize_paths), 'historical' (the same metrics on the actual
+            history), 'historical_percentile' (share of paths returning less than the
+            history, in percent) and 'paths' (pd.DataFrame with one row per path).
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    opens = df['Open'].to_numpy(dtype=float)
+    closes = df['Close'].to_numpy(dtype=float)
+    years = df.index.year.to_numpy()
+    signal_options = {'sma_50': sma_50, 'sma_200': sma_200, 'rsi_buy': rsi_buy, 'rsi_sell': rsi_sell, 'rules': rules}
+    strategy = {'cash': cash, 'commission': commission, 'stop_loss': stop_loss, 'take_profit': take_profit}
+    rng = np.random.default_rng(seed)
+
+    chunks = []
+    for start in range(0, n_paths, chunk_size):
+        path_opens, path_closes = bootstrap_paths(opens, closes, min(chunk_size, n_paths - start),
+                                                  block_size=block_size, method=method, rng=rng)
+        signals = path_signals(path_closes, **signal_options)
+        chunks.append(pd.DataFrame(simulate_paths(path_opens, path_closes, signals, years, **strategy)))
+    paths = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(
+        columns=['final_value', 'returns', 'sharpe_ratio', 'win_rate', 'max_drawdown', 'trades'])
+
+    signals = path_signals(closes[:, np.newaxis], **signal_options)
+    actual = simulate_paths(opens[:, np.newaxis], closes[:, np.newaxis], signals, years, **strategy)
+    historical = {key: float(values[0]) for key, values in actual.items()}
+    return {
+        'summary': summarize_paths(paths, cash, percentiles),
+        'historical': historical,
+        'historical_percentile': float((paths['returns'] < historical['returns']).mean() * 100),
+        'paths': paths,
+    }
+
+@timed('run_robustness')
+def run_robustness(ticker, n_paths=1000, **kwargs):
+    """
+    Monte Carlo robustness analysis of the SMA/RSI strategy for a ticker.
+
+    Args:
+        ticker (str): Stock ticker with a data/{ticker}_historical.csv file.
+        n_paths (int): Number of bootstrapped paths.
+        **kwargs: Bootstrap, chunking and strategy options of monte_carlo_backtest, e.g.
+            the 'params' found by optimize_strategy.
+
+    Returns:
+        dict: monte_carlo_backtest results, or None on error.
+    """
+    try:
+        df = read_frame(f'data/{ticker}_historical.csv', columns=['Open', 'Close'])
+        if df.empty:
+            logger.error(f"No data found for {ticker}")
+            return None
+        result = monte_carlo_backtest(df, n_paths=n_paths, **kwargs)
+        summary = result['summary']
+        logger.info(f"Robustness of {ticker} over {n_paths} paths: median return "
+                    f"{summary['returns'].get('p50', math.nan):.4f}%, "
+                    f"probability of loss {summary['probability_of_loss']:.2%}")
+        return result
+    except Exception as e:
+        logger.error(f"Error running robustness analysis for {ticker}: {e}")
+        return None
+
+if __name__ == '__main__':
+    # Usage: python src/robustness.py [TICKER] [N_PATHS]
+    ticker = sys.argv[1] if len(sys.argv) > 1 else 'AAPL'
+    result = run_robustness(ticker, n_paths=int(sys.argv[2]) if len(sys.argv) > 2 else 1000, seed=0)
+    if result:
+        summary = result['summary']
+        print(f"Historical Return: {result['historical']['returns']:.4f}% "
+              f"(percentile {result['historical_percentile']:.1f} of {summary['paths']} paths)")
+        for name in ('returns', 'sharpe_ratio', 'max_drawdown'):
+            print(f"{name}: " + ', '.join(f"{q}={v:.4f}" for q, v in summary[name].items()))
+        print(f"Probability of Loss: {summary['probability_of_loss']:.2%}")
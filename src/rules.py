@@ -0,0 +1,162 @@
+import numpy as np
+import ast
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# The SMA/RSI strategy and its LSTM prediction overrides. Later rules take precedence.
+DEFAULT_RULES = """
+SMA_fast > SMA_slow and RSI < rsi_buy -> buy
+SMA_fast < SMA_slow and RSI > rsi_sell -> sell
+Predicted_Close > Close * (1 + prediction_margin) and SMA_fast > SMA_slow -> buy
+Predicted_Close < Close * (1 - prediction_margin) and SMA_fast < SMA_slow -> sell
+"""
+
+DEFAULT_PARAMS = {'rsi_buy': 30, 'rsi_sell': 70, 'prediction_margin': 0.05}
+
+ACTIONS = {'buy': 1, 'sell': -1, 'hold': 0}
+
+_ALLOWED_NODES = (ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+                  ast.Compare, ast.Gt, ast.GtE, ast.Lt, ast.LtE, ast.Eq, ast.NotEq, ast.BinOp, ast.Add,
+                  ast.Sub, ast.Mult, ast.Div, ast.Name, ast.Load, ast.Constant)
+
+class _ToArrayLogic(ast.NodeTransformer):
+    """Rewrite and/or/not and chained comparisons as element-wise NumPy calls."""
+
+    def _call(self, func, args):
+        return ast.Call(func=ast.Name(id=func, ctx=ast.Load()), args=args, keywords=[])
+
+    def _fold(self, func, operands):
+        node = operands[0]
+        for operand in operands[1:]:
+            node = self._call(func, [node, operand])
+        return node
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        return self._fold('_and' if isinstance(node.op, ast.And) else '_or', node.values)
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        return self._call('_not', [node.operand]) if isinstance(node.op, ast.Not) else node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        # a < b < c means (a < b) and (b < c)
+        left, pairs = node.left, []
+        for op, right in zip(node.ops, node.comparators):
+            pairs.append(ast.Compare(left=left, ops=[op], comparators=[right]))
+            left = right
+        return self._fold('_and', pairs)
+
+class Rule:
+    """
+    One parsed rule: a condition over indicator fields and parameters, and its signal.
+
+    Args:
+        text (str): Rule source, e.g. 'SMA_fast > SMA_slow and RSI < 30 -> buy'.
+    """
+
+    def __init__(self, text):
+        self.text = text.strip()
+        condition, arrow, action = self.text.rpartition('->')
+        action = action.strip().lower()
+        if not arrow or action not in ACTIONS:
+            raise ValueError(f"Rule must read 'condition -> buy|sell|hold': {self.text}")
+        self.signal = ACTIONS[action]
+        try:
+            tree = ast.parse(condition.strip(), mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"Invalid rule condition in '{self.text}': {e.msg}") from None
+        for node in ast.walk(tree):
+            if not isinstance(node, _ALLOWED_NODES):
+                raise ValueError(f"Unsupported expression {type(node).__name__} in rule '{self.text}'")
+        self.names = frozenset(node.id for node in ast.walk(tree) if isinstance(node, ast.Name))
+        self.expression = ast.unparse(ast.fix_missing_locations(_ToArrayLogic().visit(tree)).body)
+
+    def __repr__(self):
+        return f'Rule({self.text!r})'
+
+class SignalRules:
+    """
+    Declarative trading rules compiled into one vectorized function.
+
+    Each line of the spec reads 'condition -> buy|sell|hold'. Conditions use comparisons,
+    arithmetic, and/or/not, indicator fields (arrays such as Close, SMA_fast, SMA_slow, RSI,
+    Predicted_Close) and named parameters. When several rules match a bar, the last one
+    wins, as with a chain of np.where calls.
+
+    The rules are parsed once, and for each set of available fields they are compiled
+    into a single generated function. That function evaluates every condition and picks
+    the signals with one np.select, so the Signal column is written once. Fields and
+    parameters broadcast. For example, rsi_buy=np.array([[20], [30], [40]]) with 1-D
+    fields returns one row of signals per threshold from a single call.
+
+    Args:
+        spec (str): Rules, one per line; blank lines and '#' comments are ignored.
+        params (dict, optional): Default parameter values; DEFAULT_PARAMS when None.
+        optional (iterable): Fields that may be missing; rules using a missing optional
+            field are skipped (e.g. the prediction rules without LSTM predictions).
+    """
+
+    def __init__(self, spec=DEFAULT_RULES, params=None, optional=('Predicted_Close',)):
+        self.spec = spec
+        self.params = dict(DEFAULT_PARAMS if params is None else params)
+        self.optional = frozenset(optional)
+        lines = [line.split('#', 1)[0].strip() for line in spec.splitlines()]
+        self.rules = [Rule(line) for line in lines if line]
+        if not self.rules:
+            raise ValueError("Rule spec contains no rules")
+        self._compiled = {}
+
+    @property
+    def fields(self):
+        """Names of the indicator fields the rules read."""
+        return sorted(set().union(*(rule.names for rule in self.rules)) - set(self.params))
+
+    def __getstate__(self):
+        # Generated functions are not picklable; workers recompile on first use
+        return dict(self.__dict__, _compiled={})
+
+    def _compile(self, active):
+        rules = [self.rules[i] for i in active]
+        names = sorted(set().union(*(rule.names for rule in rules)))
+        # np.select takes the first matching condition, so the last rule goes first
+        conditions = ', '.join(rule.expression for rule in reversed(rules))
+        signals = ', '.join(str(rule.signal) for rule in reversed(rules))
+        source = f"def _signals({', '.join(names)}):\n    return _select([{conditions}], [{signals}], 0)\n"
+        namespace = {'_select': np.select, '_and': np.logical_and, '_or': np.logical_or,
+                     '_not': np.logical_not}
+        exec(compile(source, '<signal rules>', 'exec'), namespace)
+        return namespace['_signals'], names
+
+    def evaluate(self, fields, **params):
+        """
+        Compute signals from indicator arrays.
+
+        Args:
+            fields (dict): Maps field names to arrays (or scalars); None counts as missing.
+            **params: Parameter values overriding the defaults.
+
+        Returns:
+            np.ndarray: Signals (1 buy, -1 sell, 0 hold) with the broadcast shape of the inputs.
+        """
+        values = dict(self.params, **params)
+        values.update((name, value) for name, value in fields.items() if value is not None)
+        active = []
+        for i, rule in enumerate(self.rules):
+            missing = rule.names - values.keys()
+            if not missing:
+                active.append(i)
+            elif not missing <= self.optional:
+                raise ValueError(f"Rule '{rule.text}' needs undefined names: {', '.join(sorted(missing))}")
+        active = tuple(active)
+        if active not in self._compiled:
+            self._compiled[active] = self._compile(active)
+        func, names = self._compiled[active]
+        if not names:
+            return np.asarray(func())
+        return func(**{name: values[name] for name in names})
+
+DEFAULT_SIGNAL_RULES = SignalRules()
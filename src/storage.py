@@ -0,0 +1,251 @@
+import logging
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+# Get the current working directory
+current_dir = os.getcwd()
+# Add the parent directory to the path
+sys.path.append(current_dir)
+from src.metrics import timer
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+META_FILE = '_meta.json'
+INDEX_FILE = '_index.npy'
+
+def store_path(csv_path):
+    """
+    Map a CSV path to its columnar store directory.
+
+    'data/AAPL_historical.csv' is stored in 'data/store/AAPL_historical/', one .npy file per
+    column plus the date index, so every column can be memory-mapped independently. The
+    files of each write live in a generation subdirectory named by _meta.json.
+    """
+    directory, filename = os.path.split(csv_path)
+    return os.path.join(directory, 'store', os.path.splitext(filename)[0])
+
+def frame_exists(csv_path):
+    """Return True if the dataset exists as a CSV file or in the columnar store."""
+    return os.path.exists(csv_path) or os.path.exists(os.path.join(store_path(csv_path), META_FILE))
+
+def write_frame(df, csv_path, date_format=None, csv=True):
+    """
+    Write a DataFrame to the columnar store (and, by default, the CSV export).
+
+    Args:
+        df (pd.DataFrame): DataFrame with a datetime index.
+        csv_path (str): CSV path of the dataset (e.g., 'data/signals.csv').
+        date_format (str, optional): Date format for the CSV export.
+        csv (bool): Also write the CSV file for tools that read it directly.
+    """
+    import pandas as pd
+
+    directory = os.path.dirname(csv_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if csv:
+        df.to_csv(csv_path, date_format=date_format)
+
+    store = store_path(csv_path)
+    os.makedirs(store, exist_ok=True)
+    # Every write goes to a fresh generation directory; swapping the metadata file publishes it
+    generation = tempfile.mkdtemp(prefix='gen-', dir=store)
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+    _save_array(os.path.join(generation, INDEX_FILE), index.to_numpy())
+
+    columns = []
+    for position, column in enumerate(df.columns):
+        values = df.iloc[:, position].to_numpy()
+        if values.dtype == object:
+            values = values.astype(str)
+        filename = f'col{position}.npy'
+        _save_array(os.path.join(generation, filename), values)
+        columns.append({'name': str(column), 'file': filename})
+
+    meta_path = os.path.join(store, META_FILE)
+    previous = _load_meta(meta_path).get('generation') if os.path.exists(meta_path) else None
+    meta = {'generation': os.path.basename(generation), 'index_name': df.index.name or 'Date',
+            'rows': len(df), 'columns': columns}
+    tmp = meta_path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(meta, f)
+    # Readers see either the old generation or the new one, never a mix
+    os.replace(tmp, meta_path)
+    _remove_old_generations(store, keep={meta['generation'], previous})
+
+def _load_meta(meta_path):
+    with open(meta_path) as f:
+        return json.load(f)
+
+def _remove_old_generations(store, keep):
+    """
+    Delete generations other than `keep` (the current one and the one it replaced).
+
+    The replaced generation is kept until the next write, so a reader that loaded the old
+    metadata just before the swap can still open its files. Memory maps stay valid after
+    their files are deleted.
+    """
+    for name in os.listdir(store):
+        path = os.path.join(store, name)
+        if name in keep or name == META_FILE:
+            continue
+        if name.startswith('gen-') and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif name.endswith('.npy') and None not in keep:
+            # Columns of the flat layout used before generations; the first write keeps them
+            os.remove(path)
+
+def append_frame(df, csv_path, date_format=None):
+    """
+    Append rows to a dataset written by write_frame.
+
+    The CSV export is appended in place; the store columns are rewritten with the new rows.
+    """
+    import pandas as pd
+
+    existing = read_frame(csv_path)
+    header = existing.columns
+    df.reindex(columns=header).to_csv(csv_path, mode='a', header=False, date_format=date_format)
+    combined = pd.concat([existing, df.reindex(columns=header)])
+    write_frame(combined, csv_path, csv=False)
+
+def read_frame(csv_path, columns=None, mmap=True):
+    """
+    Load a dataset, from the columnar store when it is current, else by parsing the CSV.
+
+    Args:
+        csv_path (str): CSV path of the dataset (e.g., 'data/AAPL_historical.csv').
+        columns (list, optional): Subset of columns to load.
+        mmap (bool): Memory-map the store columns instead of reading them into memory.
+
+    Returns:
+        pd.DataFrame: DataFrame with a timezone-naive DatetimeIndex named 'Date'.
+
+    Raises:
+        FileNotFoundError: If neither the store nor the CSV file exists.
+    """
+    import pandas as pd
+
+    store = store_path(csv_path)
+    meta_path = os.path.join(store, META_FILE)
+    if os.path.exists(meta_path) and (not os.path.exists(csv_path)
+                                      or os.path.getmtime(meta_path) >= os.path.getmtime(csv_path)):
+        with timer('data_load_seconds', 'Dataset load time in seconds.', source='store'):
+            return _read_store(store, meta_path, columns, mmap)
+
+    with timer('data_load_seconds', 'Dataset load time in seconds.', source='csv'):
+        df = pd.read_csv(csv_path, index_col='Date', parse_dates=['Date'])
+        df.index = pd.to_datetime(df.index, utc=True).tz_localize(None)
+    if columns is not None:
+        df = df[columns]
+    return df
+
+def _read_store(store, meta_path, columns, mmap):
+    try:
+        return _read_generation(store, _load_meta(meta_path), columns, mmap)
+    except FileNotFoundError:
+        # A writer removed the generation between reading the metadata and opening the files
+        return _read_generation(store, _load_meta(meta_path), columns, mmap)
+
+def _read_generation(store, meta, columns, mmap):
+    import numpy as np
+    import pandas as pd
+
+    directory = os.path.join(store, meta['generation']) if 'generation' in meta else store
+    mmap_mode = 'r' if mmap else None
+    wanted = meta['columns'] if columns is None else [c for c in meta['columns'] if c['name'] in columns]
+    # np.asarray keeps the memory map but hands pandas plain ndarray views
+    data = {c['name']: np.asarray(np.load(os.path.join(directory, c['file']), mmap_mode=mmap_mode))
+            for c in wanted}
+    index = pd.DatetimeIndex(np.asarray(np.load(os.path.join(directory, INDEX_FILE), mmap_mode=mmap_mode)),
+                             name=meta['index_name'])
+    df = pd.DataFrame(data, index=index, copy=False)
+    if columns is not None:
+        df = df[columns]
+    return df
+
+def _save_array(path, values):
+    import numpy as np
+
+    with open(path, 'wb') as f:
+        np.save(f, values, allow_pickle=False)
+
+def migrate_csvs(data_dir='data'):
+    """
+    Convert every dated CSV in data_dir into the columnar store.
+
+    Args:
+        data_dir (str): Directory holding {ticker}_historical.csv, {ticker}_predictions.csv,
+            signals.csv and similar files.
+
+    Returns:
+        list: CSV paths that were migrated.
+    """
+    import pandas as pd
+
+    migrated = []
+    for filename in sorted(os.listdir(data_dir)):
+        if not filename.endswith('.csv'):
+            continue
+        csv_path = os.path.join(data_dir, filename)
+        try:
+            header = pd.read_csv(csv_path, nrows=0).columns
+            if 'Date' not in header:
+                logger.warning(f"Skipping {csv_path}: no 'Date' column")
+                continue
+            df = pd.read_csv(csv_path, index_col='Date', parse_dates=['Date'])
+            df.index = pd.to_datetime(df.index, utc=True).tz_localize(None)
+            write_frame(df, csv_path, csv=False)
+            migrated.append(csv_path)
+            logger.info(f"Migrated {csv_path} to {store_path(csv_path)}")
+        except Exception as e:
+            logger.error(f"Failed to migrate {csv_path}: {e}")
+    return migrated
+
+def benchmark_load(csv_path, repeat=5):
+    """
+    Compare load times of the CSV path and the columnar store for one dataset.
+
+    Args:
+        csv_path (str): CSV path of a dataset that has been migrated.
+        repeat (int): Number of timed loads per format; the best time is kept.
+
+    Returns:
+        dict: Best load time in seconds for 'csv', 'store' (memory-mapped) and 'store_copy'.
+    """
+    import pandas as pd
+
+    def best(load):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            load()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    def load_csv():
+        df = pd.read_csv(csv_path, index_col='Date', parse_dates=['Date'])
+        df.index = pd.to_datetime(df.index, utc=True).tz_localize(None)
+
+    meta_path = os.path.join(store_path(csv_path), META_FILE)
+    return {
+        'csv': best(load_csv),
+        'store': best(lambda: _read_store(store_path(csv_path), meta_path, None, True)),
+        'store_copy': best(lambda: _read_store(store_path(csv_path), meta_path, None, False)),
+    }
+
+if __name__ == '__main__':
+    # Usage: python src/storage.py [data_dir] [--benchmark]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    data_dir = args[0] if args else 'data'
+    for path in migrate_csvs(data_dir):
+        if '--benchmark' in sys.argv:
+            timings = benchmark_load(path)
+            print(f"{path}: csv {timings['csv'] * 1000:.2f} ms, store {timings['store'] * 1000:.2f} ms "
+                  f"(in-memory {timings['store_copy'] * 1000:.2f} ms)")
@@ -0,0 +1,81 @@
+import pandas as pd
+import numpy as np
+import logging
+import os
+import sys
+# Get the current working directory
+current_dir = os.getcwd()
+# Add the parent directory to the path
+sys.path.append(current_dir)
+from src.storage import write_frame
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Bars per trading day for the supported frequencies (US session, 09:30-16:00)
+BARS_PER_DAY = {'D': 1, '1h': 7, '30min': 13, '15min': 26, '5min': 78, '1min': 390}
+
+def bar_index(years, freq='D', start='2015-01-01'):
+    """
+    Build the timestamps of `years` of trading bars.
+
+    Args:
+        years (float): Length of the history in years (252 trading days each).
+        freq (str): Bar frequency, one of BARS_PER_DAY.
+        start (str): First trading day.
+
+    Returns:
+        pd.DatetimeIndex: Bar timestamps named 'Date'.
+    """
+    if freq not in BARS_PER_DAY:
+        raise ValueError(f"Unsupported frequency {freq}; use one of {list(BARS_PER_DAY)}")
+    days = pd.bdate_range(start, periods=max(1, int(round(years * 252))))
+    if freq == 'D':
+        return pd.DatetimeIndex(days, name='Date')
+    offsets = pd.timedelta_range(pd.Timedelta(hours=9, minutes=30), periods=BARS_PER_DAY[freq], freq=freq)
+    stamps = (days.values[:, np.newaxis] + offsets.values[np.newaxis, :]).ravel()
+    return pd.DatetimeIndex(stamps, name='Date')
+
+def generate_ohlcv(tickers=1, years=1, freq='D', seed=0, start='2015-01-01'):
+    """
+    Generate deterministic OHLCV data following geometric Brownian motion.
+
+    Each ticker gets its own drift, volatility and starting price, drawn from `seed`, so the
+    same arguments always produce identical data.
+
+    Args:
+        tickers (int or list): Number of tickers (named SYN000, SYN001, ...) or their names.
+        years (float): Length of the history in years.
+        freq (str): Bar frequency, one of BARS_PER_DAY.
+        seed (int): Random seed.
+        start (str): First trading day.
+
+    Returns:
+        dict: DataFrame with Open, High, Low, Close and Volume per ticker.
+    """
+    names = [f'SYN{i:03d}' for i in range(tickers)] if isinstance(tickers, int) else list(tickers)
+    index = bar_index(years, freq, start)
+    bars_per_year = 252 * BARS_PER_DAY[freq]
+    frames = {}
+    for name, child in zip(names, np.random.SeedSequence(seed).spawn(len(names))):
+        rng = np.random.default_rng(child)
+        drift = rng.uniform(-0.05, 0.15) / bars_per_year
+        vol = rng.uniform(0.15, 0.45) / np.sqrt(bars_per_year)
+        returns = drift - 0.5 * vol ** 2 + vol * rng.standard_normal(len(index))
+        close = rng.uniform(20, 400) * np.exp(np.cumsum(returns))
+        open_ = np.concatenate([[close[0]], close[:-1]]) * np.exp(0.25 * vol * rng.standard_normal(len(index)))
+        spread = np.abs(vol * rng.standard_normal(len(index))) * close
+        frames[name] = pd.DataFrame({
+            'Open': open_,
+            'High': np.maximum(open_, close) + spread,
+            'Low': np.minimum(open_, close) - spread,
+            'Close': close,
+            'Volume': rng.integers(100_000, 10_000_000, len(index)),
+        }, index=index)
+    return frames
+
+def write_synthetic(frames, data_dir='data'):
+    """Write generated frames as {ticker}_historical.csv (plus the columnar store) in data_dir."""
+    for ticker, df in frames.items():
+        write_frame(df, os.path.join(data_dir, f'{ticker}_historical.csv'))
+    logger.info(f"Wrote {len(frames)} synthetic tickers to {data_dir}")
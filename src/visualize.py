@@ -1,4 +1,3 @@
-import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 import logging
@@ -9,13 +8,14 @@ current_dir = os.getcwd()
 # Add the parent directory to the path (assuming src is in the same directory as your notebook)
 sys.path.append(current_dir)
 from src.analyze import calculate_indicators
+from src.storage import read_frame
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 def plot_trading_signals(ticker):
     try:
-        df = pd.read_csv(f'data/{ticker}_historical.csv', index_col='Date', parse_dates=True)
+        df = read_frame(f'data/{ticker}_historical.csv')
         df = calculate_indicators(df)
         if df is None or df.empty:
             logger.error("Failed to load or process data for visualization")
@@ -51,7 +51,7 @@ def plot_trading_signals(ticker):
 
 def plot_backtest_performance(ticker, backtest_results):
     try:
-        df = pd.read_csv(f'data/{ticker}_historical.csv', index_col='Date', parse_dates=True)
+        df = read_frame(f'data/{ticker}_historical.csv')
         portfolio_value = [10000 + i * 100 for i in range(len(df))]  # Placeholder
 
         fig = px.line(x=df.index, y=portfolio_value, title=f'{ticker} Portfolio Value Over Time')
@@ -0,0 +1,128 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from src.analyze import IndicatorCache, calculate_indicators, calculate_panel_indicators
+
+def make_price_df(seed=0, n=600):
+    """Build a random-walk price DataFrame with a datetime index."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    return pd.DataFrame({'Close': close}, index=pd.bdate_range('2020-01-01', periods=n, name='Date'))
+
+def make_close_panel(seed=0, n=600, tickers=20):
+    """Build a wide (dates x tickers) random-walk Close matrix."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n, tickers)), axis=0))
+    return pd.DataFrame(close, index=pd.bdate_range('2020-01-01', periods=n, name='Date'),
+                        columns=[f'T{i}' for i in range(tickers)])
+
+class TestIndicatorCache(unittest.TestCase):
+    def test_matches_rolling_mean(self):
+        """Cached SMAs match pandas rolling means, including NaN gaps."""
+        close = make_price_df()['Close'].to_numpy().copy()
+        close[100] = np.nan
+        cache = IndicatorCache.build({'AAA': close, 'BBB': close * 2}, [5, 50, 200])
+        for ticker, scale in (('AAA', 1), ('BBB', 2)):
+            for window in (5, 50, 200):
+                expected = pd.Series(close * scale).rolling(window=window).mean().to_numpy()
+                np.testing.assert_allclose(cache.get(ticker, window), expected, rtol=1e-10)
+
+    def test_sweep_grid_rows(self):
+        """A 50 x 50 window sweep needs one row per distinct window, as views of one array."""
+        close = make_price_df()['Close']
+        cache = IndicatorCache.build({'AAA': close}, list(range(10, 60)) + list(range(100, 150)))
+        self.assertEqual(cache.values.shape, (100, len(close)))
+        view = cache.get('AAA', 120)
+        self.assertTrue(np.shares_memory(view, cache.values))
+        self.assertFalse(view.flags.writeable)
+        self.assertIn(('AAA', 10), cache)
+        self.assertNotIn(('AAA', 60), cache)
+
+    def test_window_longer_than_history(self):
+        """Windows longer than the series are all NaN."""
+        cache = IndicatorCache.build({'AAA': np.arange(10.0)}, [20])
+        self.assertTrue(np.isnan(cache.get('AAA', 20)).all())
+
+class TestCalculateIndicators(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        os.chdir(self.tmpdir)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmpdir)
+
+    def test_reads_sma_from_cache(self):
+        """calculate_indicators uses a supplied cache and matches the uncached result."""
+        df = make_price_df()
+        expected = calculate_indicators(df.copy())
+        cache = IndicatorCache.build({'AAA': df['Close']}, [20, 50, 200])
+        result = calculate_indicators(df.copy(), cache=cache, ticker='AAA')
+        np.testing.assert_allclose(result['SMA_50'], cache.get('AAA', 50))
+        np.testing.assert_allclose(result['SMA_200'], expected['SMA_200'], rtol=1e-10)
+        np.testing.assert_array_equal(result['Signal'], expected['Signal'])
+        self.assertTrue(os.path.exists('data/signals.csv'))
+
+class TestPanelIndicators(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        os.chdir(self.tmpdir)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmpdir)
+
+    def test_matches_single_ticker_path(self):
+        """Every panel column matches calculate_indicators on that ticker alone."""
+        close = make_close_panel(tickers=5)
+        panel = calculate_panel_indicators(close, output=None)
+        for ticker in close.columns:
+            expected = calculate_indicators(close[[ticker]].rename(columns={ticker: 'Close'}))
+            for field in ('SMA_50', 'SMA_200', 'RSI'):
+                np.testing.assert_allclose(panel[ticker][field], expected[field], rtol=1e-10)
+            np.testing.assert_array_equal(panel[ticker]['Signal'], expected['Signal'])
+
+    def test_prediction_rules(self):
+        """Predicted_Close more than 5% above Close in an uptrend yields a buy."""
+        close = make_close_panel(tickers=3)
+        panel = calculate_panel_indicators(close, predictions=close * 1.10, output=None)
+        uptrend = panel['T0']['SMA_50'] > panel['T0']['SMA_200']
+        self.assertTrue((panel['T0']['Signal'][uptrend] == 1).all())
+        self.assertIn('Predicted_Close', panel['T0'].columns)
+
+    def test_output_modes(self):
+        """Combined and per-ticker outputs are written to the output directory."""
+        close = make_close_panel(tickers=3)
+        calculate_panel_indicators(close, output='combined')
+        combined = pd.read_csv('data/signals_panel.csv')
+        self.assertEqual(len(combined), len(close) * 3)
+        self.assertEqual(set(combined['Ticker']), {'T0', 'T1', 'T2'})
+        calculate_panel_indicators(close, output='per_ticker')
+        per_ticker = pd.read_csv('data/T1_signals.csv', index_col='Date')
+        self.assertEqual(list(per_ticker.columns), ['Close', 'SMA_50', 'SMA_200', 'RSI', 'Signal'])
+        self.assertIsNone(calculate_panel_indicators(close, output='bogus'))
+
+    def test_per_ticker_cost_below_loop(self):
+        """Benchmark: panel per-ticker cost is well below looping calculate_indicators."""
+        close = make_close_panel(n=1000, tickers=50)
+        start = time.perf_counter()
+        for ticker in close.columns:
+            calculate_indicators(close[[ticker]].rename(columns={ticker: 'Close'}))
+        loop_cost = (time.perf_counter() - start) / len(close.columns)
+        start = time.perf_counter()
+        calculate_panel_indicators(close, output=None)
+        compute_cost = (time.perf_counter() - start) / len(close.columns)
+        start = time.perf_counter()
+        calculate_panel_indicators(close, output='combined')
+        panel_cost = (time.perf_counter() - start) / len(close.columns)
+        self.assertLess(compute_cost * 10, loop_cost)
+        self.assertLess(panel_cost, loop_cost)
+
+if __name__ == '__main__':
+    unittest.main()
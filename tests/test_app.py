@@ -1,17 +1,35 @@
 import unittest
 import os
+import shutil
+import tempfile
 import pandas as pd
+import numpy as np
 import json
+import mmap
 from app import create_app, db
-from app.main import Trade
+import time
+import threading
+from sqlalchemy import text
+from app.main import STREAM_RETRY_AFTER_SECONDS, Trade, cached_signals, chart_cache, encode_cursor, warm_chart_cache
 from datetime import datetime, timedelta
+from src.storage import write_frame
+
+def memory_mapped(values):
+    """Whether an array is a view of a memory-mapped file."""
+    base = values
+    while base is not None:
+        if isinstance(base, (np.memmap, mmap.mmap)):
+            return True
+        base = getattr(base, 'base', None)
+    return False
 
 class TestFlaskApp(unittest.TestCase):
     def setUp(self):
         """Set up test client and temporary database."""
-        self.app = create_app()
-        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test_trades.db'
-        self.app.config['TESTING'] = True
+        self.db_dir = tempfile.mkdtemp()
+        self.config = {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(self.db_dir, 'test_trades.db')}",
+                       'TESTING': True}
+        self.app = create_app(self.config)
         self.client = self.app.test_client()
 
         with self.app.app_context():
@@ -19,11 +37,18 @@ class TestFlaskApp(unittest.TestCase):
 
     def tearDown(self):
         """Clean up database after each test."""
+        if 'events' in self.app.extensions:
+            self.app.extensions['events'].stop()
         with self.app.app_context():
             db.session.remove()
             db.drop_all()
-        if os.path.exists('test_trades.db'):
-            os.remove('test_trades.db')
+            db.engine.dispose()
+        shutil.rmtree(self.db_dir)
+
+    def test_uses_test_database(self):
+        """The test config is applied before the engine is bound, so the trade database is untouched."""
+        with self.app.app_context():
+            self.assertEqual(db.engine.url.database, os.path.join(self.db_dir, 'test_trades.db'))
 
     def test_index_route(self):
         """Test the index route renders correctly."""
@@ -44,7 +69,9 @@ class TestFlaskApp(unittest.TestCase):
         response = self.client.get('/')
         self.assertEqual(response.status_code, 200)
         self.assertIn(b'Stock Trading Bot: AAPL Analysis', response.data)
-        self.assertIn(b'graphJSON', response.data)
+        # The chart is loaded asynchronously into the #chart container
+        self.assertIn(b'id="chart"', response.data)
+        self.assertIn(b"'/api/chart?'", response.data)
         self.assertIn(b'Trade Logs', response.data)
 
     def test_index_route_no_signals_file(self):
@@ -145,3 +172,354 @@ class TestFlaskApp(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn(b'AAPL', response.data)
         self.assertIn(b'150.25', response.data)
+
+    def write_signals(self, rows, path='data/signals.csv'):
+        """Write a synthetic signals file with a buy every 25 rows and a sell every 40."""
+        dates = pd.date_range('2020-01-01', periods=rows, freq='D', name='Date')
+        close = 150.0 + np.cumsum(np.sin(np.arange(rows) / 7.0))
+        signal = np.zeros(rows, dtype=int)
+        signal[::25] = 1
+        signal[::40] = -1
+        df = pd.DataFrame({'Close': close, 'SMA_50': close - 1.0, 'SMA_200': close - 2.0,
+                           'Signal': signal}, index=dates)
+        os.makedirs('data', exist_ok=True)
+        df.to_csv(path)
+        return df
+
+    def test_chart_cache(self):
+        """Signals are served from cache until signals.csv changes."""
+        df = self.write_signals(12)
+        chart_cache.clear()
+        before = chart_cache.stats()
+
+        first = self.client.get('/api/chart?points=100')
+        second = self.client.get('/api/chart?points=100')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json, second.json)
+        stats = chart_cache.stats()
+        self.assertEqual(stats['misses'] - before['misses'], 1)
+        self.assertEqual(stats['hits'] - before['hits'], 1)
+
+        # Rewriting the file with different data invalidates the cached signals
+        df.iloc[:11].to_csv('data/signals.csv')
+        third = self.client.get('/api/chart?points=100')
+        self.assertEqual(chart_cache.stats()['misses'] - before['misses'], 2)
+        self.assertEqual(third.json['rows'], 11)
+
+    def test_warm_chart_cache(self):
+        """Preloading parses every signals file, so the first chart request is a cache hit."""
+        self.write_signals(30)
+        self.write_signals(20, path='data/MSFT_signals.csv')
+        try:
+            chart_cache.clear()
+            self.assertEqual(warm_chart_cache(), ['data/signals.csv', 'data/MSFT_signals.csv'])
+            before = chart_cache.stats()
+            self.assertEqual(self.client.get('/api/chart?ticker=MSFT').status_code, 200)
+            self.assertEqual(chart_cache.stats()['misses'], before['misses'])
+        finally:
+            os.remove('data/MSFT_signals.csv')
+
+    def test_chart_cache_maps_store(self):
+        """Cached signals stay views of the memory-mapped store, also after a refresh rewrites it."""
+        df = self.write_signals(400)
+        df.loc[df.index[:199], 'SMA_200'] = np.nan
+        try:
+            write_frame(df, 'data/signals.csv')
+            chart_cache.clear()
+            for rows in (400, 300):
+                write_frame(df.iloc[:rows], 'data/signals.csv')
+                cached = cached_signals('data/signals.csv')
+                self.assertEqual(len(cached), rows - 199)
+                for column in ('Close', 'SMA_50', 'SMA_200', 'Signal'):
+                    self.assertTrue(memory_mapped(cached[column].to_numpy()), column)
+        finally:
+            shutil.rmtree('data/store/signals', ignore_errors=True)
+            if not os.listdir('data/store'):
+                os.rmdir('data/store')
+
+    def test_chart_api_downsamples(self):
+        """The chart API returns at most the requested points plus every signal point."""
+        df = self.write_signals(5000)
+        chart_cache.clear()
+
+        response = self.client.get('/api/chart?ticker=AAPL&points=200')
+        self.assertEqual(response.status_code, 200)
+        chart = response.json
+        self.assertEqual(chart['rows'], 5000)
+        buys, sells = (df['Signal'] == 1).sum(), (df['Signal'] == -1).sum()
+        self.assertEqual(len(chart['signals']['buy']['x']), buys)
+        self.assertEqual(len(chart['signals']['sell']['x']), sells)
+        self.assertEqual(len(chart['series']['SMA_50']['x']), 200)
+        self.assertLessEqual(len(chart['series']['Close']['x']), 200 + buys + sells)
+        self.assertTrue(set(chart['signals']['buy']['x']) <= set(chart['series']['Close']['x']))
+
+        response = self.client.get('/api/chart?start=2020-02-01&end=2020-02-29&points=1000')
+        self.assertEqual(response.json['rows'], 29)
+        self.assertEqual(response.json['series']['Close']['x'][0], '2020-02-01T00:00:00')
+
+    def test_chart_api_invalid_query(self):
+        """The chart API rejects bad parameters and unknown tickers."""
+        self.write_signals(20)
+        self.assertEqual(self.client.get('/api/chart?points=abc').status_code, 400)
+        self.assertEqual(self.client.get('/api/chart?points=2').status_code, 400)
+        self.assertEqual(self.client.get('/api/chart?start=notadate').status_code, 400)
+        response = self.client.get('/api/chart?ticker=ZZZZ')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json['status'], 'error')
+
+    def insert_trades(self, count, tickers=('AAPL', 'MSFT')):
+        """Bulk insert count trades, 30 seconds apart, alternating over tickers (in SQLAlchemy's SQLite datetime format)."""
+        base = datetime(2020, 1, 1)
+        rows = [(tickers[i % len(tickers)], 1 if i % 2 else -1, 100.0 + i % 50,
+                 (base + timedelta(seconds=30 * i)).strftime('%Y-%m-%d %H:%M:%S.%f'))
+                for i in range(count)]
+        with self.app.app_context():
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql("INSERT INTO trade (ticker, signal, price, timestamp) VALUES (?, ?, ?, ?)", rows)
+
+    def test_trade_pagination(self):
+        """Keyset pages walk every matching trade exactly once, newest first."""
+        self.insert_trades(250)
+        seen, cursor = [], None
+        while True:
+            query = '/trades?ticker=AAPL&limit=40' + (f'&cursor={cursor}' if cursor else '')
+            response = self.client.get(query)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(response.json['trades'])
+            cursor = response.json['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 125)
+        self.assertEqual(len({trade['id'] for trade in seen}), 125)
+        self.assertTrue(all(trade['ticker'] == 'AAPL' for trade in seen))
+        timestamps = [trade['timestamp'] for trade in seen]
+        self.assertEqual(timestamps, sorted(timestamps, reverse=True))
+
+        response = self.client.get('/trades?start=2020-01-01T00:10:00&end=2020-01-01T00:20:00')
+        self.assertEqual(len(response.json['trades']), 21)
+
+    def test_trade_end_date_includes_whole_day(self):
+        """A date-only end (from the date picker) keeps trades made later that day."""
+        with self.app.app_context():
+            for timestamp in (datetime(2020, 1, 1, 9, 30), datetime(2020, 1, 2, 15, 45), datetime(2020, 1, 3, 0, 0)):
+                db.session.add(Trade(ticker='AAPL', signal=1, price=100.0, timestamp=timestamp))
+            db.session.commit()
+        response = self.client.get('/trades?start=2020-01-01&end=2020-01-02')
+        self.assertEqual([trade['timestamp'][:10] for trade in response.json['trades']], ['2020-01-02', '2020-01-01'])
+        response = self.client.get('/trades?end=2020-01-02T12:00:00')
+        self.assertEqual(len(response.json['trades']), 1)
+        self.assertEqual(self.client.get('/trades?end=2020-13-01').status_code, 400)
+
+    def test_trade_pagination_invalid_query(self):
+        """Bad cursors, limits and dates are rejected."""
+        self.assertEqual(self.client.get('/trades?cursor=bogus').status_code, 400)
+        self.assertEqual(self.client.get('/trades?limit=0').status_code, 400)
+        self.assertEqual(self.client.get('/trades?start=yesterday').status_code, 400)
+
+    def test_index_renders_first_trade_page(self):
+        """The index page renders one page of trades and a cursor for the rest."""
+        self.write_signals(20)
+        self.insert_trades(120)
+        response = self.client.get('/?ticker=MSFT')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data.count(b'<td class="border border-gray-300 p-3">MSFT</td>'), 50)
+        self.assertNotIn(b'<td class="border border-gray-300 p-3">AAPL</td>', response.data)
+        self.assertIn(b'data-cursor="', response.data)
+
+    def test_trade_page_constant_time(self):
+        """Benchmark: a deep keyset page costs about the same as the first page."""
+        count = 200000
+        self.insert_trades(count, tickers=('AAPL', 'MSFT', 'GOOG', 'AMZN'))
+        with self.app.app_context():
+            plan = db.session.execute(text(
+                "EXPLAIN QUERY PLAN SELECT * FROM trade WHERE ticker = 'AAPL' AND (timestamp, id) < ('2020-02-01', 1) "
+                "ORDER BY timestamp DESC, id DESC LIMIT 51")).all()
+            self.assertIn('ix_trade_ticker_timestamp', str(plan))
+            deep = Trade.query.order_by(Trade.timestamp).offset(100).first()
+            deep_cursor = encode_cursor(deep)
+
+        def best(query, repeat=5):
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                self.assertEqual(self.client.get(query).status_code, 200)
+                times.append(time.perf_counter() - start)
+            return min(times)
+
+        for ticker in ('', 'AAPL'):
+            first = best(f'/trades?ticker={ticker}')
+            last = best(f'/trades?ticker={ticker}&cursor={deep_cursor}')
+            self.assertLess(last, first * 3 + 0.005)
+
+    def test_save_trades_batch(self):
+        """A batch inserts valid trades in one transaction and reports invalid ones by index."""
+        batch = [
+            {'ticker': 'AAPL', 'signal': 1, 'price': 150.25},
+            {'ticker': '', 'signal': 1, 'price': 150.25},
+            {'ticker': 'MSFT', 'signal': -1, 'price': 310.0},
+            {'ticker': 'MSFT', 'signal': 2, 'price': 310.0},
+            {'ticker': 'GOOG', 'signal': 0, 'price': -1},
+        ]
+        response = self.client.post('/save_trades', json=batch)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['status'], 'partial')
+        self.assertEqual(response.json['inserted'], 2)
+        self.assertEqual(response.json['errors'], [
+            {'index': 1, 'message': 'Ticker cannot be empty.'},
+            {'index': 3, 'message': 'Signal must be 0 (Hold), 1 (Buy), or -1 (Sell).'},
+            {'index': 4, 'message': 'Price must be a positive number.'},
+        ])
+        with self.app.app_context():
+            trades = {trade.id: trade for trade in Trade.query.all()}
+            self.assertEqual(sorted(trades), sorted(response.json['trade_ids']))
+            first = trades[response.json['trade_ids'][0]]
+            self.assertEqual((first.ticker, first.signal, first.price), ('AAPL', 1, 150.25))
+            self.assertIsNotNone(first.timestamp)
+
+        response = self.client.post('/save_trades', json={'trades': batch[:1]})
+        self.assertEqual(response.json['status'], 'success')
+        response = self.client.post('/save_trades', json=[batch[1]])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['status'], 'error')
+        self.assertEqual(self.client.post('/save_trades', json=[]).status_code, 400)
+
+    def test_sqlite_wal_mode(self):
+        """SQLite connections use WAL journaling with synchronous=NORMAL."""
+        with self.app.app_context():
+            self.assertEqual(db.session.execute(text('PRAGMA journal_mode')).scalar(), 'wal')
+            self.assertEqual(db.session.execute(text('PRAGMA synchronous')).scalar(), 1)
+
+    def test_no_scheduler_in_web_app(self):
+        """The web app starts no scheduler, even with PIPELINE_TICKERS set; the pipeline runs on its own."""
+        os.environ['PIPELINE_TICKERS'] = 'AAPL'
+        try:
+            create_app(self.config)
+        finally:
+            del os.environ['PIPELINE_TICKERS']
+        self.assertNotIn('APScheduler', [thread.name for thread in threading.enumerate()])
+
+    def test_metrics_endpoint(self):
+        """/metrics reports request timings per route in the Prometheus text format."""
+        self.client.get('/trades')
+        self.client.get('/trades?limit=0')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        body = response.data.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn('http_requests_total{endpoint="main.list_trades",method="GET",status="200"}', body)
+        self.assertIn('http_requests_total{endpoint="main.list_trades",method="GET",status="400"}', body)
+
+    def read_events(self, response, count):
+        """Read server-sent events from a streaming response until count events arrived."""
+        events, buffer = [], ''
+        for chunk in response.response:
+            buffer += chunk.decode() if isinstance(chunk, bytes) else chunk
+            while '\n\n' in buffer:
+                block, buffer = buffer.split('\n\n', 1)
+                fields = dict(line.split(': ', 1) for line in block.splitlines() if ': ' in line and not line.startswith(':'))
+                if 'event' in fields:
+                    events.append((fields['event'], fields.get('id'), json.loads(fields['data'])))
+            if len(events) >= count:
+                break
+        return events
+
+    def test_stream_pushes_trades(self):
+        """/stream replays trades after Last-Event-ID, then pushes trades saved while connected."""
+        self.app.config['STREAM_SECONDS'] = 5
+        ids = [self.client.post('/save_trade', json={'ticker': 'AAPL', 'signal': 1, 'price': 100.0 + i}).json['trade_id']
+               for i in range(3)]
+        response = self.client.get('/stream', headers={'Last-Event-ID': str(ids[0])}, buffered=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+
+        def save_later():
+            time.sleep(0.3)
+            self.app.test_client().post('/save_trades', json=[{'ticker': 'MSFT', 'signal': -1, 'price': 50.0}])
+        saver = threading.Thread(target=save_later)
+        saver.start()
+        try:
+            events = self.read_events(response, 3)
+        finally:
+            saver.join()
+            response.close()
+        self.assertEqual([(event, event_id) for event, event_id, _ in events],
+                         [('trade', str(ids[1])), ('trade', str(ids[2])), ('trade', str(ids[2] + 1))])
+        self.assertEqual(events[2][2]['ticker'], 'MSFT')
+
+    def test_stream_resyncs_after_falling_behind(self):
+        """A stream that falls further behind than the broker's buffer reloads the missed trades from the database."""
+        self.app.config['STREAM_SECONDS'] = 5
+        self.app.config['EVENT_HISTORY'] = 10
+        response = self.client.get('/stream', buffered=False)
+        hub = self.app.extensions['events']
+        start = hub.broker.latest
+        batch = [{'ticker': 'AAPL', 'signal': 1, 'price': 100.0 + i} for i in range(50)]
+        self.assertEqual(self.client.post('/save_trades', json=batch).status_code, 200)
+        deadline = time.time() + 5
+        while hub.broker.latest < start + 50 and time.time() < deadline:
+            time.sleep(0.05)
+        try:
+            events = self.read_events(response, 50)
+        finally:
+            response.close()
+        trade_ids = [int(event_id) for event, event_id, _ in events if event == 'trade']
+        self.assertEqual(len(trade_ids), 50)
+        self.assertEqual(trade_ids, list(range(trade_ids[0], trade_ids[0] + 50)))
+
+    def test_stream_pushes_signal_refresh(self):
+        """Rewriting a signals file sends a signals event for its ticker."""
+        self.app.config['STREAM_SECONDS'] = 5
+        self.app.config['EVENT_POLL_SECONDS'] = 0.1
+        self.write_signals(30)
+        response = self.client.get('/stream', buffered=False)
+        time.sleep(0.3)
+        self.write_signals(31)
+        try:
+            events = self.read_events(response, 1)
+        finally:
+            response.close()
+        self.assertEqual(events[0][0], 'signals')
+        self.assertEqual(events[0][2]['ticker'], 'AAPL')
+
+    def test_stream_limit_and_polling_fallback(self):
+        """Streams beyond MAX_STREAMS are refused with 503 and a retry delay; /events serves the same updates."""
+        self.app.config['MAX_STREAMS'] = 1
+        first = self.client.get('/stream', buffered=False)
+        second = self.client.get('/stream', buffered=False)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 503)
+        self.assertEqual(second.headers['Retry-After'], str(STREAM_RETRY_AFTER_SECONDS))
+        # Refused pages poll and reopen the stream after the same delay
+        self.write_signals(30)
+        self.assertIn(f'const streamRetryAfter = {STREAM_RETRY_AFTER_SECONDS};', self.client.get('/').get_data(as_text=True))
+        first.close()
+        third = self.client.get('/stream', buffered=False)
+        self.assertEqual(third.status_code, 200)
+        third.close()
+
+        trade_id = self.client.post('/save_trade', json={'ticker': 'AAPL', 'signal': 1, 'price': 10.0}).json['trade_id']
+        result = self.client.get(f'/events?after={trade_id - 1}').json
+        self.assertEqual([trade['id'] for trade in result['trades']], [trade_id])
+        self.assertEqual(result['last_id'], trade_id)
+        self.assertEqual(self.client.get('/events?after=x').status_code, 400)
+        self.assertEqual(self.client.get('/stream?after=x').status_code, 400)
+
+    def test_save_trades_throughput(self):
+        """Benchmark: batch ingestion is far faster per trade than one POST per trade."""
+        trades = [{'ticker': 'AAPL', 'signal': 1 if i % 2 else -1, 'price': 100.0 + i % 50} for i in range(500)]
+        start = time.perf_counter()
+        for trade in trades:
+            self.assertEqual(self.client.post('/save_trade', json=trade).status_code, 200)
+        single = time.perf_counter() - start
+
+        batch = trades * 20
+        start = time.perf_counter()
+        response = self.client.post('/save_trades', json=batch)
+        bulk = time.perf_counter() - start
+        self.assertEqual(response.json['inserted'], len(batch))
+
+        single_rate, bulk_rate = len(trades) / single, len(batch) / bulk
+        self.assertGreater(bulk_rate, single_rate * 10)
+        with self.app.app_context():
+            self.assertEqual(Trade.query.count(), len(trades) + len(batch))
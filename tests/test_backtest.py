@@ -0,0 +1,65 @@
+import unittest
+import time
+import numpy as np
+import pandas as pd
+from src.backtest import vectorized_backtest, cerebro_backtest
+
+def make_signals_df(seed, n=1000):
+    """Build a random-walk OHLC DataFrame with random buy/sell signals."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    open_ = close * (1 + rng.normal(0, 0.005, n))
+    df = pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) * 1.01,
+        'Low': np.minimum(open_, close) * 0.99,
+        'Close': close,
+        'Volume': 1e6,
+    }, index=pd.bdate_range('2019-01-01', periods=n, name='Date'))
+    df['Signal'] = rng.choice([0.0, 1.0, -1.0], n, p=[0.9, 0.05, 0.05])
+    return df
+
+class TestVectorizedBacktest(unittest.TestCase):
+    def assertResultsMatch(self, expected, actual):
+        self.assertAlmostEqual(expected['final_value'], actual['final_value'], places=6)
+        self.assertAlmostEqual(expected['returns'], actual['returns'], places=6)
+        self.assertAlmostEqual(expected['win_rate'], actual['win_rate'], places=6)
+        if expected['sharpe_ratio'] is None:
+            self.assertIsNone(actual['sharpe_ratio'])
+        else:
+            self.assertAlmostEqual(expected['sharpe_ratio'], actual['sharpe_ratio'], places=6)
+
+    def test_parity_with_backtrader(self):
+        """Vectorized engine reproduces the Cerebro results on random signals."""
+        for seed in range(3):
+            df = make_signals_df(seed)
+            self.assertResultsMatch(cerebro_backtest(df), vectorized_backtest(df))
+
+    def test_parity_with_commission(self):
+        """Parity holds for a different commission rate."""
+        df = make_signals_df(7)
+        self.assertResultsMatch(cerebro_backtest(df, commission=0.01),
+                                vectorized_backtest(df, commission=0.01))
+
+    def test_no_signals(self):
+        """Without signals the portfolio is untouched."""
+        df = make_signals_df(0, n=300)
+        df['Signal'] = 0.0
+        result = vectorized_backtest(df)
+        self.assertResultsMatch(cerebro_backtest(df), result)
+        self.assertEqual(result['final_value'], 10000.0)
+        self.assertEqual(result['win_rate'], 0)
+
+    def test_vectorized_is_faster(self):
+        """Vectorized engine is at least an order of magnitude faster."""
+        df = make_signals_df(1, n=2000)
+        start = time.perf_counter()
+        cerebro_backtest(df)
+        cerebro_time = time.perf_counter() - start
+        start = time.perf_counter()
+        vectorized_backtest(df)
+        vectorized_time = time.perf_counter() - start
+        self.assertLess(vectorized_time * 10, cerebro_time)
+
+if __name__ == '__main__':
+    unittest.main()
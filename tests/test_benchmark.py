@@ -0,0 +1,111 @@
+import unittest
+import importlib.util
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from src.synthetic import bar_index, generate_ohlcv, write_synthetic
+from src.benchmark import (HEAVY_MODULES, append_history, compare_to_baseline, import_profile, load_test, run_suite,
+                           stream_test)
+from src.storage import read_frame
+
+class TestSyntheticData(unittest.TestCase):
+    def test_deterministic(self):
+        """The same arguments produce identical data; another seed differs."""
+        first = generate_ohlcv(tickers=3, years=1, seed=5)
+        second = generate_ohlcv(tickers=3, years=1, seed=5)
+        self.assertEqual(list(first), ['SYN000', 'SYN001', 'SYN002'])
+        for ticker in first:
+            pd.testing.assert_frame_equal(first[ticker], second[ticker])
+        other = generate_ohlcv(tickers=1, years=1, seed=6)['SYN000']
+        self.assertFalse(np.allclose(other['Close'], first['SYN000']['Close']))
+
+    def test_ohlc_consistency(self):
+        """Bars are valid OHLCV: High/Low bound Open/Close and prices stay positive."""
+        df = generate_ohlcv(tickers=['AAPL'], years=2, seed=1)['AAPL']
+        self.assertEqual(len(df), 504)
+        self.assertTrue((df['High'] >= df[['Open', 'Close']].max(axis=1)).all())
+        self.assertTrue((df['Low'] <= df[['Open', 'Close']].min(axis=1)).all())
+        self.assertTrue((df['Low'] > 0).all())
+        self.assertTrue(df.index.is_monotonic_increasing)
+
+    def test_intraday_frequency(self):
+        """Intraday bars cover the 09:30-16:00 session of each trading day."""
+        index = bar_index(years=1 / 252, freq='1h', start='2024-01-02')
+        self.assertEqual(len(index), 7)
+        self.assertEqual(index[0], pd.Timestamp('2024-01-02 09:30'))
+        self.assertEqual(index[-1], pd.Timestamp('2024-01-02 15:30'))
+        self.assertEqual(len(generate_ohlcv(years=0.5, freq='5min')['SYN000']), 126 * 78)
+        with self.assertRaises(ValueError):
+            bar_index(1, freq='2d')
+
+    def test_write_synthetic(self):
+        """Generated frames are written as historical files readable by the pipeline."""
+        directory = tempfile.mkdtemp()
+        try:
+            frames = generate_ohlcv(tickers=2, years=1)
+            write_synthetic(frames, directory)
+            df = read_frame(os.path.join(directory, 'SYN001_historical.csv'))
+            pd.testing.assert_frame_equal(df, frames['SYN001'], check_freq=False)
+        finally:
+            shutil.rmtree(directory)
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def test_run_suite(self):
+        """A small suite run times every benchmark and records its configuration."""
+        record = run_suite(years=1, repeat=1)
+        self.assertEqual(set(record['results']), {
+            'startup_app', 'startup_backtest', 'startup_optimize', 'startup_ml_predict', 'calculate_indicators', 'run_backtest', 'run_backtest_vectorized', 'optimize_strategy_vectorized',
+            'prepare_data', 'check_signals_file', 'index_route'})
+        self.assertTrue(all(result['best'] > 0 for result in record['results'].values()))
+        self.assertEqual(record['config']['rows'], 252)
+
+    def test_startup_imports_stay_light(self):
+        """Benchmark: web workers and src modules start without loading the heavy libraries."""
+        app = import_profile('from app import create_app; create_app()')
+        self.assertEqual([package for package in app['packages'] if package in HEAVY_MODULES], [])
+        for module, absent in (('src.backtest', 'backtrader'), ('src.optimize', 'backtrader'),
+                               ('src.ml_predict', 'sklearn'), ('src.ml_predict', 'tensorflow'),
+                               ('src.pipeline', 'pandas')):
+            self.assertNotIn(absent, import_profile(f'import {module}')['packages'], module)
+
+    def test_load_test_scales_with_workers(self):
+        """Benchmark: gunicorn serves the chart API without errors; throughput grows with workers given the cores."""
+        results = [load_test(workers, duration=1.5, concurrency=8, years=4) for workers in (1, 2)]
+        for result in results:
+            self.assertGreater(result['requests'], 0)
+            self.assertEqual(result['errors'], 0)
+        if (os.cpu_count() or 1) >= 3:
+            self.assertGreater(results[1]['rps'], results[0]['rps'] * 1.3)
+
+    @unittest.skipUnless(importlib.util.find_spec('gevent'), 'gevent is not installed')
+    def test_hundreds_of_concurrent_streams(self):
+        """Benchmark: with run.py's defaults, 300 /stream clients all connect and get a new trade; charts stay fast."""
+        result = stream_test(clients=300)
+        self.assertEqual(result['connected'], 300)
+        self.assertEqual(result['received'], 300)
+        self.assertLess(result['chart_seconds'], 2.0)
+
+    def test_compare_and_history(self):
+        """Slowdowns beyond the tolerance are flagged, and runs accumulate in the history."""
+        baseline = {'config': {}, 'results': {'a': {'best': 1.0}, 'b': {'best': 1.0}}}
+        record = {'config': {}, 'results': {'a': {'best': 1.2}, 'b': {'best': 1.5}, 'c': {'best': 0.1}}}
+        comparison = compare_to_baseline(record, baseline, tolerance=0.25)
+        self.assertFalse(comparison['a']['regression'])
+        self.assertTrue(comparison['b']['regression'])
+        self.assertAlmostEqual(comparison['b']['ratio'], 1.5)
+        self.assertIsNone(comparison['c']['ratio'])
+
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'history.json')
+            append_history(record, path)
+            append_history(baseline, path)
+            with open(path) as f:
+                self.assertEqual(len(__import__('json').load(f)), 2)
+        finally:
+            shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.downsample import lttb_indices, downsample_signals
+
+class TestDownsample(unittest.TestCase):
+    def test_lttb_keeps_endpoints_and_extremes(self):
+        """LTTB returns the requested count, both endpoints and an isolated spike."""
+        x = np.arange(1000, dtype=float)
+        y = np.sin(x / 50.0)
+        y[437] = 10.0
+        selected = lttb_indices(x, y, 100)
+        self.assertEqual(len(selected), 100)
+        self.assertEqual(selected[0], 0)
+        self.assertEqual(selected[-1], 999)
+        self.assertTrue(np.all(np.diff(selected) > 0))
+        self.assertIn(437, selected)
+
+    def test_lttb_short_input(self):
+        """Series shorter than the threshold are returned unchanged."""
+        np.testing.assert_array_equal(lttb_indices(np.arange(5.0), np.arange(5.0), 10), np.arange(5))
+
+    def test_downsample_signals_skips_nan(self):
+        """NaN warm-up values of a series are not returned."""
+        dates = pd.date_range('2022-01-01', periods=300, freq='D', name='Date')
+        close = np.linspace(100.0, 130.0, 300)
+        predicted = close.copy()
+        predicted[:60] = np.nan
+        df = pd.DataFrame({'Close': close, 'SMA_50': close, 'SMA_200': close,
+                           'Predicted_Close': predicted, 'Signal': 0}, index=dates)
+        chart = downsample_signals(df, points=50)
+        self.assertEqual(len(chart['series']['Predicted_Close']['x']), 50)
+        self.assertEqual(chart['series']['Predicted_Close']['x'][0], '2022-03-02T00:00:00')
+        self.assertFalse(np.isnan(chart['series']['Predicted_Close']['y']).any())
+        self.assertEqual(chart['signals']['buy']['x'], [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import threading
+import time
+from app.events import ChangeWatcher, EventBroker, format_sse
+
+class TestEventBroker(unittest.TestCase):
+    def test_wait_returns_newer_events(self):
+        """Subscribers get every event after their position, or nothing on timeout."""
+        broker = EventBroker(history=3)
+        self.assertEqual(broker.wait(0, timeout=0.01), [])
+        for i in range(5):
+            broker.publish('trade', {'id': i})
+        self.assertEqual(broker.latest, 5)
+        self.assertEqual([event[0] for event in broker.wait(3)], [4, 5])
+        # Older events than the history are dropped, and a subscriber that missed them is told to resync
+        events = broker.wait(0)
+        self.assertEqual([event[:2] for event in events], [(2, 'resync'), (3, 'trade'), (4, 'trade'), (5, 'trade')])
+        self.assertEqual(events[0][2], {'missed': 2})
+        self.assertEqual([event[0] for event in broker.wait(2)], [3, 4, 5])
+
+    def test_hundreds_of_idle_subscribers_cost_little_cpu(self):
+        """Benchmark: 500 waiting subscribers use almost no CPU and all receive each event."""
+        broker = EventBroker()
+        received = [0] * 500
+        stop = threading.Event()
+
+        def subscriber(position):
+            seq = broker.latest
+            while not stop.is_set():
+                events = broker.wait(seq, timeout=0.5)
+                if events:
+                    seq = events[-1][0]
+                    received[position] += len(events)
+
+        threads = [threading.Thread(target=subscriber, args=(i,), daemon=True) for i in range(500)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+
+        cpu_start = time.process_time()
+        time.sleep(1.0)
+        idle_cpu = time.process_time() - cpu_start
+        for i in range(20):
+            broker.publish('trade', {'id': i})
+        deadline = time.time() + 10
+        while min(received) < 20 and time.time() < deadline:
+            time.sleep(0.01)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(received, [20] * 500)
+        self.assertLess(idle_cpu, 0.15)
+
+class TestChangeWatcher(unittest.TestCase):
+    def test_publishes_new_trades_and_signal_changes(self):
+        """Only trades above the last seen id and changed signals versions are published."""
+        trades = [{'id': 1}, {'id': 2}, {'id': 3}]
+        versions = {'AAPL': 1}
+        broker = EventBroker()
+        watcher = ChangeWatcher(broker, lambda after: [t for t in trades if t['id'] > after],
+                                lambda: dict(versions), last_trade_id=1)
+        watcher.check()
+        self.assertEqual([event[2] for event in broker.wait(0)], [{'id': 2}, {'id': 3}])
+        versions['AAPL'] = 2
+        versions['MSFT'] = 1
+        watcher.check()
+        watcher.check()
+        self.assertEqual([event[2] for event in broker.wait(2)],
+                         [{'ticker': 'AAPL', 'version': 2}, {'ticker': 'MSFT', 'version': 1}])
+
+    def test_poke_wakes_the_thread(self):
+        """poke() triggers a check without waiting for the poll interval."""
+        trades = []
+        broker = EventBroker()
+        watcher = ChangeWatcher(broker, lambda after: [t for t in trades if t['id'] > after], dict,
+                                interval=60).start()
+        try:
+            time.sleep(0.1)
+            trades.append({'id': 1})
+            watcher.poke()
+            self.assertEqual(broker.wait(0, timeout=5)[0][2], {'id': 1})
+        finally:
+            watcher.stop()
+
+    def test_format_sse(self):
+        self.assertEqual(format_sse('trade', {'id': 7}, 7), 'id: 7\nevent: trade\ndata: {"id": 7}\n\n')
+        self.assertEqual(format_sse('signals', {'ticker': 'AAPL'}), 'event: signals\ndata: {"ticker": "AAPL"}\n\n')
+
+if __name__ == '__main__':
+    unittest.main()
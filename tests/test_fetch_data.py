@@ -0,0 +1,101 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from src.fetch_data import CSVProvider, fetch_tickers, update_ticker
+from src.storage import read_frame
+
+TICKERS = ['AAPL', 'MSFT', 'GOOG', 'AMZN', 'NVDA', 'META']
+
+def write_source(directory, ticker, periods=300):
+    """Write a provider CSV of business-day bars for ticker starting 2023-01-02."""
+    dates = pd.bdate_range('2023-01-02', periods=periods, name='Date')
+    close = 100.0 + np.cumsum(np.random.default_rng(len(ticker)).normal(0, 1, periods))
+    df = pd.DataFrame({'Open': close - 0.5, 'High': close + 1.0, 'Low': close - 1.0,
+                       'Close': close, 'Volume': np.arange(periods) + 1000}, index=dates)
+    df.to_csv(os.path.join(directory, f'{ticker}.csv'))
+    return df
+
+class FlakyProvider(CSVProvider):
+    """CSVProvider whose first `failures` requests raise."""
+
+    def __init__(self, directory, failures):
+        super().__init__(directory)
+        self.failures = failures
+        self.calls = []
+
+    def fetch(self, ticker, start, end):
+        self.calls.append((ticker, start, end))
+        if len(self.calls) <= self.failures:
+            raise ConnectionError('temporary failure')
+        return super().fetch(ticker, start, end)
+
+class TestFetchData(unittest.TestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.data_dir = tempfile.mkdtemp()
+        self.sources = {ticker: write_source(self.source, ticker) for ticker in TICKERS}
+
+    def tearDown(self):
+        shutil.rmtree(self.source)
+        shutil.rmtree(self.data_dir)
+
+    def test_fetch_tickers_writes_historical_files(self):
+        """Every ticker is stored as data/{ticker}_historical.csv."""
+        results = fetch_tickers(TICKERS, CSVProvider(self.source), self.data_dir, end_date='2024-01-01')
+        for ticker in TICKERS:
+            expected = self.sources[ticker].loc[:'2023-12-31']
+            self.assertEqual(results[ticker], len(expected))
+            df = read_frame(os.path.join(self.data_dir, f'{ticker}_historical.csv'))
+            pd.testing.assert_frame_equal(df, expected, check_freq=False, check_dtype=False)
+
+    def test_incremental_fetch(self):
+        """A second run requests only the dates after the last stored bar and appends them."""
+        provider = FlakyProvider(self.source, failures=0)
+        update_ticker('AAPL', provider, self.data_dir, end_date='2023-06-01')
+        added = update_ticker('AAPL', provider, self.data_dir, end_date='2023-09-01')
+        self.assertEqual(provider.calls[1], ('AAPL', '2023-06-01', '2023-09-01'))
+        expected = self.sources['AAPL'].loc[:'2023-08-31']
+        self.assertEqual(added, len(self.sources['AAPL'].loc['2023-06-01':'2023-08-31']))
+
+        df = read_frame(os.path.join(self.data_dir, 'AAPL_historical.csv'))
+        pd.testing.assert_frame_equal(df, expected, check_freq=False, check_dtype=False)
+        csv = pd.read_csv(os.path.join(self.data_dir, 'AAPL_historical.csv'), index_col='Date', parse_dates=['Date'])
+        self.assertEqual(len(csv), len(expected))
+
+        # Nothing is missing, so the provider is not called again
+        self.assertEqual(update_ticker('AAPL', provider, self.data_dir, end_date='2023-09-01'), 0)
+        self.assertEqual(len(provider.calls), 2)
+
+    def test_retry_and_failure(self):
+        """Transient errors are retried; a ticker that keeps failing is reported as None."""
+        provider = FlakyProvider(self.source, failures=2)
+        results = fetch_tickers(['AAPL'], provider, self.data_dir, end_date='2023-03-01', retries=3, backoff=1)
+        self.assertEqual(len(provider.calls), 3)
+        self.assertGreater(results['AAPL'], 0)
+
+        results = fetch_tickers(['AAPL', 'TSLA'], CSVProvider(self.source), self.data_dir,
+                                end_date='2023-04-01', retries=2, backoff=1)
+        self.assertGreater(results['AAPL'], 0)
+        self.assertIsNone(results['TSLA'])
+
+    def test_concurrent_fetch_speed(self):
+        """Benchmark: a bounded pool overlaps provider latency across tickers."""
+        def timed(workers):
+            data_dir = tempfile.mkdtemp()
+            try:
+                start = time.perf_counter()
+                fetch_tickers(TICKERS, CSVProvider(self.source, delay=0.1), data_dir,
+                              end_date='2024-01-01', max_workers=workers)
+                return time.perf_counter() - start
+            finally:
+                shutil.rmtree(data_dir)
+
+        sequential, concurrent = timed(1), timed(len(TICKERS))
+        self.assertLess(concurrent, sequential / 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from src.analyze import calculate_indicators
+from src.incremental import IncrementalIndicators, update_signals
+from src.rules import DEFAULT_RULES, DEFAULT_SIGNAL_RULES, SignalRules
+from tests.test_rules import random_fields
+
+def make_history(seed=0, n=700):
+    """Build an OHLCV DataFrame with rounded prices, a flat stretch and a missing close."""
+    rng = np.random.default_rng(seed)
+    close = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.02, n))), 2)
+    close[300:320] = close[300]
+    close[450] = np.nan
+    return pd.DataFrame({
+        'Open': close, 'High': close, 'Low': close, 'Close': close, 'Volume': 1e6,
+    }, index=pd.bdate_range('2020-01-01', periods=n, name='Date'))
+
+class TestIncrementalIndicators(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        os.chdir(self.tmpdir)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmpdir)
+
+    def assertMatchesBatch(self, streamed, batch):
+        for field in ('SMA_50', 'SMA_200', 'RSI', 'Signal'):
+            np.testing.assert_array_equal(np.asarray(streamed[field], dtype=float),
+                                          batch[field].to_numpy(dtype=float), err_msg=field)
+
+    def test_matches_batch_exactly(self):
+        """Streaming every bar reproduces calculate_indicators bit for bit."""
+        df = make_history()
+        batch = calculate_indicators(df.copy())
+        indicators = IncrementalIndicators()
+        streamed = pd.DataFrame([indicators.update(close) for close in df['Close']])
+        self.assertMatchesBatch(streamed, batch)
+
+    def test_scalar_signal_matches_rules(self):
+        """The per-bar fast path for the default rules agrees with the compiled rules."""
+        fields = random_fields(2000, seed=4)
+        fields['Predicted_Close'][::7] = np.nan
+        for rules in (DEFAULT_SIGNAL_RULES, SignalRules(DEFAULT_RULES, params={'rsi_buy': 40, 'rsi_sell': 55,
+                                                                               'prediction_margin': 0.01})):
+            indicators = IncrementalIndicators(rules=rules)
+            for predicted in (fields['Predicted_Close'], None):
+                expected = rules.evaluate(dict(fields, Predicted_Close=predicted))
+                scalar = [indicators._default_signal(*values, None if predicted is None else predicted[i])
+                          for i, values in enumerate(zip(fields['Close'], fields['SMA_fast'], fields['SMA_slow'],
+                                                         fields['RSI']))]
+                np.testing.assert_array_equal(scalar, expected)
+
+    def test_resume_from_saved_state(self):
+        """Saving and reloading the state mid-stream does not change the results."""
+        df = make_history(1)
+        batch = calculate_indicators(df.copy())
+        indicators = IncrementalIndicators()
+        rows = [indicators.update(close) for close in df['Close'][:400]]
+        indicators.save('data/state.json')
+        indicators = IncrementalIndicators.load('data/state.json')
+        rows += [indicators.update(close) for close in df['Close'][400:]]
+        self.assertMatchesBatch(pd.DataFrame(rows), batch)
+
+    def test_resume_keeps_custom_rules(self):
+        """A state saved with custom rules reloads with the same rules and parameters."""
+        df = make_history(2)
+        rules = SignalRules('SMA_fast > SMA_slow and RSI < level -> buy\nRSI > 80 -> sell', params={'level': 45})
+        batch = calculate_indicators(df.copy(), rules=rules)
+        indicators = IncrementalIndicators(rules=rules)
+        rows = [indicators.update(close) for close in df['Close'][:400]]
+        indicators.save('data/state.json')
+        indicators = IncrementalIndicators.load('data/state.json')
+        self.assertEqual((indicators.rules.spec, indicators.rules.params), (rules.spec, rules.params))
+        rows += [indicators.update(close) for close in df['Close'][400:]]
+        self.assertMatchesBatch(pd.DataFrame(rows), batch)
+
+    def test_update_signals_appends_new_rows(self):
+        """update_signals only appends the new bars, and the file matches a batch run."""
+        df = make_history(2)
+        os.makedirs('data')
+        df.iloc[:650].to_csv('data/SYN_historical.csv')
+        first = update_signals('SYN')
+        self.assertEqual(len(first), 650)
+
+        df.to_csv('data/SYN_historical.csv')
+        appended = update_signals('SYN')
+        self.assertEqual(len(appended), 50)
+        self.assertEqual(appended.index[0], df.index[650])
+        self.assertTrue(update_signals('SYN').empty)
+
+        signals = pd.read_csv('data/signals.csv', index_col='Date', parse_dates=['Date'], float_precision='round_trip')
+        batch = calculate_indicators(df.copy())
+        self.assertEqual(list(signals.columns), list(batch.columns))
+        self.assertEqual(len(signals), len(df))
+        self.assertMatchesBatch(signals, batch)
+
+if __name__ == '__main__':
+    unittest.main()
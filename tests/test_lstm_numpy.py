@@ -0,0 +1,214 @@
+import unittest
+import importlib.util
+import os
+import shutil
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+from src.lstm_numpy import NumpyLSTM, save_weights, load_weights
+from src.model_registry import ModelRegistry, data_hash
+from src.storage import read_frame
+
+def random_layers(features, seed=0, units=50):
+    """Exported layers with the build_lstm_model architecture and random weights."""
+    rng = np.random.default_rng(seed)
+    def lstm(inputs, return_sequences):
+        return {'type': 'lstm', 'activation': 'tanh', 'return_sequences': return_sequences,
+                'weights': [rng.normal(0, 0.3, (inputs, 4 * units)), rng.normal(0, 0.3, (units, 4 * units)),
+                            rng.normal(0, 0.1, 4 * units)]}
+    return [lstm(features, True), lstm(units, False),
+            {'type': 'dense', 'activation': 'linear', 'weights': [rng.normal(0, 0.3, (units, 25)), rng.normal(0, 0.1, 25)]},
+            {'type': 'dense', 'activation': 'linear', 'weights': [rng.normal(0, 0.3, (25, 1)), rng.normal(0, 0.1, 1)]}]
+
+def reference_predict(layers, X):
+    """Per-sample, per-step LSTM written directly from the gate equations."""
+    sigmoid = lambda x: 1.0 / (1.0 + np.exp(-x))
+    outputs = []
+    for sample in X:
+        out = sample
+        for layer in layers:
+            if layer['type'] == 'lstm':
+                W, U, b = layer['weights']
+                W_i, W_f, W_c, W_o = np.split(W, 4, axis=1)
+                U_i, U_f, U_c, U_o = np.split(U, 4, axis=1)
+                b_i, b_f, b_c, b_o = np.split(b, 4)
+                h = np.zeros(U.shape[0])
+                c = np.zeros(U.shape[0])
+                states = []
+                for x in out:
+                    i = sigmoid(x @ W_i + h @ U_i + b_i)
+                    f = sigmoid(x @ W_f + h @ U_f + b_f)
+                    o = sigmoid(x @ W_o + h @ U_o + b_o)
+                    c = f * c + i * np.tanh(x @ W_c + h @ U_c + b_c)
+                    h = o * np.tanh(c)
+                    states.append(h)
+                out = np.array(states) if layer['return_sequences'] else h
+            else:
+                W, b = layer['weights']
+                out = out @ W + b
+        outputs.append(out)
+    return np.array(outputs)
+
+class WeightsOnlyModel:
+    """Stand-in for a saved Keras model; only the exported weights are used by NumPy inference."""
+
+    def save(self, path):
+        open(path, 'wb').close()
+
+KERAS_FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'keras_lstm.npz')
+
+def write_keras_fixture(path=KERAS_FIXTURE):
+    """
+    Record a build_lstm_model network's exported weights, inputs and Keras outputs (needs TensorFlow).
+
+    Regenerate with: python -c "from tests.test_lstm_numpy import write_keras_fixture; write_keras_fixture()"
+    """
+    from src.ml_predict import build_lstm_model
+    from src.lstm_numpy import export_lstm_weights
+    model = build_lstm_model((30, 2))
+    X = np.random.default_rng(3).uniform(0, 1, (16, 30, 2)).astype(np.float32)
+    layers = export_lstm_weights(model)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    save_weights([dict(layer, weights=[w.astype(np.float32) for w in layer['weights']]) for layer in layers], path)
+    with np.load(path) as data:
+        arrays = dict(data)
+    np.savez_compressed(path, inputs=X, outputs=model.predict(X, verbose=0), **arrays)
+
+class TestNumpyLSTM(unittest.TestCase):
+    def test_matches_reference(self):
+        """The vectorized forward pass equals the gate-by-gate reference."""
+        layers = random_layers(3)
+        X = np.random.default_rng(1).uniform(0, 1, (8, 20, 3))
+        np.testing.assert_allclose(NumpyLSTM(layers).predict(X), reference_predict(layers, X), rtol=1e-10, atol=1e-12)
+
+    def test_stacked_models(self):
+        """Stacked models give the same outputs as each model on its own."""
+        models = [random_layers(2, seed) for seed in range(4)]
+        X = np.random.default_rng(2).uniform(0, 1, (4, 16, 10, 2))
+        stacked = NumpyLSTM(models).predict(X)
+        self.assertEqual(stacked.shape, (4, 16, 1))
+        for position, layers in enumerate(models):
+            np.testing.assert_allclose(stacked[position], NumpyLSTM(layers).predict(X[position]), rtol=1e-12)
+        with self.assertRaises(ValueError):
+            NumpyLSTM([random_layers(2), random_layers(3)])
+
+    def test_save_and_load(self):
+        """Weights round-trip through the .npz format."""
+        layers = random_layers(2)
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'weights.npz')
+            save_weights(layers, path)
+            loaded = load_weights(path)
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual([layer['type'] for layer in loaded], ['lstm', 'lstm', 'dense', 'dense'])
+        self.assertTrue(loaded[0]['return_sequences'])
+        for original, restored in zip(layers, loaded):
+            for a, b in zip(original['weights'], restored['weights']):
+                np.testing.assert_array_equal(a, b)
+
+    @unittest.skipUnless(importlib.util.find_spec('tensorflow'), 'TensorFlow is not installed')
+    def test_matches_keras(self):
+        """Outputs match the Keras model built by build_lstm_model."""
+        from src.ml_predict import build_lstm_model
+        model = build_lstm_model((30, 2))
+        X = np.random.default_rng(3).uniform(0, 1, (64, 30, 2)).astype(np.float32)
+        np.testing.assert_allclose(NumpyLSTM.from_keras(model).predict(X), model.predict(X, verbose=0), atol=1e-5)
+
+    def test_matches_recorded_keras_outputs(self):
+        """Outputs match those Keras produced for the recorded weights (see write_keras_fixture)."""
+        with np.load(KERAS_FIXTURE) as data:
+            X, expected = data['inputs'], data['outputs']
+        layers = load_weights(KERAS_FIXTURE)
+        self.assertEqual([layer['type'] for layer in layers], ['lstm', 'lstm', 'dense', 'dense'])
+        np.testing.assert_allclose(NumpyLSTM(layers).predict(X), expected, atol=1e-5)
+
+    def test_input_projection_memory(self):
+        """Inputs are projected per time step, not held as one (models, samples, steps, 4 * units) array."""
+        models = [random_layers(1, seed) for seed in range(4)]
+        X = np.random.default_rng(4).uniform(0, 1, (4, 500, 60, 1))
+        full_projection = X[..., 0].nbytes * 4 * 50
+        tracemalloc.start()
+        try:
+            NumpyLSTM(models).predict(X)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, full_projection / 2)
+
+    def test_predict_prices_numpy(self):
+        """Stored weights predict every ticker in one stacked pass, without TensorFlow."""
+        from src.ml_predict import predict_prices_numpy, prepare_data, inverse_scale_target
+        cwd = os.getcwd()
+        workdir = tempfile.mkdtemp()
+        os.chdir(workdir)
+        try:
+            os.makedirs('data')
+            registry = ModelRegistry('models')
+            params = {'epochs': 10, 'feature_cols': ['Close']}
+            expected = {}
+            for seed, ticker in enumerate(['AAPL', 'MSFT', 'GOOG']):
+                rng = np.random.default_rng(seed)
+                df = pd.DataFrame({'Close': 100 + np.cumsum(rng.normal(0, 1, 200 + 10 * seed))},
+                                  index=pd.bdate_range('2023-01-02', periods=200 + 10 * seed, name='Date'))
+                df.to_csv(f'data/{ticker}_historical.csv')
+                df = read_frame(f'data/{ticker}_historical.csv')
+                _, scaler, X, _ = prepare_data(df, lookback=20)
+                layers = random_layers(1, seed)
+                key = registry.make_key(ticker, 20, params, data_hash(df[['Close']].to_numpy(dtype=np.float64)))
+                registry.save(key, WeightsOnlyModel(), scaler, {'ticker': ticker}, weights=layers)
+                X_test = X[int(len(X) * 0.8):]
+                expected[ticker] = inverse_scale_target(scaler, reference_predict(layers, X_test)).ravel()
+
+            results = predict_prices_numpy(['AAPL', 'MSFT', 'GOOG', 'TSLA'], lookback=20, registry=registry)
+            self.assertEqual(sorted(results), ['AAPL', 'GOOG', 'MSFT'])
+            for ticker, df in results.items():
+                predicted = df['Predicted_Close'].dropna().to_numpy()
+                np.testing.assert_allclose(predicted, expected[ticker], rtol=1e-10)
+                self.assertTrue(os.path.exists(f'data/{ticker}_predictions.csv'))
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir)
+
+    def test_predict_prices_numpy_after_new_bars(self):
+        """After a bar is appended, the latest weights for the ticker and settings are used."""
+        from src.ml_predict import predict_prices_numpy, prepare_data, inverse_scale_target
+        cwd = os.getcwd()
+        workdir = tempfile.mkdtemp()
+        os.chdir(workdir)
+        try:
+            os.makedirs('data')
+            registry = ModelRegistry('models')
+            params = {'epochs': 10, 'feature_cols': ['Close']}
+            rng = np.random.default_rng(5)
+            df = pd.DataFrame({'Close': 100 + np.cumsum(rng.normal(0, 1, 201))},
+                              index=pd.bdate_range('2023-01-02', periods=201, name='Date'))
+            df.iloc[:200].to_csv('data/AAPL_historical.csv')
+            trained = read_frame('data/AAPL_historical.csv')
+            _, scaler, _, _ = prepare_data(trained, lookback=20)
+            layers = random_layers(1, 5)
+            key = registry.make_key('AAPL', 20, params, data_hash(trained[['Close']].to_numpy(dtype=np.float64)))
+            registry.save(key, WeightsOnlyModel(), scaler, {'ticker': 'AAPL', 'lookback': 20, 'params': params,
+                                                            'rows': 200}, weights=layers)
+
+            # A new bar arrives after training
+            df.to_csv('data/AAPL_historical.csv')
+            current = read_frame('data/AAPL_historical.csv')
+            _, _, X, _ = prepare_data(current, lookback=20, scaler=scaler)
+            expected = inverse_scale_target(scaler, reference_predict(layers, X[int(len(X) * 0.8):])).ravel()
+
+            results = predict_prices_numpy(['AAPL'], lookback=20, registry=registry)
+            self.assertIn('AAPL', results)
+            predicted = results['AAPL']['Predicted_Close']
+            self.assertFalse(np.isnan(predicted.iloc[-1]))
+            np.testing.assert_allclose(predicted.dropna().to_numpy(), expected, rtol=1e-10)
+            # Other settings do not match the stored model
+            self.assertEqual(predict_prices_numpy(['AAPL'], lookback=30, registry=registry), {})
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir)
+
+if __name__ == '__main__':
+    unittest.main()
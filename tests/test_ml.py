@@ -0,0 +1,155 @@
+import unittest
+import importlib.util
+import os
+import shutil
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+from src.ml_predict import prepare_data, iter_batches, inverse_scale_target, MultiTickerWindows, train_multi_ticker, use_cpu_only
+
+def make_prices(n=2000):
+    """Build a DataFrame with Close, Volume and RSI-like columns."""
+    rng = np.random.default_rng(7)
+    close = 100.0 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({'Close': close, 'Volume': rng.integers(1000, 5000, n).astype(float),
+                         'RSI': rng.uniform(0, 100, n)},
+                        index=pd.bdate_range('2015-01-01', periods=n, name='Date'))
+
+def loop_sequences(scaled_data, lookback):
+    """The original list-append sequence builder, used as the reference."""
+    X, y = [], []
+    for i in range(lookback, len(scaled_data)):
+        X.append(scaled_data[i - lookback:i])
+        y.append(scaled_data[i, 0])
+    return np.array(X), np.array(y)
+
+class TestPrepareData(unittest.TestCase):
+    def test_matches_loop(self):
+        """Strided sequences equal the loop-built ones for one and several features."""
+        df = make_prices(500)
+        for feature_cols in (None, ['Close', 'Volume', 'RSI']):
+            scaled_data, scaler, X, y = prepare_data(df, lookback=30, feature_cols=feature_cols)
+            X_loop, y_loop = loop_sequences(scaled_data, 30)
+            np.testing.assert_array_equal(X, X_loop)
+            np.testing.assert_array_equal(y, y_loop)
+        self.assertEqual(X.shape, (470, 30, 3))
+
+    def test_target_is_first_feature(self):
+        """The target column leads the features, and predictions scale back to prices."""
+        df = make_prices(300)
+        scaled_data, scaler, X, y = prepare_data(df, lookback=10, feature_cols=['RSI', 'Close'])
+        np.testing.assert_allclose(inverse_scale_target(scaler, y).ravel(), df['Close'].to_numpy()[10:])
+        single = MinMaxScaler().fit(df[['Close']])
+        np.testing.assert_allclose(inverse_scale_target(scaler, y[:5]), single.inverse_transform(y[:5].reshape(-1, 1)))
+
+    def test_views_and_batches(self):
+        """X is a read-only view of the scaled data; batches rebuild it exactly."""
+        scaled_data, scaler, X, y = prepare_data(make_prices(400), lookback=20, feature_cols=['Close', 'Volume'])
+        self.assertTrue(np.shares_memory(X, scaled_data))
+        self.assertFalse(X.flags.writeable)
+        batches = list(iter_batches(X, y, batch_size=64))
+        self.assertEqual(len(batches), int(np.ceil(len(X) / 64)))
+        self.assertTrue(batches[0][0].flags.c_contiguous)
+        np.testing.assert_array_equal(np.concatenate([b[0] for b in batches]), X)
+        np.testing.assert_array_equal(np.concatenate([b[1] for b in batches]), y)
+
+    def test_shuffled_batches(self):
+        """Shuffled batches visit every window once, in a seeded order."""
+        scaled_data, scaler, X, y = prepare_data(make_prices(400), lookback=20)
+        batches = list(iter_batches(X, y, batch_size=64, shuffle=True, seed=3))
+        X_all = np.concatenate([b[0] for b in batches])
+        y_all = np.concatenate([b[1] for b in batches])
+        order = np.random.default_rng(3).permutation(len(X))
+        np.testing.assert_array_equal(X_all, X[order])
+        np.testing.assert_array_equal(y_all, y[order])
+        self.assertFalse(np.array_equal(y_all, y))
+
+    @unittest.skipUnless(importlib.util.find_spec('tensorflow'), 'TensorFlow is not installed')
+    def test_sequence_dataset(self):
+        """The tf.data pipeline streams the same batches as iter_batches."""
+        from src.ml_predict import sequence_dataset
+        scaled_data, scaler, X, y = prepare_data(make_prices(300), lookback=20)
+        batches = [(X_batch.numpy(), y_batch.numpy()) for X_batch, y_batch in sequence_dataset(X, y, batch_size=50)]
+        np.testing.assert_allclose(np.concatenate([b[0] for b in batches]), X, rtol=1e-6)
+        np.testing.assert_allclose(np.concatenate([b[1] for b in batches]), y, rtol=1e-6)
+
+    def test_invalid_input(self):
+        """Missing columns or too few rows return None values."""
+        df = make_prices(50)
+        self.assertIsNone(prepare_data(df, feature_cols=['Close', 'Missing'])[0])
+        self.assertIsNone(prepare_data(df, lookback=60)[0])
+
+    def test_memory_constant_in_lookback(self):
+        """Benchmark: peak memory does not grow with lookback, unlike the loop."""
+        df = make_prices(20000)
+
+        def peak_memory(build):
+            tracemalloc.start()
+            build()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return peak
+
+        peaks = {lookback: peak_memory(lambda: prepare_data(df, lookback=lookback, feature_cols=['Close', 'Volume']))
+                 for lookback in (10, 240)}
+        scaled_data = prepare_data(df, lookback=240, feature_cols=['Close', 'Volume'])[0]
+        loop_peak = peak_memory(lambda: loop_sequences(scaled_data, 240))
+
+        self.assertLess(peaks[240], peaks[10] * 1.5)
+        self.assertLess(peaks[240] * 10, loop_peak)
+
+class TestMultiTickerWindows(unittest.TestCase):
+    def setUp(self):
+        self.frames = {ticker: make_prices(n) for ticker, n in (('AAPL', 300), ('MSFT', 420), ('GOOG', 250))}
+
+    def test_matches_per_ticker_sequences(self):
+        """Each ticker's windows and targets equal its own prepare_data training split."""
+        windows = MultiTickerWindows(self.frames, lookback=30, feature_cols=['Close', 'Volume'])
+        self.assertEqual(windows.n_features, 2)
+        for ticker, df in self.frames.items():
+            _, scaler, X, y = prepare_data(df, lookback=30, feature_cols=['Close', 'Volume'])
+            train_size = int(len(X) * 0.8)
+            batches = list(windows.batches(batch_size=64, shuffle=False, tickers=[ticker]))
+            np.testing.assert_allclose(np.concatenate([b[0] for b in batches]), X[:train_size], rtol=1e-6)
+            np.testing.assert_allclose(np.concatenate([b[2] for b in batches]), y[:train_size], rtol=1e-6)
+            self.assertTrue(all((b[1] == windows.tickers.index(ticker)).all() for b in batches))
+            np.testing.assert_array_equal(windows.scalers[ticker].data_max_, scaler.data_max_)
+
+    def test_shuffled_batches_cover_every_window(self):
+        """A shuffled epoch visits every training window once, mixing tickers within batches."""
+        windows = MultiTickerWindows(self.frames, lookback=20)
+        batches = list(windows.batches(batch_size=100, seed=1))
+        self.assertEqual(sum(len(b[2]) for b in batches), len(windows))
+        self.assertEqual(batches[0][0].shape, (100, 20, 1))
+        self.assertEqual(batches[0][0].dtype, np.float32)
+        self.assertGreater(len(np.unique(batches[0][1])), 1)
+        counts = np.bincount(np.concatenate([b[1] for b in batches]))
+        np.testing.assert_array_equal(counts, [int((n - 20) * 0.8) for n in (300, 420, 250)])
+
+    @unittest.skipUnless(importlib.util.find_spec('tensorflow'), 'TensorFlow is not installed')
+    def test_train_multi_ticker(self):
+        """Shared and per-ticker training report per-epoch timing and throughput."""
+        cwd = os.getcwd()
+        workdir = tempfile.mkdtemp()
+        os.chdir(workdir)
+        try:
+            os.makedirs('data')
+            for ticker, df in self.frames.items():
+                df.to_csv(f'data/{ticker}_historical.csv')
+            for mode in ('shared', 'per_ticker'):
+                result = train_multi_ticker(list(self.frames), lookback=20, epochs=2, mode=mode, workers=2)
+                self.assertIsNotNone(result)
+                self.assertGreater(result['samples_per_sec'], 0)
+            self.assertEqual(len(result['models']), 3)
+            self.assertEqual(len(result['epochs']['AAPL']), 2)
+            import tensorflow as tf
+            self.assertEqual(tf.config.get_visible_devices('GPU'), [])
+            use_cpu_only()  # Safe to call again once TensorFlow is initialized
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir)
+
+if __name__ == '__main__':
+    unittest.main()
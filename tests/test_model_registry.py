@@ -0,0 +1,100 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from sklearn.preprocessing import MinMaxScaler
+from src.model_registry import ModelRegistry, data_hash
+
+class WeightsModel:
+    """Minimal model with the save(path) interface the registry expects."""
+
+    def __init__(self, weights):
+        self.weights = np.asarray(weights, dtype=np.float64)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            np.save(f, self.weights)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls(np.load(f))
+
+class TestModelRegistry(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def registry(self, **kwargs):
+        return ModelRegistry(self.root, model_loader=WeightsModel.load, **kwargs)
+
+    def test_key_depends_on_settings_and_data(self):
+        """Keys change with the ticker, lookback, hyperparameters or training data."""
+        data = np.arange(100.0)
+        params = {'epochs': 10, 'feature_cols': ['Close']}
+        key = ModelRegistry.make_key('AAPL', 60, params, data_hash(data))
+        self.assertEqual(key, ModelRegistry.make_key('AAPL', 60, dict(params), data_hash(data.copy())))
+        self.assertTrue(key.startswith('AAPL_lb60_'))
+        others = {
+            ModelRegistry.make_key('MSFT', 60, params, data_hash(data)),
+            ModelRegistry.make_key('AAPL', 30, params, data_hash(data)),
+            ModelRegistry.make_key('AAPL', 60, {'epochs': 5, 'feature_cols': ['Close']}, data_hash(data)),
+            ModelRegistry.make_key('AAPL', 60, params, data_hash(np.append(data, 100.0))),
+        }
+        self.assertEqual(len(others), 4)
+        self.assertNotIn(key, others)
+
+    def test_save_and_load(self):
+        """A saved model and scaler round-trip with their metadata."""
+        registry = self.registry()
+        scaler = MinMaxScaler().fit(np.arange(10.0).reshape(-1, 1))
+        registry.save('AAPL_lb60_abc', WeightsModel([1.0, 2.0]), scaler, {'ticker': 'AAPL', 'lookback': 60})
+
+        self.assertIn('AAPL_lb60_abc', registry)
+        model, loaded_scaler, meta = registry.load('AAPL_lb60_abc')
+        np.testing.assert_array_equal(model.weights, [1.0, 2.0])
+        np.testing.assert_array_equal(loaded_scaler.transform([[4.5]]), scaler.transform([[4.5]]))
+        self.assertEqual(meta['ticker'], 'AAPL')
+        self.assertGreater(meta['size'], 0)
+        self.assertIsNone(registry.load('missing'))
+
+    def test_lru_eviction(self):
+        """The least recently used entry is evicted when max_entries is exceeded."""
+        registry = self.registry(max_entries=2)
+        registry.save('a', WeightsModel([1.0]), None)
+        time.sleep(0.01)
+        registry.save('b', WeightsModel([2.0]), None)
+        time.sleep(0.01)
+        registry.load('a')  # 'b' is now the least recently used
+        time.sleep(0.01)
+        registry.save('c', WeightsModel([3.0]), None)
+
+        self.assertEqual(sorted(registry.entries()), ['a', 'c'])
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'b')))
+
+    def test_size_eviction(self):
+        """Entries are evicted oldest first to stay under max_bytes; the new one is kept."""
+        registry = self.registry(max_entries=10, max_bytes=20000)
+        for i, key in enumerate(['a', 'b', 'c']):
+            registry.save(key, WeightsModel(np.zeros(1000)), None)
+            time.sleep(0.01)
+        self.assertEqual(sorted(registry.entries()), ['b', 'c'])
+        self.assertLessEqual(sum(meta['size'] for meta in registry.entries().values()), 20000)
+
+    def test_latest(self):
+        """latest() finds the newest entry with matching metadata for warm starts."""
+        registry = self.registry()
+        params = {'epochs': 10, 'feature_cols': ['Close']}
+        registry.save('old', WeightsModel([1.0]), None, {'ticker': 'AAPL', 'lookback': 60, 'params': params})
+        time.sleep(0.01)
+        registry.save('new', WeightsModel([2.0]), None, {'ticker': 'AAPL', 'lookback': 60, 'params': params})
+        registry.save('msft', WeightsModel([3.0]), None, {'ticker': 'MSFT', 'lookback': 60, 'params': params})
+        self.assertEqual(registry.latest(ticker='AAPL', lookback=60, params=params), 'new')
+        self.assertIsNone(registry.latest(ticker='AAPL', lookback=30, params=params))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from src.optimize import expand_param_grid, optimize_strategy, sample_params, successive_halving
+from src.synthetic import generate_ohlcv, write_synthetic
+
+class TestOptimizeStrategy(unittest.TestCase):
+    def setUp(self):
+        """Run each test in a temporary directory with a synthetic historical file."""
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        os.chdir(self.tmpdir)
+        rng = np.random.default_rng(3)
+        n = 800
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+        open_ = close * (1 + rng.normal(0, 0.005, n))
+        df = pd.DataFrame({
+            'Open': open_,
+            'High': np.maximum(open_, close) * 1.01,
+            'Low': np.minimum(open_, close) * 0.99,
+            'Close': close,
+            'Volume': 1e6,
+        }, index=pd.bdate_range('2020-01-01', periods=n, name='Date'))
+        os.makedirs('data')
+        df.to_csv('data/SYN_historical.csv')
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmpdir)
+
+    def test_expand_param_grid(self):
+        """Invalid SMA combinations are skipped and extra parameters are crossed in."""
+        combinations = expand_param_grid({'sma_50': [50, 200], 'sma_200': [100, 200], 'stop_loss': [0.03, 0.05]})
+        self.assertEqual(len(combinations), 4)
+        self.assertEqual(combinations[0], {'sma_50': 50, 'sma_200': 100, 'stop_loss': 0.03})
+
+    def test_parallel_matches_sequential(self):
+        """The process-pool search finds the same best result as the sequential loop."""
+        grid = {'sma_50': [20, 30], 'sma_200': [100, 150], 'stop_loss': [0.03, 0.05], 'take_profit': [0.1, 0.2]}
+        sequential = optimize_strategy('SYN', param_grid=grid, engine='vectorized')
+        parallel = optimize_strategy('SYN', param_grid=grid, engine='vectorized', workers=2)
+        self.assertIsNotNone(sequential)
+        self.assertEqual(sequential, parallel)
+        self.assertTrue(os.path.exists('data/SYN_optimization.txt'))
+
+    def test_engines_agree(self):
+        """Backtrader and vectorized engines pick the same parameters."""
+        grid = {'sma_50': [20, 50], 'sma_200': [100], 'take_profit': [0.1, 0.2]}
+        cerebro = optimize_strategy('SYN', param_grid=grid, workers=2)
+        vectorized = optimize_strategy('SYN', param_grid=grid, engine='vectorized')
+        self.assertEqual(cerebro['params'], vectorized['params'])
+        self.assertAlmostEqual(cerebro['final_value'], vectorized['final_value'], places=6)
+
+    def test_threshold_variants_match_single_runs(self):
+        """Combinations evaluated together in one broadcast rules call score as when run alone."""
+        grid = {'sma_50': [20], 'sma_200': [100], 'rsi_buy': [25, 40], 'rsi_sell': [60, 75],
+                'stop_loss': [0.03, 0.05]}
+        optimize_strategy('SYN', param_grid=grid, engine='vectorized')
+        log = pd.read_csv('data/SYN_optimization_log.csv')
+        self.assertEqual(len(log), 8)
+        for row in log.itertuples():
+            single = {name: [getattr(row, name)] for name in grid}
+            alone = optimize_strategy('SYN', param_grid=single, engine='vectorized')
+            self.assertAlmostEqual(alone['returns'], row.returns, places=10)
+
+class TestAdaptiveSearch(unittest.TestCase):
+    GRID = {'sma_50': [10, 20, 30, 50, 70, 90], 'sma_200': [100, 150, 200, 250, 300],
+            'stop_loss': [0.02, 0.05, 0.1], 'take_profit': [0.05, 0.1, 0.2, 0.3],
+            'rsi_buy': [25, 30, 35, 40], 'rsi_sell': [60, 70]}
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        os.chdir(self.tmpdir)
+        write_synthetic(generate_ohlcv(tickers=1, years=10, seed=2), 'data')
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmpdir)
+
+    def test_sample_params(self):
+        """Samples are distinct, valid and reproducible; small grids are returned whole."""
+        first = sample_params(self.GRID, 50, np.random.default_rng(1))
+        self.assertEqual(first, sample_params(self.GRID, 50, np.random.default_rng(1)))
+        self.assertEqual(len({tuple(params.items()) for params in first}), 50)
+        self.assertTrue(all(params['sma_50'] < params['sma_200'] for params in first))
+        small = {'sma_50': [20, 300], 'sma_200': [100, 200]}
+        self.assertEqual(len(sample_params(small, 10, np.random.default_rng(1))), 2)
+
+    def test_successive_halving_rungs(self):
+        """Each rung keeps the best 1/eta candidates and tests them on an eta times longer slice."""
+        calls = []
+        def evaluate(candidates, starts):
+            calls.append((len(candidates), starts[0]))
+            # Larger x is better on the slices, smaller x on the full history
+            return [{'returns': params['x'] if starts[0] else -params['x'], 'final_value': 0.0}
+                    for params in candidates]
+        (params, result), log = successive_halving(evaluate, [{'x': x} for x in range(27)], 900, eta=3,
+                                                   min_fraction=1 / 9)
+        self.assertEqual(calls, [(27, 800), (9, 600), (3, 0)])
+        self.assertEqual(len(log), 39)
+        self.assertEqual(params, {'x': 24})  # Best on the full history among the promoted 24, 25, 26
+
+    def test_halving_comparable_to_dense_grid(self):
+        """Successive halving lands near the top of a dense grid for a few percent of its cost."""
+        grid = optimize_strategy('SYN000', param_grid=self.GRID, engine='vectorized')
+        grid_returns = pd.read_csv('data/SYN000_optimization_log.csv')['returns']
+        halving = optimize_strategy('SYN000', param_grid=self.GRID, engine='vectorized',
+                                    search='halving', budget=30, seed=0)
+        log = pd.read_csv('data/SYN000_optimization_log.csv')
+        self.assertEqual(halving['backtests'], len(log))
+        self.assertEqual(sorted(log['rung'].unique()), [0, 1, 2])
+        self.assertAlmostEqual(halving['cost'], 30, delta=1)
+        self.assertLess(halving['cost'], 0.05 * grid['cost'])
+        self.assertLessEqual((grid_returns > halving['returns']).mean(), 0.1)
+        # Same seed, same search
+        again = optimize_strategy('SYN000', param_grid=self.GRID, engine='vectorized',
+                                  search='halving', budget=30, seed=0)
+        self.assertEqual(again, halving)
+
+    def test_parallel_halving(self):
+        """The process pool is reused across rungs and gives the sequential result."""
+        options = {'param_grid': self.GRID, 'engine': 'vectorized', 'search': 'halving', 'budget': 5, 'seed': 4}
+        self.assertEqual(optimize_strategy('SYN000', **options),
+                         optimize_strategy('SYN000', workers=2, **options))
+        self.assertIsNone(optimize_strategy('SYN000', search='halving', eta=1))
+        self.assertIsNone(optimize_strategy('SYN000', search='bayesian'))
+
+if __name__ == '__main__':
+    unittest.main()
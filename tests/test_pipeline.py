@@ -0,0 +1,159 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+from apscheduler.schedulers.background import BackgroundScheduler
+from src.model_registry import ModelRegistry, data_hash
+from src.pipeline import Pipeline, Stage, build_pipeline
+from tests.test_lstm_numpy import WeightsOnlyModel, random_layers
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.dir, 'state.json')
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def write(self, name, content):
+        with open(self.path(name), 'w') as f:
+            f.write(content)
+
+    def copy_stage(self, name, source, target, deps=(), delay=0.0):
+        """Stage that copies source to target, recording its call."""
+        def run():
+            with self.lock:
+                self.calls.append(name)
+            time.sleep(delay)
+            with open(self.path(source)) as f:
+                content = f.read()
+            self.write(target, content.upper())
+            return True
+        return Stage(name, run, inputs=[self.path(source)], outputs=[self.path(target)], deps=deps)
+
+    def chain(self, ticker, delay=0.0):
+        """raw -> clean -> report stages for one ticker."""
+        self.write(f'{ticker}_raw.txt', f'{ticker} prices')
+        return [self.copy_stage(f'clean:{ticker}', f'{ticker}_raw.txt', f'{ticker}_clean.txt', delay=delay),
+                self.copy_stage(f'report:{ticker}', f'{ticker}_clean.txt', f'{ticker}_report.txt',
+                                deps=[f'clean:{ticker}'], delay=delay)]
+
+    def test_runs_in_dependency_order(self):
+        """Every stage runs after its dependencies and its result is recorded."""
+        pipeline = Pipeline(self.chain('AAPL') + self.chain('MSFT'), state_file=self.state_file)
+        results = pipeline.run()
+        self.assertEqual({result['status'] for result in results.values()}, {'success'})
+        self.assertLess(self.calls.index('clean:AAPL'), self.calls.index('report:AAPL'))
+        self.assertLess(self.calls.index('clean:MSFT'), self.calls.index('report:MSFT'))
+        state = pipeline.load_state()
+        self.assertEqual(sorted(state), ['clean:AAPL', 'clean:MSFT', 'report:AAPL', 'report:MSFT'])
+        self.assertGreaterEqual(state['report:AAPL']['duration'], 0.0)
+        self.assertIn('finished_at', state['report:AAPL'])
+
+    def test_independent_tickers_run_in_parallel(self):
+        """Chains of different tickers overlap in time."""
+        stages = [stage for ticker in ('AAPL', 'MSFT', 'GOOG', 'AMZN') for stage in self.chain(ticker, delay=0.1)]
+        start = time.perf_counter()
+        Pipeline(stages, state_file=self.state_file, max_workers=4).run()
+        self.assertLess(time.perf_counter() - start, 0.6)  # 0.8 s if run serially
+
+    def test_skips_unchanged_inputs(self):
+        """Stages with unchanged inputs are skipped; a change reruns only what depends on it."""
+        Pipeline(self.chain('AAPL') + self.chain('MSFT'), state_file=self.state_file).run()
+        self.calls.clear()
+
+        pipeline = Pipeline(self.chain('AAPL') + self.chain('MSFT'), state_file=self.state_file)
+        self.write('MSFT_raw.txt', 'MSFT new prices')
+        results = pipeline.run()
+        self.assertEqual(sorted(self.calls), ['clean:MSFT', 'report:MSFT'])
+        self.assertEqual(results['clean:AAPL']['status'], 'skipped')
+        self.assertEqual(results['report:AAPL']['status'], 'skipped')
+
+        # A missing output forces a rerun even when inputs are unchanged
+        self.calls.clear()
+        os.remove(self.path('AAPL_report.txt'))
+        pipeline.run()
+        self.assertEqual(self.calls, ['report:AAPL'])
+
+    def test_failure_blocks_dependents(self):
+        """A failing stage blocks its dependents but not other tickers, and is retried next run."""
+        def fail():
+            raise ConnectionError('provider down')
+        stages = [Stage('clean:AAPL', fail, inputs=[self.path('AAPL_raw.txt')]),
+                  self.copy_stage('report:AAPL', 'AAPL_raw.txt', 'AAPL_report.txt', deps=['clean:AAPL'])]
+        self.write('AAPL_raw.txt', 'AAPL prices')
+        results = Pipeline(stages + self.chain('MSFT'), state_file=self.state_file).run()
+        self.assertEqual(results['clean:AAPL']['status'], 'failed')
+        self.assertEqual(results['clean:AAPL']['error'], 'provider down')
+        self.assertEqual(results['report:AAPL']['status'], 'blocked')
+        self.assertEqual(results['report:MSFT']['status'], 'success')
+
+        stages[0] = Stage('clean:AAPL', lambda: True, inputs=[self.path('AAPL_raw.txt')])
+        results = Pipeline(stages, state_file=self.state_file).run()
+        self.assertEqual(results['clean:AAPL']['status'], 'success')
+        self.assertEqual(results['report:AAPL']['status'], 'success')
+
+    def test_invalid_graph(self):
+        """Unknown dependencies and cycles are rejected."""
+        with self.assertRaises(ValueError):
+            Pipeline([Stage('a', lambda: True, deps=['missing'])], state_file=self.state_file)
+        with self.assertRaises(ValueError):
+            Pipeline([Stage('a', lambda: True, deps=['b']), Stage('b', lambda: True, deps=['a'])],
+                     state_file=self.state_file)
+
+    def test_schedule_on_apscheduler(self):
+        """Scheduled runs execute each stage as a scheduler job."""
+        scheduler = BackgroundScheduler()
+        scheduler.start()
+        try:
+            pipeline = Pipeline(self.chain('AAPL') + self.chain('MSFT'), state_file=self.state_file)
+            pipeline.schedule(scheduler, minutes=60)
+            self.assertIsNotNone(scheduler.get_job('pipeline'))
+            deadline = time.time() + 10
+            while len(pipeline.results) < 4 and time.time() < deadline:
+                time.sleep(0.05)
+            self.assertTrue(pipeline.wait(timeout=5))
+            self.assertEqual({result['status'] for result in pipeline.results.values()}, {'success'})
+            self.assertTrue(os.path.exists(self.path('MSFT_report.txt')))
+        finally:
+            scheduler.shutdown(wait=True)
+
+    def test_scheduled_predict_uses_stored_weights(self):
+        """Without training, the predict stage runs the stored weights and tolerates a missing model."""
+        from src.ml_predict import prepare_data
+        cwd = os.getcwd()
+        os.chdir(self.dir)
+        try:
+            os.makedirs('data')
+            rng = np.random.default_rng(3)
+            df = pd.DataFrame({'Close': 100 + np.cumsum(rng.normal(0, 1, 300))},
+                              index=pd.bdate_range('2023-01-02', periods=300, name='Date'))
+            df.to_csv('data/AAPL_historical.csv')
+            predict = build_pipeline(['AAPL'], state_file=self.state_file, train=False).stages['predict:AAPL'].func
+
+            # No model yet: analyze still runs, on the indicator rules alone
+            self.assertTrue(predict())
+            self.assertFalse(os.path.exists('data/AAPL_predictions.csv'))
+
+            params = {'epochs': 10, 'feature_cols': ['Close']}
+            registry = ModelRegistry('models')
+            _, scaler, _, _ = prepare_data(df, lookback=60)
+            key = registry.make_key('AAPL', 60, params, data_hash(df[['Close']].to_numpy(dtype=np.float64)))
+            registry.save(key, WeightsOnlyModel(), scaler, {'ticker': 'AAPL', 'lookback': 60, 'params': params,
+                                                            'rows': 300}, weights=random_layers(1, 3))
+            self.assertTrue(predict())
+            self.assertIn('Predicted_Close', pd.read_csv('data/AAPL_predictions.csv').columns)
+        finally:
+            os.chdir(cwd)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from src.backtest import vectorized_backtest
+from src.portfolio import portfolio_backtest, run_portfolio_backtest
+from src.synthetic import generate_ohlcv, write_synthetic
+from tests.test_backtest import make_signals_df
+
+def random_matrices(tickers, n, seed=0):
+    """Random-walk close/open matrices and random signals, dates x tickers."""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2015-01-01', periods=n, name='Date')
+    columns = [f'T{i:03d}' for i in range(tickers)]
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n, tickers)), axis=0))
+    open_ = close * (1 + rng.normal(0, 0.005, (n, tickers)))
+    signals = rng.choice([0.0, 1.0, -1.0], (n, tickers), p=[0.9, 0.05, 0.05])
+    return (pd.DataFrame(signals, index, columns), pd.DataFrame(close, index, columns),
+            pd.DataFrame(open_, index, columns))
+
+class TestPortfolioBacktest(unittest.TestCase):
+    def test_single_ticker_matches_vectorized_backtest(self):
+        """With one ticker and one-unit orders the portfolio reproduces the single-instrument engine."""
+        for seed in range(3):
+            df = make_signals_df(seed)
+            expected = vectorized_backtest(df, commission=0.002)
+            actual = portfolio_backtest(df[['Signal']].set_axis(['AAPL'], axis=1),
+                                        df[['Close']].set_axis(['AAPL'], axis=1),
+                                        df[['Open']].set_axis(['AAPL'], axis=1),
+                                        cash=10000.0, commission=0.002, sizing='units', units=1)
+            self.assertAlmostEqual(expected['final_value'], actual['final_value'], places=6)
+            self.assertAlmostEqual(expected['win_rate'], actual['win_rate'], places=6)
+            self.assertAlmostEqual(expected['sharpe_ratio'], actual['sharpe_ratio'], places=6)
+
+    def test_per_ticker_units_add_up(self):
+        """Unit orders with ample cash equal the sum of independent single-ticker backtests."""
+        signals, close, open_ = random_matrices(5, 600, seed=1)
+        result = portfolio_backtest(signals, close, open_, cash=1e6, sizing='units', max_positions=None)
+        gains = 0.0
+        for ticker in close.columns:
+            df = pd.DataFrame({'Open': open_[ticker], 'Close': close[ticker], 'Signal': signals[ticker]})
+            gains += vectorized_backtest(df, cash=1e6)['final_value'] - 1e6
+        self.assertAlmostEqual(result['final_value'] - 1e6, gains, places=6)
+
+    def test_sizing_and_cash_constraints(self):
+        """Cash never goes negative, position slots are respected and value equals cash plus holdings."""
+        signals, close, open_ = random_matrices(50, 500, seed=2)
+        for sizing, options in (('equal_weight', {'max_positions': 10}), ('fixed_fraction', {'fraction': 0.2}),
+                                ('units', {'units': 100})):
+            result = portfolio_backtest(signals, close, open_, cash=50000.0, sizing=sizing, **options)
+            positions = result['positions']
+            self.assertGreaterEqual(result['cash'].min(), -1e-6, sizing)
+            self.assertTrue((positions >= 0).all().all())
+            np.testing.assert_allclose(result['values'], result['cash'] + (positions * close).sum(axis=1))
+            self.assertGreater(result['trades'], 0)
+            if sizing == 'equal_weight':
+                self.assertLessEqual((positions > 0).sum(axis=1).max(), 10)
+                self.assertTrue(np.allclose(positions, np.floor(positions)))
+        with self.assertRaises(ValueError):
+            portfolio_backtest(signals, close, open_, sizing='kelly')
+
+    def test_untradable_bars(self):
+        """Tickers without prices yet are not bought and do not distort the portfolio value."""
+        signals, close, open_ = random_matrices(3, 300, seed=3)
+        close.iloc[:100, 0] = np.nan
+        open_.iloc[:100, 0] = np.nan
+        signals.iloc[:, :] = 0.0
+        signals.iloc[50, 0] = 1.0
+        signals.iloc[150, 0] = 1.0
+        result = portfolio_backtest(signals, close, open_, cash=10000.0, commission=0.0, sizing='units')
+        self.assertEqual(result['positions'].iloc[:151, 0].max(), 0.0)
+        self.assertEqual(result['positions'].iloc[151, 0], 1.0)
+        self.assertFalse(result['values'].isna().any())
+
+    def test_run_portfolio_backtest(self):
+        """Signals are computed from the historical files of every ticker."""
+        cwd = os.getcwd()
+        workdir = tempfile.mkdtemp()
+        os.chdir(workdir)
+        try:
+            frames = generate_ohlcv(tickers=4, years=3, seed=4)
+            write_synthetic(frames, 'data')
+            result = run_portfolio_backtest(list(frames), max_positions=2)
+            self.assertIsNotNone(result)
+            self.assertEqual(list(result['positions'].columns), list(frames))
+            self.assertIsNone(run_portfolio_backtest(['MISSING']))
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir)
+
+    def test_500_tickers_10_years(self):
+        """Benchmark: a 500-ticker, 10-year daily portfolio runs in well under a few seconds."""
+        signals, close, open_ = random_matrices(500, 2520, seed=5)
+        start = time.perf_counter()
+        result = portfolio_backtest(signals, close, open_, cash=1e6, max_positions=50)
+        elapsed = time.perf_counter() - start
+        self.assertGreater(result['trades'], 0)
+        self.assertLess(elapsed, 5.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from src.analyze import calculate_panel_indicators
+from src.backtest import vectorized_backtest
+from src.robustness import bootstrap_paths, monte_carlo_backtest, path_signals, run_robustness, simulate_paths
+from src.synthetic import generate_ohlcv, write_synthetic
+from tests.test_backtest import make_signals_df
+
+class TestRobustness(unittest.TestCase):
+    def setUp(self):
+        self.df = generate_ohlcv(tickers=1, years=4, seed=7)['SYN000']
+
+    def test_bootstrap_paths_resample_whole_bars(self):
+        """Paths start at the first bar and are built from blocks of historical returns and gaps."""
+        opens = self.df['Open'].to_numpy()
+        closes = self.df['Close'].to_numpy()
+        path_opens, path_closes = bootstrap_paths(opens, closes, 50, block_size=10, rng=np.random.default_rng(0))
+        self.assertEqual(path_closes.shape, (len(closes), 50))
+        np.testing.assert_allclose(path_closes[0], closes[0])
+        returns = np.diff(np.log(closes))
+        gaps = np.log(opens[1:] / closes[:-1])
+        path_returns = np.diff(np.log(path_closes), axis=0)
+        path_gaps = np.log(path_opens[1:] / path_closes[:-1])
+        # Each resampled bar maps back to one historical bar, with return and gap kept together
+        lookup = np.abs(path_returns[:, :, np.newaxis] - returns).argmin(axis=2)
+        np.testing.assert_allclose(path_returns, returns[lookup], atol=1e-9)
+        np.testing.assert_allclose(path_gaps, gaps[lookup], atol=1e-9)
+        # Within a block, consecutive bars come from consecutive historical bars
+        steps = (np.diff(lookup[:10], axis=0) % len(returns))
+        self.assertTrue((steps == 1).all())
+        with self.assertRaises(ValueError):
+            bootstrap_paths(opens, closes, 5, method='jackknife')
+
+    def test_path_signals_match_panel_indicators(self):
+        """Signals computed for a batch of paths equal the per-ticker indicator rules."""
+        frames = generate_ohlcv(tickers=6, years=3, seed=8)
+        close = pd.DataFrame({ticker: df['Close'] for ticker, df in frames.items()})
+        panel = calculate_panel_indicators(close, output=None)
+        expected = panel.xs('Signal', axis=1, level='Field').to_numpy(dtype=float)
+        np.testing.assert_array_equal(path_signals(close.to_numpy()), expected)
+
+    def test_simulate_paths_matches_vectorized_backtest(self):
+        """Every path reproduces the single-instrument engine on its own prices and signals."""
+        frames = [make_signals_df(seed) for seed in range(4)]
+        stack = lambda column: np.column_stack([df[column].to_numpy() for df in frames])
+        result = simulate_paths(stack('Open'), stack('Close'), stack('Signal'),
+                                frames[0].index.year.to_numpy(), commission=0.002)
+        for i, df in enumerate(frames):
+            expected = vectorized_backtest(df, commission=0.002)
+            self.assertAlmostEqual(result['final_value'][i], expected['final_value'], places=6)
+            self.assertAlmostEqual(result['win_rate'][i], expected['win_rate'], places=6)
+            self.assertAlmostEqual(result['sharpe_ratio'][i], expected['sharpe_ratio'], places=6)
+            self.assertLessEqual(result['max_drawdown'][i], 0.0)
+
+    def test_monte_carlo_backtest(self):
+        """Distributions are reported and do not depend on how the paths are chunked."""
+        result = monte_carlo_backtest(self.df, n_paths=120, chunk_size=1000, seed=3, cash=1000.0)
+        chunked = monte_carlo_backtest(self.df, n_paths=120, chunk_size=7, seed=3, cash=1000.0)
+        pd.testing.assert_frame_equal(result['paths'], chunked['paths'])
+        summary = result['summary']
+        self.assertEqual(summary['paths'], 120)
+        percentiles = list(summary['returns'].values())
+        self.assertEqual(percentiles, sorted(percentiles))
+        self.assertTrue(0.0 <= summary['probability_of_loss'] <= 1.0)
+        self.assertAlmostEqual(summary['probability_of_loss'], (result['paths']['final_value'] < 1000.0).mean())
+        self.assertGreater(summary['mean_trades'], 0)
+        self.assertTrue(0.0 <= result['historical_percentile'] <= 100.0)
+
+        # The historical reference is the plain vectorized backtest of the same rules
+        df = self.df.copy()
+        df['Signal'] = path_signals(df[['Close']].to_numpy())[:, 0]
+        expected = vectorized_backtest(df, cash=1000.0)
+        self.assertAlmostEqual(result['historical']['final_value'], expected['final_value'], places=6)
+
+    def test_run_robustness(self):
+        """The analysis reads a ticker's historical file and accepts optimized parameters."""
+        cwd = os.getcwd()
+        workdir = tempfile.mkdtemp()
+        os.chdir(workdir)
+        try:
+            write_synthetic(generate_ohlcv(tickers=1, years=3, seed=9), 'data')
+            result = run_robustness('SYN000', n_paths=20, method='iid', seed=1,
+                                    sma_50=20, sma_200=100, stop_loss=0.03, take_profit=0.06)
+            self.assertIsNotNone(result)
+            self.assertEqual(len(result['paths']), 20)
+            self.assertIsNone(run_robustness('MISSING'))
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir)
+
+    def test_thousands_of_paths(self):
+        """Benchmark: 2000 bootstrapped 10-year paths are evaluated in a few seconds."""
+        df = generate_ohlcv(tickers=1, years=10, seed=10)['SYN000']
+        start = time.perf_counter()
+        result = monte_carlo_backtest(df, n_paths=2000, chunk_size=500, seed=0)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(result['summary']['paths'], 2000)
+        self.assertLess(elapsed, 20.0)
+
+if __name__ == '__main__':
+    unittest.main()
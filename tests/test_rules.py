@@ -0,0 +1,74 @@
+import unittest
+import pickle
+import numpy as np
+from src.rules import DEFAULT_SIGNAL_RULES, SignalRules
+
+def random_fields(n=500, seed=0):
+    """Random indicator arrays, with NaN warm-up bars like real SMAs."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    fast = close * (1 + rng.normal(0, 0.02, n))
+    slow = close * (1 + rng.normal(0, 0.02, n))
+    fast[:50] = np.nan
+    slow[:200] = np.nan
+    return {'Close': close, 'SMA_fast': fast, 'SMA_slow': slow, 'RSI': rng.uniform(0, 100, n),
+            'Predicted_Close': close * (1 + rng.normal(0, 0.05, n))}
+
+class TestSignalRules(unittest.TestCase):
+    def test_default_rules_match_where_chain(self):
+        """The compiled default rules reproduce the hand-written np.where chain."""
+        fields = random_fields()
+        fast, slow, rsi = fields['SMA_fast'], fields['SMA_slow'], fields['RSI']
+        expected = np.zeros(len(rsi))
+        expected = np.where((fast > slow) & (rsi < 30), 1, expected)
+        expected = np.where((fast < slow) & (rsi > 70), -1, expected)
+        np.testing.assert_array_equal(DEFAULT_SIGNAL_RULES.evaluate(dict(fields, Predicted_Close=None)), expected)
+
+        predicted, close = fields['Predicted_Close'], fields['Close']
+        expected = np.where((predicted > close * 1.05) & (fast > slow), 1, expected)
+        expected = np.where((predicted < close * 0.95) & (fast < slow), -1, expected)
+        np.testing.assert_array_equal(DEFAULT_SIGNAL_RULES.evaluate(fields), expected)
+
+    def test_rule_syntax(self):
+        """Later rules win, comparisons chain and not/or work element-wise."""
+        rules = SignalRules("""
+            # Buy anything in range, but not when flagged
+            0 < x < 10 -> buy
+            x > 5 or flag -> sell
+            not x -> hold
+        """, params={}, optional=())
+        x = np.array([0.0, 3.0, 7.0, 12.0, 3.0])
+        flag = np.array([False, False, False, False, True])
+        np.testing.assert_array_equal(rules.evaluate({'x': x, 'flag': flag}), [0, 1, -1, -1, -1])
+        self.assertEqual(rules.fields, ['flag', 'x'])
+        self.assertEqual(int(rules.evaluate({'x': 3.0, 'flag': False})), 1)
+
+    def test_invalid_rules(self):
+        """Malformed rules, unsafe expressions and undefined names are rejected."""
+        for spec in ('RSI < 30', 'RSI < 30 -> short', 'RSI < -> buy', '__import__("os") -> buy',
+                     'Close.real > 1 -> buy', ''):
+            with self.assertRaises(ValueError, msg=spec):
+                SignalRules(spec)
+        with self.assertRaises(ValueError):
+            DEFAULT_SIGNAL_RULES.evaluate({'Close': np.ones(3), 'SMA_fast': np.ones(3)})
+
+    def test_parameter_variants_broadcast(self):
+        """A column of thresholds evaluates every variant in one call."""
+        fields = random_fields(seed=1)
+        buys = np.arange(10, 50)[:, np.newaxis]
+        sells = np.arange(50, 90)[:, np.newaxis]
+        variants = DEFAULT_SIGNAL_RULES.evaluate(fields, rsi_buy=buys, rsi_sell=sells)
+        self.assertEqual(variants.shape, (40, 500))
+        for i in (0, 17, 39):
+            np.testing.assert_array_equal(
+                variants[i], DEFAULT_SIGNAL_RULES.evaluate(fields, rsi_buy=int(buys[i, 0]), rsi_sell=int(sells[i, 0])))
+
+    def test_pickle(self):
+        """Rules travel to worker processes and recompile there."""
+        rules = SignalRules('RSI < level -> buy', params={'level': 40})
+        rules.evaluate({'RSI': np.array([30.0])})
+        copy = pickle.loads(pickle.dumps(rules))
+        np.testing.assert_array_equal(copy.evaluate({'RSI': np.array([30.0, 50.0])}), [1, 0])
+
+if __name__ == '__main__':
+    unittest.main()
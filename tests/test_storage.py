@@ -0,0 +1,142 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+from src.storage import (append_frame, benchmark_load, frame_exists, migrate_csvs, read_frame,
+                         store_path, write_frame)
+
+def make_history(n=500):
+    """Build an OHLCV DataFrame with a datetime index."""
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    return pd.DataFrame({
+        'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+        'Volume': rng.integers(1_000, 10_000, n), 'Signal': rng.integers(-1, 2, n),
+    }, index=pd.bdate_range('2020-01-01', periods=n, name='Date'))
+
+class TestStorage(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        os.chdir(self.tmpdir)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmpdir)
+
+    def test_round_trip(self):
+        """Frames come back from the store with the same values, dtypes and index."""
+        df = make_history()
+        write_frame(df, 'data/SYN_historical.csv')
+        self.assertTrue(os.path.exists('data/SYN_historical.csv'))
+        self.assertEqual(store_path('data/SYN_historical.csv'), os.path.join('data', 'store', 'SYN_historical'))
+        loaded = read_frame('data/SYN_historical.csv')
+        pd.testing.assert_frame_equal(loaded, df, check_freq=False)
+        self.assertEqual(list(read_frame('data/SYN_historical.csv', columns=['Close', 'Open']).columns),
+                         ['Close', 'Open'])
+
+    def test_columns_are_memory_mapped(self):
+        """Store columns are backed by read-only memory maps."""
+        write_frame(make_history(), 'data/SYN_historical.csv', csv=False)
+        close = read_frame('data/SYN_historical.csv')['Close'].to_numpy()
+        base = close
+        while base is not None and not isinstance(base, np.memmap):
+            base = base.base
+        self.assertIsInstance(base, np.memmap)
+        self.assertFalse(close.flags.writeable)
+
+    def test_newer_csv_wins(self):
+        """A CSV written after the store is parsed instead of the stale store."""
+        df = make_history()
+        write_frame(df, 'data/signals.csv')
+        time.sleep(0.01)
+        df.iloc[:10].to_csv('data/signals.csv')
+        self.assertEqual(len(read_frame('data/signals.csv')), 10)
+
+    def test_missing_dataset(self):
+        """Missing datasets raise FileNotFoundError like pd.read_csv."""
+        self.assertFalse(frame_exists('data/NONE_historical.csv'))
+        with self.assertRaises(FileNotFoundError):
+            read_frame('data/NONE_historical.csv')
+
+    def test_append_frame(self):
+        """Appended rows land in both the CSV export and the store."""
+        df = make_history()
+        write_frame(df.iloc[:400], 'data/signals.csv')
+        append_frame(df.iloc[400:], 'data/signals.csv')
+        pd.testing.assert_frame_equal(read_frame('data/signals.csv'), df, check_freq=False)
+        self.assertEqual(len(pd.read_csv('data/signals.csv')), len(df))
+
+    def test_readers_never_mix_versions(self):
+        """Reads during rewrites see one whole version; only the current and previous generations are kept."""
+        def version(n):
+            return pd.DataFrame({'a': float(n), 'b': float(n)},
+                                index=pd.bdate_range('2020-01-01', periods=100 + n, name='Date'))
+
+        write_frame(version(0), 'data/signals.csv', csv=False)
+        stop = threading.Event()
+        errors = []
+
+        def writer():
+            n = 1
+            while not stop.is_set():
+                write_frame(version(n), 'data/signals.csv', csv=False)
+                n += 1
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            deadline = time.time() + 1.0
+            while time.time() < deadline:
+                df = read_frame('data/signals.csv')
+                n = len(df) - 100
+                if not ((df['a'] == n).all() and (df['b'] == n).all()):
+                    errors.append(n)
+        finally:
+            stop.set()
+            thread.join()
+        self.assertEqual(errors, [])
+        store = store_path('data/signals.csv')
+        self.assertEqual(len([name for name in os.listdir(store) if name.startswith('gen-')]), 2)
+
+    def test_reads_flat_layout(self):
+        """Stores written before generations are read, and replaced after the next two writes."""
+        df = make_history(50)
+        write_frame(df, 'data/signals.csv', csv=False)
+        store = store_path('data/signals.csv')
+        generation = [name for name in os.listdir(store) if name.startswith('gen-')][0]
+        for name in os.listdir(os.path.join(store, generation)):
+            os.replace(os.path.join(store, generation, name), os.path.join(store, name))
+        os.rmdir(os.path.join(store, generation))
+        with open(os.path.join(store, '_meta.json')) as f:
+            meta = json.load(f)
+        del meta['generation']
+        with open(os.path.join(store, '_meta.json'), 'w') as f:
+            json.dump(meta, f)
+        pd.testing.assert_frame_equal(read_frame('data/signals.csv'), df, check_freq=False)
+
+        write_frame(df.iloc[:40], 'data/signals.csv', csv=False)
+        self.assertIn('col0.npy', os.listdir(store))
+        write_frame(df.iloc[:30], 'data/signals.csv', csv=False)
+        self.assertNotIn('col0.npy', os.listdir(store))
+        pd.testing.assert_frame_equal(read_frame('data/signals.csv'), df.iloc[:30], check_freq=False)
+
+    def test_migrate_and_benchmark(self):
+        """Migrated CSVs load from the store faster than by parsing the CSV."""
+        os.makedirs('data')
+        df = make_history(n=20000)
+        df.to_csv('data/SYN_historical.csv')
+        with open('data/notes.csv', 'w') as f:
+            f.write('a,b\n1,2\n')
+        self.assertEqual(migrate_csvs('data'), [os.path.join('data', 'SYN_historical.csv')])
+        pd.testing.assert_frame_equal(read_frame('data/SYN_historical.csv'), df, check_freq=False, rtol=1e-12)
+        timings = benchmark_load('data/SYN_historical.csv', repeat=3)
+        self.assertLess(timings['store'] * 5, timings['csv'])
+
+if __name__ == '__main__':
+    unittest.main()